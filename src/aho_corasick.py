@@ -0,0 +1,95 @@
+"""Automa di Aho-Corasick per la ricerca simultanea di più termini in un testo"""
+
+from typing import Any, Dict, Iterator, List, Tuple
+from collections import deque
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class PatternMatch:
+    """Occorrenza di un pattern nel testo"""
+    pattern: str
+    payload: Any
+    start: int
+    end: int
+
+class AhoCorasickAutomaton:
+    """Matcher multi-pattern: trova tutte le occorrenze con una sola scansione lineare del testo"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[Tuple[int, ...]] = [()]
+        self._patterns: List[Tuple[str, Any]] = []
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add_pattern(self, pattern: str, payload: Any = None) -> None:
+        """Aggiunge un pattern all'automa (prima della compilazione)"""
+        if self._built:
+            raise RuntimeError("Impossibile aggiungere pattern a un automa già compilato")
+        if not pattern:
+            return
+
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append(())
+            node = next_node
+
+        self._outputs[node] += (len(self._patterns),)
+        self._patterns.append((pattern, payload))
+
+    def build(self) -> "AhoCorasickAutomaton":
+        """Calcola i link di fallimento e propaga gli output (visita in ampiezza)"""
+        queue = deque()
+        for next_node in self._goto[0].values():
+            self._fail[next_node] = 0
+            queue.append(next_node)
+
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_node] = self._goto[fallback].get(char, 0)
+
+                # Gli output del nodo includono quelli dei suffissi più corti
+                self._outputs[next_node] += self._outputs[self._fail[next_node]]
+
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[PatternMatch]:
+        """Restituisce tutte le occorrenze (anche sovrapposte) in ordine di posizione finale"""
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        patterns = self._patterns
+
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            for pattern_index in outputs[node]:
+                pattern, payload = patterns[pattern_index]
+                yield PatternMatch(
+                    pattern=pattern,
+                    payload=payload,
+                    start=position - len(pattern) + 1,
+                    end=position + 1
+                )
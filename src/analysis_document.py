@@ -0,0 +1,76 @@
+"""Documento di analisi: un testo normalizzato una sola volta e condiviso da categorizzatori e analizzatori NLP"""
+
+import re
+import unicodedata
+from functools import cached_property
+from typing import List, Optional, Union
+
+# Tabella di piegatura precalcolata: segni diacritici combinanti (dopo NFD) rimossi,
+# legature e lettere senza scomposizione canonica sostituite dall'equivalente ASCII
+FOLD_TABLE = {
+    **dict.fromkeys(range(0x0300, 0x0370)),
+    ord('ß'): 'ss', ord('æ'): 'ae', ord('œ'): 'oe', ord('ø'): 'o',
+    ord('ł'): 'l', ord('đ'): 'd', ord('ð'): 'd', ord('þ'): 'th'
+}
+
+# Qualsiasi sequenza di caratteri diversi da lettere ASCII minuscole e cifre
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+# Separatori del testo italiano: non-parola, cifre e spazi (l'underscore resta)
+_ITALIAN_SEPARATOR_RE = re.compile(r'[\W\d]+')
+# Token: sequenze di lettere e cifre Unicode (underscore e punteggiatura separano)
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+def fold_accents(text: str) -> str:
+    """Rimuove accenti e diacritici (es. 'Škoda' -> 'Skoda', 'perché' -> 'perche')"""
+    if text.isascii():
+        return text
+    folded = unicodedata.normalize('NFD', text).translate(FOLD_TABLE)
+    if not folded.isascii():
+        # Segni combinanti fuori dal blocco latino (raro): filtro completo per categoria
+        folded = ''.join(char for char in folded if unicodedata.category(char) != 'Mn')
+    return folded
+
+class AnalysisDocument:
+    """Testo di un prodotto con le forme normalizzate calcolate alla prima richiesta e poi riusate"""
+
+    def __init__(self, text: Optional[str]):
+        self.text = text or ""
+
+    @classmethod
+    def from_parts(cls, *parts: Optional[str]) -> "AnalysisDocument":
+        """Documento da più campi (es. titolo e descrizione) separati da uno spazio"""
+        return cls(" ".join(part for part in parts if part))
+
+    def __repr__(self) -> str:
+        return f"AnalysisDocument({self.text!r})"
+
+    @cached_property
+    def lowered(self) -> str:
+        """Testo in minuscolo"""
+        return self.text.lower()
+
+    @cached_property
+    def folded(self) -> str:
+        """Testo in minuscolo senza accenti, punteggiatura invariata"""
+        return fold_accents(self.lowered)
+
+    @cached_property
+    def normalized(self) -> str:
+        """Solo lettere ASCII e cifre separate da spazi singoli"""
+        return _NON_ALNUM_RE.sub(' ', self.folded).strip()
+
+    @cached_property
+    def italian(self) -> str:
+        """Forma pulita per il testo italiano: solo parole, senza numeri, spazi singoli"""
+        return _ITALIAN_SEPARATOR_RE.sub(' ', self.folded).strip()
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """Token alfanumerici del testo piegato"""
+        return _TOKEN_RE.findall(self.folded)
+
+def as_document(value: Union[str, AnalysisDocument, None]) -> AnalysisDocument:
+    """Accetta un testo o un documento già costruito"""
+    if value is None or isinstance(value, str):
+        return AnalysisDocument(value)
+    return value
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -7,8 +7,17 @@ import logging
 from typing import Dict, Any
 import bleach
 from contextlib import contextmanager
+from werkzeug.wsgi import get_input_stream
 
 from product_categorizer import ProductCategorizer, CategoryResult
+from batch_engine import BatchCategorizationEngine, BatchItem
+from bulk_stream import BulkCategorizationStream, BulkCheckpoint, iter_ndjson
+from config import config
+from result_cache import create_result_cache
+from monitoring import metrics_collector
+from category_tree import (TreePatchError, TreeVersionConflictError, apply_patch, diff_trees,
+                           pointer_to_path, subtree_at, truncate_tree)
+from http_cache import RepresentationCache, conditional_response
 from exceptions import (
     ProductCategorizerError, InvalidInputError, ValidationError,
     RateLimitError, CategoryNotFoundError
@@ -39,8 +48,19 @@ limiter = Limiter(
 # Configurazione sicurezza
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
 
-# Inizializza il categorizzatore
-categorizer = ProductCategorizer()
+# Inizializza il categorizzatore con la cache dei risultati
+categorizer = ProductCategorizer(result_cache=create_result_cache(
+    "categorizer",
+    enabled=config.cache.enabled,
+    max_size=config.cache.max_size,
+    max_bytes=config.cache.max_bytes,
+    ttl_seconds=config.cache.ttl_seconds,
+    redis_url=config.cache.redis_url,
+    metrics=metrics_collector
+))
+batch_engine = BatchCategorizationEngine(categorizer, config.batch)
+# Corpi di GET /categories serializzati e compressi una volta per versione dell'albero
+categories_cache = RepresentationCache(lambda payload: app.json.dumps(payload).encode('utf-8'))
 
 @contextmanager
 def error_handler(operation: str):
@@ -54,6 +74,10 @@ def error_handler(operation: str):
         logger.error(f"Errore imprevisto durante {operation}: {str(e)}")
         raise ProductCategorizerError(f"Errore interno durante {operation}") from e
 
+def wants_tree_delta() -> bool:
+    """Modalità delta (?delta=1): le risposte riportano solo le modifiche all'albero e la sua versione"""
+    return request.args.get('delta', '').lower() in ('1', 'true', 'yes')
+
 def sanitize_input(text: str, max_length: int = None) -> str:
     """Sanitizza input utente"""
     if not text:
@@ -79,6 +103,17 @@ def handle_categorizer_error(error):
         'status': 'error'
     }), 400
 
+@app.errorhandler(TreeVersionConflictError)
+def handle_tree_version_conflict(error):
+    """Gestisce le modifiche all'albero basate su una versione superata"""
+    logger.info(f"Conflitto di versione dell'albero: {error.message}")
+    return jsonify({
+        'error': error.message,
+        'error_code': error.error_code,
+        'details': error.details,
+        'status': 'error'
+    }), 409
+
 @app.errorhandler(ValidationError)
 def handle_validation_error(error):
     """Gestisce errori di validazione"""
@@ -159,12 +194,16 @@ def categorize_product():
             'categoria_principale': result.categoria_principale,
             'sottocategoria': result.sottocategoria,
             'tags_seo': result.tags_seo,
-            'nuovo_albero': result.nuovo_albero,
             'confidence_score': result.confidence_score,
             'is_new_category': result.is_new_category,
+            'versione_albero': result.versione_albero,
             'status': 'success',
             'processing_time': getattr(result, 'processing_time', None)
         }
+        if wants_tree_delta():
+            response['modifiche_albero'] = result.modifiche_albero
+        else:
+            response['nuovo_albero'] = result.nuovo_albero
         
         logger.info(f"Categorizzazione completata: {result.categoria_principale}")
         return jsonify(response)
@@ -268,18 +307,47 @@ def get_category_suggestions():
 
 @app.route('/categories', methods=['GET'])
 def get_current_categories():
-    """Endpoint per ottenere l'albero delle categorie corrente"""
+    """Endpoint per ottenere l'albero delle categorie corrente
+    
+    Con ?since=<versione> restituisce solo le modifiche successive a quella versione, se ancora
+    conservata; altrimenti l'albero completo. Con ?root=<percorso JSON Pointer> e ?depth=<livelli>
+    restituisce solo una parte dell'albero. Le risposte hanno un ETag e rispondono 304 a
+    If-None-Match finché l'albero non cambia versione.
+    """
+    since = request.args.get('since', type=int)
+    depth = request.args.get('depth', type=int)
+    if depth is not None and depth < 0:
+        raise InvalidInputError("depth deve essere un intero non negativo", field='depth')
     try:
-        return jsonify({
-            'categories': categorizer.category_tree,
+        root = pointer_to_path(request.args.get('root', ''))
+    except TreePatchError as e:
+        raise InvalidInputError(e.message, field='root') from e
+    
+    version, tree = categorizer.tree_store.current()
+    if subtree_at(tree, root) is None:
+        raise CategoryNotFoundError(f"Categoria non trovata: {request.args.get('root')}")
+    
+    def build_payload() -> Dict[str, Any]:
+        view = truncate_tree(subtree_at(tree, root), depth)
+        before = categorizer.tree_store.snapshot_at(since) if since is not None else None
+        if before is not None:
+            return {
+                'changes': diff_trees(truncate_tree(subtree_at(before, root) or {}, depth), view),
+                'base_version': since,
+                'version': version,
+                'status': 'success'
+            }
+        return {
+            'categories': view,
+            'version': version,
             'status': 'success'
-        })
-    except Exception as e:
-        logger.error(f"Errore nel recupero categorie: {str(e)}")
-        return jsonify({
-            'error': f'Errore interno del server: {str(e)}',
-            'status': 'error'
-        }), 500
+        }
+    
+    entry = categories_cache.get(version, (since, tuple(root), depth), build_payload)
+    status, headers, body = conditional_response(
+        entry, request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding')
+    )
+    return Response(body, status=status, headers=headers)
 
 @app.route('/categories', methods=['POST'])
 def update_categories():
@@ -299,14 +367,19 @@ def update_categories():
                 'status': 'error'
             }), 400
         
-        # Aggiorna l'albero delle categorie
-        categorizer.category_tree = new_tree
+        # Pubblica il nuovo albero come nuova versione (le richieste in corso restano sulla loro snapshot)
+        previous_tree, updated_tree, version = categorizer.tree_store.update(lambda tree: new_tree)
         
-        return jsonify({
+        response = {
             'message': 'Albero categorie aggiornato con successo',
-            'categories': categorizer.category_tree,
+            'version': version,
             'status': 'success'
-        })
+        }
+        if wants_tree_delta():
+            response['changes'] = diff_trees(previous_tree, updated_tree)
+        else:
+            response['categories'] = updated_tree
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"Errore nell'aggiornamento categorie: {str(e)}")
@@ -315,6 +388,33 @@ def update_categories():
             'status': 'error'
         }), 500
 
+@app.route('/categories', methods=['PATCH'])
+def patch_categories():
+    """Endpoint per modifiche incrementali all'albero (lista di operazioni in stile JSON Patch)
+    
+    Operazioni: add, remove, replace, move, copy, test su percorsi JSON Pointer ("/Ricambi Auto/Freni").
+    Con ?version=<n> le modifiche si applicano solo se l'albero è ancora a quella versione (409 altrimenti).
+    """
+    with error_handler("aggiornamento categorie"):
+        operations = request.get_json(silent=True)
+        if not isinstance(operations, list):
+            raise InvalidInputError("Il corpo deve essere una lista di operazioni JSON Patch")
+        expected_version = request.args.get('version', type=int)
+        
+        try:
+            previous_tree, updated_tree, version = categorizer.tree_store.update(
+                lambda tree: apply_patch(tree, operations), expected_version
+            )
+        except TreePatchError as e:
+            raise InvalidInputError(e.message, field='operations') from e
+        
+        return jsonify({
+            'message': 'Albero categorie aggiornato con successo',
+            'changes': diff_trees(previous_tree, updated_tree),
+            'version': version,
+            'status': 'success'
+        })
+
 @app.route('/batch-categorize', methods=['POST'])
 @limiter.limit("5 per minute")
 def batch_categorize():
@@ -335,7 +435,8 @@ def batch_categorize():
         
         logger.info(f"Elaborazione batch {batch_id or 'anonimo'} di {len(products)} prodotti")
         
-        results = []
+        results = {}
+        items = []
         
         for i, product in enumerate(products):
             try:
@@ -344,56 +445,72 @@ def batch_categorize():
                 description = sanitize_input(product.get('descrizione', ''), 2000)
                 
                 if not title and not description:
-                    results.append({
+                    results[i] = {
                         'index': i,
                         'error': 'Titolo o descrizione richiesti',
                         'status': 'error'
-                    })
+                    }
                     continue
                 
-                result = categorizer.categorize_product(
-                    title=title,
-                    description=description,
-                    current_tree=current_tree,
-                    target_seo_keywords=target_seo_keywords
-                )
-                
-                if result:
-                    results.append({
-                        'index': i,
-                        'product_title': title[:50] + '...' if len(title) > 50 else title,
-                        'categoria_principale': result.categoria_principale,
-                        'sottocategoria': result.sottocategoria,
-                        'tags_seo': result.tags_seo,
-                        'confidence_score': result.confidence_score,
-                        'is_new_category': result.is_new_category,
-                        'status': 'success'
-                    })
-                    
-                    # Aggiorna l'albero per i prodotti successivi
-                    current_tree = result.nuovo_albero
-                else:
-                    results.append({
-                        'index': i,
-                        'product_title': title[:50] + '...' if len(title) > 50 else title,
-                        'error': 'Categoria non determinabile',
-                        'status': 'error'
-                    })
+                items.append(BatchItem(index=i, title=title, description=description))
                 
             except Exception as e:
                 logger.warning(f"Errore prodotto {i}: {str(e)}")
-                results.append({
+                results[i] = {
                     'index': i,
                     'product_title': product.get('titolo', 'N/A')[:50],
                     'error': str(e),
                     'status': 'error'
-                })
+                }
+        
+        # Analisi in parallelo, poi fusione ordinata nell'albero (stesso risultato del ciclo seriale)
+        outcomes = batch_engine.categorize(items, current_tree, target_seo_keywords)
+        
+        for item, outcome in zip(items, outcomes):
+            i = outcome.index
+            title = item.title
+            result = outcome.result
+            
+            if outcome.error is not None:
+                logger.warning(f"Errore prodotto {i}: {outcome.error}")
+                results[i] = {
+                    'index': i,
+                    'product_title': products[i].get('titolo', 'N/A')[:50],
+                    'error': outcome.error,
+                    'status': 'error'
+                }
+            elif result:
+                results[i] = {
+                    'index': i,
+                    'product_title': title[:50] + '...' if len(title) > 50 else title,
+                    'categoria_principale': result.categoria_principale,
+                    'sottocategoria': result.sottocategoria,
+                    'tags_seo': result.tags_seo,
+                    'confidence_score': result.confidence_score,
+                    'is_new_category': result.is_new_category,
+                    'status': 'success'
+                }
+            else:
+                results[i] = {
+                    'index': i,
+                    'product_title': title[:50] + '...' if len(title) > 50 else title,
+                    'error': 'Categoria non determinabile',
+                    'status': 'error'
+                }
+        
+        results = [results[i] for i in sorted(results)]
         
         success_rate = len([r for r in results if r.get('status') == 'success']) / len(products) * 100 if products else 0
         
+        # Versione dell'albero condiviso dopo l'ultimo prodotto inserito (None per un albero della richiesta)
+        successful_results = [outcome.result for outcome in outcomes if outcome.result is not None]
+        tree_version = successful_results[-1].versione_albero if successful_results else (
+            None if current_tree else categorizer.tree_store.version
+        )
+        
         response = {
             'results': results,
-            'nuovo_albero': categorizer.category_tree,
+            'versione_albero': tree_version,
             'batch_id': batch_id,
             'total_processed': len(products),
             'successful': len([r for r in results if r.get('status') == 'success']),
@@ -401,10 +518,48 @@ def batch_categorize():
             'success_rate': round(success_rate, 2),
             'status': 'success'
         }
+        if wants_tree_delta():
+            # Le modifiche dei singoli prodotti, nell'ordine in cui sono state applicate
+            response['modifiche_albero'] = [
+                operation for result in successful_results for operation in result.modifiche_albero
+            ]
+        else:
+            response['nuovo_albero'] = batch_engine.resulting_tree(outcomes, current_tree)
         
         logger.info(f"Batch {batch_id or 'anonimo'} completato: {response['successful']}/{len(products)} successi ({success_rate:.1f}%)")
         return jsonify(response)
 
+@app.route('/bulk-categorize', methods=['POST'])
+@limiter.limit("5 per minute")
+def bulk_categorize():
+    """Endpoint di categorizzazione in streaming: una riga NDJSON per prodotto in ingresso e in uscita
+    
+    Dopo ogni blocco viene emesso un record 'checkpoint' con riga e offset in byte: per riprendere
+    un feed interrotto si rinvia il corpo a partire da quell'offset con ?start_line=&start_offset=.
+    """
+    with error_handler("categorizzazione bulk"):
+        try:
+            checkpoint = BulkCheckpoint(
+                line=int(request.args.get('start_line', 0)),
+                offset=int(request.args.get('start_offset', 0))
+            )
+            chunk_size = int(request.args.get('chunk_size', 500))
+        except ValueError:
+            raise InvalidInputError("start_line, start_offset e chunk_size devono essere interi")
+        
+        if checkpoint.line < 0 or checkpoint.offset < 0 or not 1 <= chunk_size <= 10000:
+            raise InvalidInputError("Parametri di ripresa o chunk_size non validi")
+        
+        target_seo_keywords = request.args.getlist('keyword')
+        
+        # Il corpo viene letto a righe, senza il limite MAX_CONTENT_LENGTH pensato per i JSON
+        stream = get_input_stream(request.environ, max_content_length=None)
+        bulk_stream = BulkCategorizationStream(batch_engine, chunk_size=chunk_size, sanitizer=sanitize_input)
+        records = bulk_stream.run(stream, checkpoint, None, target_seo_keywords or None)
+        
+        logger.info(f"Avvio categorizzazione bulk da riga {checkpoint.line} (offset {checkpoint.offset})")
+        return Response(stream_with_context(iter_ndjson(records)), mimetype='application/x-ndjson')
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
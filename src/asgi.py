@@ -0,0 +1,140 @@
+"""Servizio ASGI: event loop per le connessioni, app WSGI eseguita nel WSGIMiddleware di uvicorn
+
+Le route e i contratti JSON restano quelli delle app Flask (src/api.py e src/italian_api.py): le
+connessioni keep-alive inattive e i client lenti restano sull'event loop e non occupano thread.
+I thread di un processo danno concorrenza, non parallelismo (la categorizzazione è CPU-bound e
+tiene il GIL): il parallelismo viene dai worker pre-fork, cioè da gunicorn con i worker uvicorn
+(SERVER_MODE=asgi python src/server.py) o da uvicorn con più processi:
+
+    uvicorn --factory asgi:create_app --app-dir src --workers 4
+
+Non ci sono route native asincrone: la cache dei risultati (Redis) e le metriche restano chiamate
+bloccanti eseguite nei thread del WSGIMiddleware, quindi un'attesa di I/O occupa un thread del pool
+(ASYNC_THREADS) come in modalità WSGI.
+"""
+
+import os
+import sys
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import config
+
+try:
+    # Adattatore WSGI di uvicorn (a2wsgi se installato, ma il suo readline(limit) non attende il
+    # resto del corpo: il bulk NDJSON richiede l'adattatore di uvicorn, l'unico in requirements.txt)
+    from uvicorn.middleware.wsgi import WSGIMiddleware
+except ImportError:
+    WSGIMiddleware = None
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+def content_length_error(headers: List[Tuple[bytes, bytes]]) -> Optional[str]:
+    """Errore se un Content-Length non è un intero non negativo (None se valido o assente)"""
+    for name, value in headers:
+        if name.lower() == b"content-length" and not value.strip().isdigit():
+            return f"Content-Length non valido: {value.decode('latin-1')}"
+    return None
+
+async def send_json_error(send: Send, status: int, message: str) -> None:
+    """Risposta JSON di errore nel formato delle API, inviata senza passare dall'app"""
+    body = json.dumps({"error": message, "status": "error"}).encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))
+    ]})
+    await send({"type": "http.response.body", "body": body, "more_body": False})
+
+class ASGIApplication:
+    """App ASGI 3 di un'app WSGI: le richieste HTTP passano al WSGIMiddleware, il lifespan è gestito qui"""
+
+    def __init__(self, wsgi_app: Callable, threads: Optional[int] = None):
+        if WSGIMiddleware is None:
+            raise ImportError("uvicorn non installato: impossibile servire l'app in modalità ASGI")
+        self.wsgi_app = wsgi_app
+        self.adapter = WSGIMiddleware(self._call_wsgi, workers=threads or config.get_performance_settings()["async_threads"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            error = content_length_error(scope.get("headers", []))
+            if error is not None:
+                await send_json_error(send, 400, error)
+                return
+            await self.adapter(scope, receive, send)
+        else:
+            raise RuntimeError(f"Tipo di connessione ASGI non supportato: {scope['type']}")
+
+    def _call_wsgi(self, environ: Dict[str, Any], start_response: Callable) -> Any:
+        # L'adattatore chiude wsgi.input alla fine del corpo: i corpi chunked senza Content-Length
+        # (feed NDJSON del bulk) restano leggibili dall'app
+        environ.setdefault("wsgi.input_terminated", True)
+        return self.wsgi_app(environ, start_response)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def shutdown(self) -> None:
+        """Chiude il pool dell'adattatore (le richieste in corso vengono completate)"""
+        executor = getattr(self.adapter, "executor", None)
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+def create_app() -> ASGIApplication:
+    """App ASGI dell'API generale, con lo stesso riscaldamento del server WSGI"""
+    from server import load_application
+
+    return ASGIApplication(load_application())
+
+def create_italian_app() -> ASGIApplication:
+    """App ASGI dell'API italiana"""
+    from server import PROJECT_ROOT
+
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    from src.italian_api import app
+
+    return ASGIApplication(app)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point a riga di comando (richiede uvicorn): un processo per worker"""
+    import argparse
+
+    performance = config.get_performance_settings()
+    parser = argparse.ArgumentParser(description="Avvia l'API di categorizzazione in modalità ASGI")
+    parser.add_argument("--host", default=config.api.host, help="Indirizzo di ascolto")
+    parser.add_argument("--port", type=int, default=config.api.port, help="Porta di ascolto")
+    parser.add_argument("--workers", type=int, default=performance["server_workers"], help="Numero di processi worker")
+    parser.add_argument("--italian", action="store_true", help="Serve l'API italiana invece di quella generale")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        logger.error("uvicorn non installato: impossibile avviare il server ASGI")
+        return 1
+
+    logger.info(f"Avvio server ASGI su {args.host}:{args.port} ({args.workers} processi x "
+                f"{performance['async_threads']} thread)")
+    # Con più processi uvicorn importa la factory in ogni worker
+    uvicorn.run("asgi:create_italian_app" if args.italian else "asgi:create_app", factory=True,
+                app_dir=os.path.dirname(os.path.abspath(__file__)), workers=args.workers, host=args.host,
+                port=args.port, backlog=performance["server_backlog"],
+                timeout_keep_alive=performance["server_keepalive"], log_level=performance["log_level"].lower())
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""Motore di categorizzazione batch in due fasi: analisi in parallelo, fusione ordinata nell'albero"""
+
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from product_categorizer import ProductCategorizer, PreparedCategorization, CategoryResult
+from config import BatchConfig
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BatchItem:
+    """Prodotto da categorizzare, con la sua posizione nel batch"""
+    index: int
+    title: str
+    description: str
+    product_id: Any = None
+
+@dataclass
+class BatchItemOutcome:
+    """Esito della categorizzazione di un prodotto del batch"""
+    index: int
+    result: Optional[CategoryResult] = None
+    error: Optional[str] = None
+
+# I worker non vengono creati con fork: il processo che li avvia può avere altri thread attivi
+# (worker gthread o ASGI), e un fork ne copierebbe i lock nello stato in cui si trovano
+PROCESS_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Categorizzatore del processo worker (creato una sola volta dall'initializer del pool)
+_worker_categorizer: Optional[ProductCategorizer] = None
+
+def _init_worker() -> None:
+    global _worker_categorizer
+    _worker_categorizer = ProductCategorizer()
+
+def _prepare_chunk(categorizer: Optional[ProductCategorizer], chunk: List[Tuple[str, str]],
+                   target_seo_keywords: Optional[List[str]]) -> List[Tuple[Optional[PreparedCategorization], Optional[str]]]:
+    """Fase 1 su un blocco di prodotti: gli errori vengono restituiti, non sollevati"""
+    categorizer = categorizer or _worker_categorizer
+    prepared = []
+    for title, description in chunk:
+        try:
+            prepared.append((categorizer.prepare_categorization(title, description, target_seo_keywords), None))
+        except Exception as e:
+            prepared.append((None, str(e)))
+    return prepared
+
+def _prepare_chunk_in_worker(chunk: List[Tuple[str, str]],
+                             target_seo_keywords: Optional[List[str]]) -> List[Tuple[Optional[PreparedCategorization], Optional[str]]]:
+    return _prepare_chunk(None, chunk, target_seo_keywords)
+
+class BatchCategorizationEngine:
+    """Categorizza un batch con lo stesso risultato dell'elaborazione seriale, usando tutti i core"""
+
+    def __init__(self, categorizer: ProductCategorizer, config: Optional[BatchConfig] = None):
+        self.categorizer = categorizer
+        self.config = config or BatchConfig()
+        self.max_workers = self.config.max_workers or os.cpu_count() or 1
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        """Crea il pool alla prima richiesta e lo riusa per i batch successivi"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.config.executor == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers, initializer=_init_worker,
+                            mp_context=multiprocessing.get_context(PROCESS_START_METHOD)
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                            thread_name_prefix="batch-categorize")
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Chiude il pool di worker"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def prepare(self, items: List[BatchItem],
+                target_seo_keywords: Optional[List[str]] = None) -> List[Tuple[Optional[PreparedCategorization], Optional[str]]]:
+        """Fase 1: analisi dei prodotti, indipendente dall'albero e quindi parallelizzabile"""
+        pairs = [(item.title, item.description) for item in items]
+
+        if self.config.executor == "serial" or self.max_workers <= 1 or len(pairs) < self.config.min_parallel_items:
+            return _prepare_chunk(self.categorizer, pairs, target_seo_keywords)
+
+        cache = self.categorizer.result_cache
+        if self.config.executor == "process" and cache is not None:
+            return self._prepare_with_cache(cache, pairs, target_seo_keywords)
+        return self._prepare_parallel(pairs, target_seo_keywords)
+
+    def _prepare_with_cache(self, cache, pairs: List[Tuple[str, str]],
+                            target_seo_keywords: Optional[List[str]]) -> List[Tuple[Optional[PreparedCategorization], Optional[str]]]:
+        """I processi worker non condividono la cache: le ricerche avvengono qui, ai worker vanno solo i miss"""
+        keys = []
+        for title, description in pairs:
+            try:
+                keys.append(self.categorizer.preparation_cache_key(title, description, target_seo_keywords))
+            except Exception:
+                keys.append(None)
+        cached = [cache.get(key) if key is not None else None for key in keys]
+
+        misses = [pair for pair, hit in zip(pairs, cached) if hit is None]
+        computed = iter(self._prepare_parallel(misses, target_seo_keywords) if misses else [])
+
+        prepared = []
+        for key, hit in zip(keys, cached):
+            if hit is not None:
+                prepared.append((hit, None))
+                continue
+            prepared_item, error = next(computed)
+            if prepared_item is not None and key is not None:
+                cache.set(key, prepared_item)
+            prepared.append((prepared_item, error))
+        return prepared
+
+    def _prepare_parallel(self, pairs: List[Tuple[str, str]],
+                          target_seo_keywords: Optional[List[str]]) -> List[Tuple[Optional[PreparedCategorization], Optional[str]]]:
+        """Distribuisce i blocchi di prodotti sul pool"""
+        chunk_size = max(1, self.config.chunk_size)
+        chunks = [pairs[start:start + chunk_size] for start in range(0, len(pairs), chunk_size)]
+        executor = self._get_executor()
+
+        if self.config.executor == "process":
+            futures = [executor.submit(_prepare_chunk_in_worker, chunk, target_seo_keywords) for chunk in chunks]
+        else:
+            futures = [executor.submit(_prepare_chunk, self.categorizer, chunk, target_seo_keywords) for chunk in chunks]
+
+        # I risultati vengono raccolti nell'ordine di invio, non di completamento
+        prepared = []
+        for future in futures:
+            prepared.extend(future.result())
+        return prepared
+
+    def merge(self, items: List[BatchItem],
+              prepared: List[Tuple[Optional[PreparedCategorization], Optional[str]]],
+              current_tree: Dict[str, Any] = None) -> List[BatchItemOutcome]:
+        """Fase 2: inserisce i percorsi nell'albero nell'ordine del batch (deterministica)"""
+        # Sull'albero condiviso ogni percorso viene pubblicato sull'ultima versione, anche se nel
+        # frattempo altre richieste ne hanno pubblicate di nuove; un albero della richiesta fa da overlay
+        shared = not current_tree or current_tree is self.categorizer.category_tree
+        outcomes = []
+        for item, (prepared_item, error) in zip(items, prepared):
+            if prepared_item is None:
+                outcomes.append(BatchItemOutcome(index=item.index, error=error))
+                continue
+            try:
+                result = self.categorizer.apply_categorization(prepared_item, None if shared else current_tree)
+            except Exception as e:
+                outcomes.append(BatchItemOutcome(index=item.index, error=str(e)))
+                continue
+
+            # L'albero aggiornato viene passato al prodotto successivo, come nel ciclo seriale
+            if not shared:
+                current_tree = result.nuovo_albero
+            outcomes.append(BatchItemOutcome(index=item.index, result=result))
+        return outcomes
+
+    def resulting_tree(self, outcomes: List[BatchItemOutcome], current_tree: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Albero dopo il batch: l'ultimo overlay della richiesta, oppure l'albero condiviso"""
+        if current_tree:
+            for outcome in reversed(outcomes):
+                if outcome.result is not None:
+                    return outcome.result.nuovo_albero
+            return current_tree
+        return self.categorizer.category_tree
+
+    def categorize(self, items: List[BatchItem], current_tree: Dict[str, Any] = None,
+                   target_seo_keywords: Optional[List[str]] = None) -> List[BatchItemOutcome]:
+        """Esegue le due fasi e restituisce gli esiti nell'ordine degli item"""
+        prepared = self.prepare(items, target_seo_keywords)
+        logger.debug(f"Fase di analisi completata per {len(items)} prodotti")
+        return self.merge(items, prepared, current_tree)
@@ -0,0 +1,99 @@
+"""Risoluzione dei brand per token: mappa alias (n-grammi di token) -> brand canonico"""
+
+import os
+import json
+import logging
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+try:
+    from src.analysis_document import AnalysisDocument, as_document
+except ImportError:
+    from analysis_document import AnalysisDocument, as_document
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+BRANDS_FILE = os.path.join(DATA_DIR, "automotive_brands.json")
+
+def fold_tokens(text: str) -> List[str]:
+    """Minuscolo, senza accenti, diviso in token alfanumerici"""
+    return AnalysisDocument(text).tokens
+
+def load_brand_groups(path: str = BRANDS_FILE) -> Dict[str, Dict[str, List[str]]]:
+    """Carica i gruppi di brand (OEM e aftermarket) dal file dati, se presente"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("groups", {})
+    except (OSError, ValueError) as e:
+        logger.warning(f"Impossibile caricare i brand da {path}: {str(e)}")
+        return {}
+
+class BrandResolver:
+    """Riconosce i brand confrontando n-grammi di token con una tabella hash di alias
+
+    Il costo per token è costante: per ogni token si provano solo le lunghezze degli alias
+    che iniziano con quel token, dalla più lunga alla più corta.
+    """
+
+    def __init__(self):
+        self._aliases: Dict[Tuple[str, ...], str] = {}
+        # primo token -> lunghezze (decrescenti) degli alias che iniziano con quel token
+        self._lengths: Dict[str, Tuple[int, ...]] = {}
+        self._rank: Dict[str, int] = {}
+
+    @classmethod
+    def from_brand_database(cls, brand_database: Mapping[str, Mapping[str, Sequence[str]]]) -> "BrandResolver":
+        """Costruisce il resolver da gruppi {gruppo: {brand: [varianti]}}"""
+        resolver = cls()
+        for brands in brand_database.values():
+            for brand, variants in brands.items():
+                resolver.add_brand(brand, variants)
+        return resolver
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def add_brand(self, brand: str, aliases: Iterable[str]) -> None:
+        """Registra un brand con i suoi alias (il primo brand registrato per un alias vince)"""
+        self._rank.setdefault(brand, len(self._rank))
+        for alias in aliases:
+            tokens = tuple(fold_tokens(alias))
+            if not tokens:
+                continue
+            existing = self._aliases.setdefault(tokens, brand)
+            if existing != brand:
+                logger.debug(f"Alias '{alias}' già assegnato a {existing}, ignorato per {brand}")
+                continue
+            lengths = set(self._lengths.get(tokens[0], ()))
+            lengths.add(len(tokens))
+            self._lengths[tokens[0]] = tuple(sorted(lengths, reverse=True))
+
+    def resolve_tokens(self, tokens: Sequence[str]) -> List[Tuple[str, int, int]]:
+        """Occorrenze (brand, token iniziale, token finale) in ordine di testo, preferendo l'alias più lungo"""
+        matches = []
+        aliases = self._aliases
+        position = 0
+        token_count = len(tokens)
+        while position < token_count:
+            step = 1
+            for length in self._lengths.get(tokens[position], ()):
+                if position + length > token_count:
+                    continue
+                brand = aliases.get(tuple(tokens[position:position + length]))
+                if brand is not None:
+                    matches.append((brand, position, position + length))
+                    step = length
+                    break
+            position += step
+        return matches
+
+    def resolve(self, text: Union[str, AnalysisDocument]) -> List[str]:
+        """Brand distinti presenti nel testo (o nei token del documento), nell'ordine del database"""
+        found = {brand for brand, _, _ in self.resolve_tokens(as_document(text).tokens)}
+        return sorted(found, key=self._rank.__getitem__)
+
+    def brand_for(self, alias: str) -> Optional[str]:
+        """Brand canonico di un alias esatto"""
+        return self._aliases.get(tuple(fold_tokens(alias)))
@@ -0,0 +1,261 @@
+"""Categorizzazione in streaming di feed NDJSON con memoria limitata e checkpoint riprendibili"""
+
+import os
+import sys
+import json
+import time
+import logging
+from dataclasses import dataclass, asdict, replace
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from batch_engine import BatchCategorizationEngine, BatchItem
+
+logger = logging.getLogger(__name__)
+
+# Lunghezza massima di una riga del feed: righe più lunghe vengono scartate con un errore
+MAX_LINE_BYTES = 64 * 1024
+
+@dataclass
+class BulkCheckpoint:
+    """Punto di ripresa: tutte le righe prima di line/offset sono state elaborate ed emesse"""
+    line: int = 0
+    offset: int = 0
+    processed: int = 0
+    successful: int = 0
+    failed: int = 0
+
+def iter_ndjson_lines(stream: BinaryIO, start_offset: int = 0,
+                      max_line_bytes: int = MAX_LINE_BYTES) -> Iterator[Tuple[int, int, Optional[bytes]]]:
+    """Legge il flusso riga per riga: (offset di inizio, offset di fine, byte della riga o None se troppo lunga)"""
+    offset = start_offset
+    while True:
+        raw_line = stream.readline(max_line_bytes + 1)
+        if not raw_line:
+            return
+        line_start = offset
+        offset += len(raw_line)
+
+        if len(raw_line) > max_line_bytes and not raw_line.endswith(b"\n"):
+            # Consuma il resto della riga senza tenerla in memoria
+            while raw_line and not raw_line.endswith(b"\n"):
+                raw_line = stream.readline(max_line_bytes)
+                offset += len(raw_line)
+            yield line_start, offset, None
+            continue
+
+        yield line_start, offset, raw_line
+
+class BulkCategorizationStream:
+    """Elabora un feed NDJSON a blocchi, emettendo i risultati man mano che vengono calcolati"""
+
+    def __init__(self, engine: BatchCategorizationEngine, chunk_size: int = 500,
+                 sanitizer: Optional[Callable[[str, int], str]] = None):
+        self.engine = engine
+        self.chunk_size = max(1, chunk_size)
+        self.sanitizer = sanitizer or (lambda text, max_length: (text or "")[:max_length].strip())
+
+    def _parse_line(self, line_number: int, raw_line: Optional[bytes]) -> Any:
+        """Converte una riga in BatchItem oppure in un record di errore"""
+        if raw_line is None:
+            return self._error_record(line_number, None, f"Riga più lunga di {MAX_LINE_BYTES} byte")
+        try:
+            product = json.loads(raw_line)
+            if not isinstance(product, dict):
+                raise ValueError("ogni riga deve contenere un oggetto JSON")
+            title = self.sanitizer(product.get('titolo', ''), 200)
+            description = self.sanitizer(product.get('descrizione', ''), 2000)
+        except Exception as e:
+            return self._error_record(line_number, None, f"Riga non valida: {str(e)}")
+
+        if not title and not description:
+            return self._error_record(line_number, product.get('id'), 'Titolo o descrizione richiesti')
+        return BatchItem(index=line_number, title=title, description=description, product_id=product.get('id'))
+
+    @staticmethod
+    def _error_record(line_number: int, product_id: Any, error: str) -> Dict[str, Any]:
+        record = {'type': 'result', 'line': line_number, 'status': 'error', 'error': error}
+        if product_id is not None:
+            record['id'] = product_id
+        return record
+
+    def _process_chunk(self, entries: List[Any], current_tree: Optional[Dict[str, Any]],
+                       target_seo_keywords: Optional[List[str]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Categorizza un blocco e restituisce i record nell'ordine delle righe e l'albero risultante"""
+        items = [entry for entry in entries if isinstance(entry, BatchItem)]
+        batch_outcomes = self.engine.categorize(items, current_tree, target_seo_keywords)
+        outcomes = {outcome.index: outcome for outcome in batch_outcomes}
+
+        records = []
+        for entry in entries:
+            if not isinstance(entry, BatchItem):
+                records.append(entry)
+                continue
+            outcome = outcomes[entry.index]
+            if outcome.result is None:
+                records.append(self._error_record(entry.index, entry.product_id, outcome.error))
+                continue
+            result = outcome.result
+            record = {
+                'type': 'result',
+                'line': entry.index,
+                'categoria_principale': result.categoria_principale,
+                'sottocategoria': result.sottocategoria,
+                'tags_seo': result.tags_seo,
+                'confidence_score': result.confidence_score,
+                'is_new_category': result.is_new_category,
+                'status': 'success'
+            }
+            if entry.product_id is not None:
+                record['id'] = entry.product_id
+            records.append(record)
+        return records, self.engine.resulting_tree(batch_outcomes, current_tree)
+
+    def run(self, stream: BinaryIO, checkpoint: Optional[BulkCheckpoint] = None,
+            current_tree: Optional[Dict[str, Any]] = None,
+            target_seo_keywords: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Genera i record risultato, un checkpoint dopo ogni blocco e un riepilogo finale
+
+        Il flusso deve partire dall'offset del checkpoint: per riprendere un'elaborazione
+        interrotta si rinvia il feed a partire da checkpoint.offset.
+        """
+        checkpoint = checkpoint or BulkCheckpoint()
+        started = time.perf_counter()
+        processed_at_start = checkpoint.processed
+        line_number = checkpoint.line
+        entries: List[Any] = []
+        chunk_end = checkpoint.offset
+
+        def flush():
+            nonlocal current_tree
+            records, resulting_tree = self._process_chunk(entries, current_tree, target_seo_keywords)
+            for record in records:
+                checkpoint.processed += 1
+                if record['status'] == 'success':
+                    checkpoint.successful += 1
+                else:
+                    checkpoint.failed += 1
+                yield record
+            # Un albero fornito dalla richiesta passa al blocco successivo; quello condiviso si aggiorna da sé
+            if current_tree:
+                current_tree = resulting_tree
+            checkpoint.line = line_number
+            checkpoint.offset = chunk_end
+            elapsed = time.perf_counter() - started
+            yield {
+                'type': 'checkpoint',
+                **asdict(checkpoint),
+                'elapsed_seconds': round(elapsed, 3),
+                'products_per_second': round((checkpoint.processed - processed_at_start) / elapsed, 1) if elapsed > 0 else None
+            }
+            entries.clear()
+
+        for _, line_end, raw_line in iter_ndjson_lines(stream, checkpoint.offset):
+            if raw_line is not None and not raw_line.strip():
+                # Le righe vuote contano per la numerazione ma non producono record
+                line_number += 1
+                chunk_end = line_end
+                continue
+            entries.append(self._parse_line(line_number, raw_line))
+            line_number += 1
+            chunk_end = line_end
+            if len(entries) >= self.chunk_size:
+                yield from flush()
+
+        if entries:
+            yield from flush()
+        else:
+            checkpoint.line = line_number
+            checkpoint.offset = chunk_end
+
+        yield {
+            'type': 'summary',
+            **asdict(checkpoint),
+            'nuovo_albero': self.engine.resulting_tree([], current_tree),
+            'status': 'success'
+        }
+
+def iter_ndjson(records: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Serializza i record in righe NDJSON"""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+def _write_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    """Salva il checkpoint in modo atomico"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point a riga di comando"""
+    import argparse
+
+    from product_categorizer import ProductCategorizer
+    from config import config
+    from api import sanitize_input
+
+    parser = argparse.ArgumentParser(description="Categorizza un feed NDJSON di prodotti in streaming")
+    parser.add_argument("input", help="File NDJSON di input ('-' per stdin)")
+    parser.add_argument("-o", "--output", default="-", help="File NDJSON di output ('-' per stdout)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--checkpoint", help="File in cui salvare l'ultimo checkpoint (e l'albero) dopo ogni blocco")
+    parser.add_argument("--resume", action="store_true", help="Riprende dal file indicato con --checkpoint")
+    parser.add_argument("--keywords", nargs="*", default=None, help="Parole chiave SEO target")
+    parser.add_argument("--executor", choices=("process", "thread", "serial"),
+                        default=os.getenv("BATCH_EXECUTOR", "process"),
+                        help="Esecuzione dell'analisi (default: processi, fuori dal server conviene usare tutti i core)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    checkpoint = BulkCheckpoint()
+    current_tree: Dict[str, Any] = {}
+    output_mode = 'w'
+    if args.resume:
+        if not args.checkpoint or not os.path.exists(args.checkpoint):
+            parser.error("--resume richiede un file --checkpoint esistente")
+        if args.input == "-":
+            parser.error("--resume non è supportato con stdin")
+        with open(args.checkpoint, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        current_tree = saved.pop('nuovo_albero', {})
+        checkpoint = BulkCheckpoint(**{key: saved[key] for key in asdict(checkpoint)})
+        output_mode = 'a'
+
+    # L'albero salvato diventa l'albero condiviso del categorizzatore, aggiornato a ogni blocco
+    categorizer = ProductCategorizer()
+    categorizer.category_tree = current_tree
+    engine = BatchCategorizationEngine(categorizer, replace(config.batch, executor=args.executor))
+    bulk_stream = BulkCategorizationStream(engine, chunk_size=args.chunk_size, sanitizer=sanitize_input)
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, 'rb')
+    target = sys.stdout if args.output == "-" else open(args.output, output_mode, encoding='utf-8')
+    try:
+        if args.resume:
+            source.seek(checkpoint.offset)
+        for record in bulk_stream.run(source, checkpoint, None, args.keywords):
+            if record['type'] == 'result':
+                target.write(json.dumps(record, ensure_ascii=False) + "\n")
+                continue
+
+            # I risultati del blocco sono scritti prima di salvare il checkpoint
+            target.flush()
+            if record['type'] == 'summary':
+                logger.info(f"Completato: {record['successful']}/{record['processed']} prodotti categorizzati")
+            else:
+                logger.info(f"Elaborati {record['processed']} prodotti (riga {record['line']}, offset {record['offset']})")
+            if args.checkpoint:
+                _write_checkpoint(args.checkpoint, {
+                    **{key: record[key] for key in asdict(checkpoint)},
+                    'nuovo_albero': engine.categorizer.category_tree
+                })
+    finally:
+        engine.shutdown()
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Indice invertito parola chiave -> (categoria, sottocategoria, peso) per lo scoring delle categorie"""
+
+import json
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+from collections import defaultdict
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class CategoryPosting:
+    """Voce dell'indice: la parola chiave appartiene alla sottocategoria con un certo peso"""
+    category_id: str
+    subcategory_id: str
+    weight: int = 1
+
+class CategoryScores:
+    """Punteggi accumulati per categorie e sottocategorie di un singolo prodotto"""
+
+    def __init__(self, index: "CategoryKeywordIndex"):
+        self._index = index
+        self.category_scores: Dict[str, int] = defaultdict(int)
+        self.subcategory_scores: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, posting: CategoryPosting, count: int = 1) -> None:
+        """Accumula il contributo di una voce dell'indice"""
+        points = posting.weight * count
+        self.category_scores[posting.category_id] += points
+        self.subcategory_scores[posting.category_id][posting.subcategory_id] += points
+
+    def ranked_categories(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Categorie con punteggio > 0, ordinate per punteggio (a parità, ordine della tassonomia)"""
+        scored = [(category_id, score) for category_id, score in self.category_scores.items() if score > 0]
+        scored.sort(key=lambda item: (-item[1], self._index.category_position(item[0])))
+        return scored if limit is None else scored[:limit]
+
+    def subcategories_of(self, category_id: str) -> List[Tuple[str, int]]:
+        """Sottocategorie con punteggio > 0 nell'ordine della tassonomia"""
+        scores = self.subcategory_scores.get(category_id, {})
+        scored = [(subcategory_id, score) for subcategory_id, score in scores.items() if score > 0]
+        scored.sort(key=lambda item: self._index.subcategory_position(category_id, item[0]))
+        return scored
+
+class CategoryKeywordIndex:
+    """Indice invertito costruito una sola volta dalla tassonomia delle categorie"""
+
+    def __init__(self):
+        self._postings: Dict[str, List[CategoryPosting]] = defaultdict(list)
+        self._category_names: Dict[str, str] = {}
+        self._category_positions: Dict[str, int] = {}
+        self._subcategory_names: Dict[Tuple[str, str], str] = {}
+        self._subcategory_positions: Dict[Tuple[str, str], int] = {}
+
+    @classmethod
+    def from_category_config(cls, category_config: Dict[str, Any]) -> "CategoryKeywordIndex":
+        """Costruisce l'indice da una configurazione nel formato di ITALIAN_CATEGORY_CONFIG"""
+        index = cls()
+        for category_id, category_data in category_config.items():
+            index.add_category(category_id, category_data.get("main_category", category_id))
+            for subcategory_id, subcategory_data in category_data.get("subcategories", {}).items():
+                index.add_subcategory(
+                    category_id,
+                    subcategory_id,
+                    subcategory_data.get("name", subcategory_id),
+                    subcategory_data.get("keywords", [])
+                )
+        return index
+
+    @classmethod
+    def from_categories_file(cls, path: str) -> "CategoryKeywordIndex":
+        """Costruisce l'indice dal file data/italian_categories.json (lista piatta con id dei figli)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            categories = json.load(f)["categories"]
+
+        by_id = {category["id"]: category for category in categories}
+        index = cls()
+        for category in categories:
+            if not category.get("subcategories"):
+                continue
+            index.add_category(category["id"], category.get("name", category["id"]))
+            for subcategory_id in category["subcategories"]:
+                subcategory = by_id.get(subcategory_id, {})
+                index.add_subcategory(
+                    category["id"],
+                    subcategory_id,
+                    subcategory.get("name", subcategory_id),
+                    subcategory.get("keywords", [])
+                )
+        return index
+
+    def add_category(self, category_id: str, name: str) -> None:
+        """Registra una categoria principale"""
+        self._category_names.setdefault(category_id, name)
+        self._category_positions.setdefault(category_id, len(self._category_positions))
+
+    def add_subcategory(self, category_id: str, subcategory_id: str, name: str,
+                        keywords: Iterable[str], weight: int = 1) -> None:
+        """Registra una sottocategoria e indicizza le sue parole chiave"""
+        key = (category_id, subcategory_id)
+        self._subcategory_names.setdefault(key, name)
+        self._subcategory_positions.setdefault(key, len(self._subcategory_positions))
+
+        posting = CategoryPosting(category_id, subcategory_id, weight)
+        # Una parola chiave ripetuta nella stessa sottocategoria conta una volta sola
+        for keyword in dict.fromkeys(keywords):
+            self._postings[keyword].append(posting)
+
+    def items(self) -> Iterator[Tuple[str, List[CategoryPosting]]]:
+        """Coppie (parola chiave, voci) dell'indice"""
+        return iter(self._postings.items())
+
+    def category_ids(self) -> List[str]:
+        """Categorie principali nell'ordine della tassonomia"""
+        return sorted(self._category_positions, key=self._category_positions.__getitem__)
+
+    def subcategory_keys(self) -> List[Tuple[str, str]]:
+        """Coppie (categoria, sottocategoria) nell'ordine della tassonomia"""
+        return sorted(self._subcategory_positions, key=self._subcategory_positions.__getitem__)
+
+    def postings(self, keyword: str) -> List[CategoryPosting]:
+        """Restituisce le voci associate a una parola chiave"""
+        return self._postings.get(keyword, [])
+
+    def score_terms(self, term_counts: Iterable[Tuple[str, int]]) -> CategoryScores:
+        """Calcola i punteggi con una sola passata sui termini estratti"""
+        scores = CategoryScores(self)
+        for term, count in term_counts:
+            for posting in self._postings.get(term, ()):
+                scores.add(posting, count)
+        return scores
+
+    def category_name(self, category_id: str) -> str:
+        return self._category_names.get(category_id, category_id)
+
+    def subcategory_name(self, category_id: str, subcategory_id: str) -> str:
+        return self._subcategory_names.get((category_id, subcategory_id), subcategory_id)
+
+    def category_position(self, category_id: str) -> int:
+        return self._category_positions.get(category_id, len(self._category_positions))
+
+    def subcategory_position(self, category_id: str, subcategory_id: str) -> int:
+        return self._subcategory_positions.get((category_id, subcategory_id), len(self._subcategory_positions))
+
+    def __len__(self) -> int:
+        return len(self._postings)
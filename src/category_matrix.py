@@ -0,0 +1,163 @@
+"""Scoring delle categorie a matrici sparse: un prodotto per riga, un termine per colonna"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from src.category_index import CategoryKeywordIndex
+
+class CategoryScoringMatrix:
+    """Matrice termini x sottocategorie compilata dall'indice delle categorie
+
+    Un batch di prodotti diventa una matrice sparsa documenti x termini (conteggi); i punteggi
+    di sottocategorie e categorie di tutto il batch escono da due prodotti matriciali.
+    """
+
+    def __init__(self, index: CategoryKeywordIndex):
+        self.index = index
+        self.category_ids = index.category_ids()
+        self.subcategory_keys = index.subcategory_keys()
+        self._term_columns: Dict[str, int] = {}
+        self.category_positions = {category_id: position for position, category_id in enumerate(self.category_ids)}
+        category_positions = self.category_positions
+        subcategory_positions = {key: position for position, key in enumerate(self.subcategory_keys)}
+
+        rows, columns, weights = [], [], []
+        for term, postings in index.items():
+            term_column = self._term_columns.setdefault(term, len(self._term_columns))
+            for posting in postings:
+                rows.append(term_column)
+                columns.append(subcategory_positions[(posting.category_id, posting.subcategory_id)])
+                weights.append(posting.weight)
+        # Le voci duplicate (stessa parola chiave registrata più volte) vengono sommate
+        self.weights = sparse.csr_matrix(
+            (np.asarray(weights, dtype=np.int64), (np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64))),
+            shape=(len(self._term_columns), len(self.subcategory_keys))
+        )
+
+        # Sottocategoria -> categoria principale (matrice di appartenenza 0/1)
+        self.subcategory_category = np.fromiter(
+            (category_positions[category_id] for category_id, _ in self.subcategory_keys),
+            dtype=np.int64, count=len(self.subcategory_keys)
+        )
+        self.subcategory_parents = self.subcategory_category.tolist()
+        self.membership = sparse.csr_matrix(
+            (np.ones(len(self.subcategory_keys), dtype=np.int64),
+             (np.arange(len(self.subcategory_keys)), self.subcategory_category)),
+            shape=(len(self.subcategory_keys), len(self.category_ids))
+        )
+
+    @classmethod
+    def from_category_config(cls, category_config: Dict[str, Any]) -> "CategoryScoringMatrix":
+        """Compila la matrice da una configurazione nel formato di ITALIAN_CATEGORY_CONFIG"""
+        return cls(CategoryKeywordIndex.from_category_config(category_config))
+
+    @classmethod
+    def from_categories_file(cls, path: str) -> "CategoryScoringMatrix":
+        """Compila la matrice dal file data/italian_categories.json"""
+        return cls(CategoryKeywordIndex.from_categories_file(path))
+
+    @property
+    def term_count(self) -> int:
+        return len(self._term_columns)
+
+    def document_matrix(self, batch_term_counts: Sequence[Iterable[Tuple[str, int]]]) -> sparse.csr_matrix:
+        """Matrice sparsa documenti x termini; i termini fuori dall'indice vengono ignorati"""
+        columns = self._term_columns
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[int] = []
+        for term_counts in batch_term_counts:
+            for term, count in term_counts:
+                column = columns.get(term)
+                if column is not None and count:
+                    indices.append(column)
+                    counts.append(count)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.int64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(batch_term_counts), len(columns))
+        )
+
+    def score_batch(self, batch_term_counts: Sequence[Iterable[Tuple[str, int]]]) -> "BatchCategoryScores":
+        """Punteggi di sottocategorie e categorie per tutti i documenti del batch"""
+        documents = self.document_matrix(batch_term_counts)
+        subcategory_scores = (documents @ self.weights).tocsr()
+        category_scores = (subcategory_scores @ self.membership).tocsr()
+        return BatchCategoryScores(self, subcategory_scores, category_scores)
+
+class BatchCategoryScores:
+    """Punteggi sparsi di un batch; ogni riga si usa come i CategoryScores dell'indice"""
+
+    def __init__(self, matrix: CategoryScoringMatrix, subcategory_scores: sparse.csr_matrix,
+                 category_scores: sparse.csr_matrix):
+        self.matrix = matrix
+        self.subcategory_scores = subcategory_scores
+        self.category_scores = category_scores
+        self._ranked: Dict[Optional[int], List[List[Tuple[str, int]]]] = {}
+        self._subcategory_rows: Optional[Tuple[List[int], List[int], List[int]]] = None
+
+    def __len__(self) -> int:
+        return self.category_scores.shape[0]
+
+    def __getitem__(self, row: int) -> "MatrixCategoryScores":
+        return MatrixCategoryScores(self, row)
+
+    def __iter__(self):
+        return (MatrixCategoryScores(self, row) for row in range(len(self)))
+
+    def ranked(self, limit: Optional[int] = None) -> List[List[Tuple[str, int]]]:
+        """Prime `limit` categorie di ogni documento, selezionate per tutto il batch con argpartition"""
+        if limit not in self._ranked:
+            category_count = len(self.matrix.category_ids)
+            scores = self.category_scores.toarray()
+            # Chiave unica per riga: punteggio più alto prima, a parità la posizione più bassa
+            keys = scores * category_count + (category_count - 1 - np.arange(category_count))
+            if limit is not None and limit < category_count:
+                top = np.argpartition(-keys, limit - 1, axis=1)[:, :limit] if limit > 0 else keys[:, :0].astype(np.intp)
+            else:
+                top = np.broadcast_to(np.arange(category_count), keys.shape)
+            top = np.take_along_axis(top, np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1), axis=1)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+
+            category_ids = self.matrix.category_ids
+            self._ranked[limit] = [
+                [(category_ids[column], score) for column, score in zip(columns, row_scores) if score > 0]
+                for columns, row_scores in zip(top.tolist(), top_scores.tolist())
+            ]
+        return self._ranked[limit]
+
+    def subcategory_row(self, row: int) -> Tuple[List[int], List[int]]:
+        """Colonne (in ordine di tassonomia) e punteggi delle sottocategorie di un documento"""
+        if self._subcategory_rows is None:
+            scores = self.subcategory_scores
+            scores.sort_indices()
+            self._subcategory_rows = (scores.indptr.tolist(), scores.indices.tolist(), scores.data.tolist())
+        indptr, indices, data = self._subcategory_rows
+        start, end = indptr[row], indptr[row + 1]
+        return indices[start:end], data[start:end]
+
+class MatrixCategoryScores:
+    """Vista sui punteggi di un documento del batch (stessa interfaccia di CategoryScores)"""
+
+    def __init__(self, batch: BatchCategoryScores, row: int):
+        self._batch = batch
+        self._row = row
+
+    def ranked_categories(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Categorie con punteggio > 0, ordinate per punteggio (a parità, ordine della tassonomia)"""
+        return self._batch.ranked(limit)[self._row]
+
+    def subcategories_of(self, category_id: str) -> List[Tuple[str, int]]:
+        """Sottocategorie con punteggio > 0 nell'ordine della tassonomia"""
+        matrix = self._batch.matrix
+        category_position = matrix.category_positions.get(category_id)
+        parents = matrix.subcategory_parents
+        keys = matrix.subcategory_keys
+        columns, values = self._batch.subcategory_row(self._row)
+        return [
+            (keys[column][1], value)
+            for column, value in zip(columns, values)
+            if value > 0 and parents[column] == category_position
+        ]
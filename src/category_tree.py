@@ -0,0 +1,322 @@
+"""Albero delle categorie persistente: nodi immutabili con condivisione strutturale e versioni atomiche"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    from src.compact_taxonomy import CompactTaxonomy
+    from src.exceptions import TreePatchError, TreeVersionConflictError
+except ImportError:
+    from compact_taxonomy import CompactTaxonomy
+    from exceptions import TreePatchError, TreeVersionConflictError
+
+# Versioni recenti conservate per calcolare le modifiche rispetto a una versione del client
+DEFAULT_HISTORY_SIZE = 64
+
+class CategoryTreeNode(dict):
+    """Nodo immutabile dell'albero ({nome: nodo figlio})
+
+    È un dict a tutti gli effetti in lettura (confronti, serializzazione JSON, iterazione), ma non
+    può essere modificato: gli aggiornamenti creano un nuovo nodo per ogni livello del percorso
+    toccato e riusano tutti gli altri sottoalberi, così una snapshot resta valida per sempre.
+    """
+
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("CategoryTreeNode è immutabile: usare insert_path o freeze_tree")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __copy__(self) -> "CategoryTreeNode":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "CategoryTreeNode":
+        return self
+
+    def __reduce__(self):
+        return (CategoryTreeNode, (dict(self),))
+
+EMPTY_TREE = CategoryTreeNode()
+
+def freeze_tree(tree: Optional[Mapping[str, Any]]) -> CategoryTreeNode:
+    """Converte un albero annidato di dict in nodi immutabili (i nodi già immutabili vengono riusati)"""
+    if isinstance(tree, CategoryTreeNode):
+        return tree
+    if not tree:
+        return EMPTY_TREE
+    return CategoryTreeNode(
+        (name, freeze_tree(child) if isinstance(child, Mapping) else child)
+        for name, child in tree.items()
+    )
+
+def contains_path(tree: Mapping[str, Any], category_path: Iterable[str]) -> bool:
+    """Verifica se il percorso esiste già nell'albero"""
+    current: Any = tree
+    for category in category_path:
+        if not isinstance(current, Mapping) or category not in current:
+            return False
+        current = current[category]
+    return True
+
+def insert_path(tree: Mapping[str, Any], category_path: Iterable[str]) -> CategoryTreeNode:
+    """Restituisce un albero che contiene il percorso, copiando solo i nodi lungo il percorso
+
+    Se il percorso esiste già viene restituito lo stesso albero (nessuna allocazione).
+    """
+    root = freeze_tree(tree)
+    path = list(category_path)
+    if contains_path(root, path):
+        return root
+
+    # Nodi esistenti lungo il percorso, dalla radice al genitore del primo nodo mancante
+    ancestors = [root]
+    for category in path[:-1]:
+        child = ancestors[-1].get(category)
+        ancestors.append(child if isinstance(child, CategoryTreeNode) else EMPTY_TREE)
+
+    # Ricostruisce dal basso: il nuovo figlio sostituisce il vecchio in una copia del genitore
+    node = EMPTY_TREE
+    for category, parent in zip(reversed(path), reversed(ancestors)):
+        node = CategoryTreeNode({**parent, category: node})
+    return node
+
+def subtree_at(tree: Mapping[str, Any], category_path: Iterable[str]) -> Optional[Mapping[str, Any]]:
+    """Sottoalbero di un percorso, oppure None se il percorso non esiste"""
+    current: Any = tree
+    for category in category_path:
+        if not isinstance(current, Mapping) or category not in current:
+            return None
+        current = current[category]
+    return current if isinstance(current, Mapping) else EMPTY_TREE
+
+def truncate_tree(tree: Mapping[str, Any], depth: Optional[int]) -> Mapping[str, Any]:
+    """Albero limitato a depth livelli (i nodi dell'ultimo livello restano senza figli)
+
+    Con depth None l'albero viene restituito così com'è, senza copie.
+    """
+    if depth is None:
+        return tree
+    if depth <= 0 or not tree:
+        return EMPTY_TREE
+    return CategoryTreeNode(
+        (name, truncate_tree(child, depth - 1) if isinstance(child, Mapping) else child)
+        for name, child in tree.items()
+    )
+
+def pointer_to_path(pointer: str) -> List[str]:
+    """Converte un JSON Pointer ("/Ricambi Auto/Freni") nel percorso di categorie"""
+    if pointer == "":
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise TreePatchError(f"Percorso non valido: {pointer!r}")
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")]
+
+def path_to_pointer(category_path: Sequence[str]) -> str:
+    """Converte un percorso di categorie in JSON Pointer"""
+    return "".join("/" + category.replace("~", "~0").replace("/", "~1") for category in category_path)
+
+def diff_trees(before: Mapping[str, Any], after: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """Operazioni JSON Patch (remove/add) che portano da before ad after
+
+    I sottoalberi condivisi (stesso oggetto) vengono saltati, quindi tra due versioni dello
+    stesso albero il costo è proporzionale ai nodi modificati, non alla dimensione dell'albero.
+    """
+    operations: List[Dict[str, Any]] = []
+    stack: List[Tuple[Mapping[str, Any], Mapping[str, Any], List[str]]] = [(before, after, [])]
+    while stack:
+        old, new, path = stack.pop()
+        if old is new:
+            continue
+        for category in old:
+            if category not in new:
+                operations.append({"op": "remove", "path": path_to_pointer(path + [category])})
+        for category, child in new.items():
+            if category not in old:
+                operations.append({"op": "add", "path": path_to_pointer(path + [category]), "value": child})
+            elif old[category] is not child:
+                if isinstance(old[category], Mapping) and isinstance(child, Mapping):
+                    stack.append((old[category], child, path + [category]))
+                elif old[category] != child:
+                    operations.append({"op": "replace", "path": path_to_pointer(path + [category]), "value": child})
+    return operations
+
+def _get_at(tree: Mapping[str, Any], path: Sequence[str], operation: Dict[str, Any]) -> Any:
+    current: Any = tree
+    for category in path:
+        if not isinstance(current, Mapping) or category not in current:
+            raise TreePatchError(f"Percorso inesistente: {path_to_pointer(path)}", operation)
+        current = current[category]
+    return current
+
+def _set_at(tree: CategoryTreeNode, path: Sequence[str], value: Optional[CategoryTreeNode],
+            operation: Dict[str, Any]) -> CategoryTreeNode:
+    """Copia il percorso e imposta (o rimuove, con value None) l'ultimo elemento"""
+    parents = [tree]
+    for category in path[:-1]:
+        child = parents[-1].get(category)
+        if not isinstance(child, Mapping):
+            raise TreePatchError(f"Percorso inesistente: {path_to_pointer(path)}", operation)
+        parents.append(freeze_tree(child))
+
+    node = dict(parents[-1])
+    if value is None:
+        del node[path[-1]]
+    else:
+        node[path[-1]] = value
+    result = CategoryTreeNode(node)
+    for category, parent in zip(reversed(path[:-1]), reversed(parents[:-1])):
+        result = CategoryTreeNode({**parent, category: result})
+    return result
+
+def _patch_value(operation: Dict[str, Any]) -> CategoryTreeNode:
+    value = operation.get("value", {})
+    if value is None:
+        return EMPTY_TREE
+    if not isinstance(value, Mapping):
+        raise TreePatchError("Il valore deve essere un sottoalbero di categorie", operation)
+    return freeze_tree(value)
+
+def apply_patch(tree: Mapping[str, Any], operations: Iterable[Dict[str, Any]]) -> CategoryTreeNode:
+    """Applica operazioni in stile JSON Patch (add, remove, replace, move, copy, test)
+
+    Le operazioni sono atomiche: in caso di errore l'albero di partenza resta invariato
+    (non viene mai modificato) e viene sollevato TreePatchError.
+    """
+    result = freeze_tree(tree)
+    for operation in operations:
+        if not isinstance(operation, Mapping):
+            raise TreePatchError("Ogni operazione deve essere un oggetto JSON")
+        op = operation.get("op")
+        path = pointer_to_path(operation.get("path", ""))
+
+        if op == "test":
+            if _get_at(result, path, operation) != _patch_value(operation):
+                raise TreePatchError(f"Test non superato: {path_to_pointer(path)}", operation)
+            continue
+        if op in ("move", "copy"):
+            source = pointer_to_path(operation.get("from", ""))
+            if op == "move" and path[:len(source)] == source and path != source:
+                raise TreePatchError("Impossibile spostare una categoria al proprio interno", operation)
+            value = freeze_tree(_get_at(result, source, operation))
+            if op == "move" and source:
+                result = _set_at(result, source, None, operation)
+        elif op in ("add", "replace"):
+            value = _patch_value(operation)
+        elif op == "remove":
+            value = None
+        else:
+            raise TreePatchError(f"Operazione non supportata: {op!r}", operation)
+
+        if op in ("remove", "replace"):
+            _get_at(result, path, operation)
+        if not path:
+            if value is None:
+                raise TreePatchError("Impossibile rimuovere la radice", operation)
+            result = value
+        else:
+            result = _set_at(result, path, value, operation)
+    return result
+
+class VersionedCategoryTree:
+    """Riferimento condiviso all'ultima versione dell'albero, sostituita in modo atomico
+
+    Le letture non prendono lock: la coppia (versione, albero) è un'unica tupla e gli alberi sono
+    immutabili. Le scritture calcolano il nuovo albero fuori dal lock e lo pubblicano con un
+    compare-and-swap sulla versione, ripetendo il calcolo se nel frattempo un'altra richiesta
+    ha pubblicato una versione più recente.
+    """
+
+    def __init__(self, tree: Optional[Mapping[str, Any]] = None, history_size: int = DEFAULT_HISTORY_SIZE):
+        self._state: Tuple[int, CategoryTreeNode] = (0, freeze_tree(tree))
+        self._lock = threading.Lock()
+        self._taxonomy: Optional[Tuple[int, CompactTaxonomy]] = None
+        self._taxonomy_lock = threading.Lock()
+        self.history_size = history_size
+        self._history: "OrderedDict[int, CategoryTreeNode]" = OrderedDict([self._state])
+
+    @property
+    def version(self) -> int:
+        return self._state[0]
+
+    def snapshot(self) -> CategoryTreeNode:
+        """Albero dell'ultima versione pubblicata"""
+        return self._state[1]
+
+    def current(self) -> Tuple[int, CategoryTreeNode]:
+        """Versione e albero letti insieme"""
+        return self._state
+
+    def snapshot_at(self, version: int) -> Optional[CategoryTreeNode]:
+        """Albero di una versione recente, oppure None se non è più conservata"""
+        return self._history.get(version)
+
+    def changes_since(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """Operazioni JSON Patch dalla versione indicata all'ultima (None se la versione non è disponibile)"""
+        current_version, tree = self._state
+        if version == current_version:
+            return []
+        before = self.snapshot_at(version)
+        if before is None:
+            return None
+        return diff_trees(before, tree)
+
+    def _publish(self, version: int, tree: CategoryTreeNode) -> None:
+        """Pubblica una nuova versione e la aggiunge alla cronologia (con il lock acquisito)"""
+        self._state = (version, tree)
+        self._history[version] = tree
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+
+    def taxonomy(self) -> CompactTaxonomy:
+        """Tassonomia compatta dell'ultima versione, costruita una volta per versione
+
+        Costa O(nodi): serve alle letture sull'intero albero, non al percorso di categorizzazione,
+        che resta su contains_path/insert_path (O(profondità)).
+        """
+        version, tree = self._state
+        cached = self._taxonomy
+        if cached is None or cached[0] != version:
+            # Un solo thread ricostruisce, gli altri attendono e riusano il risultato
+            with self._taxonomy_lock:
+                cached = self._taxonomy
+                if cached is None or cached[0] != version:
+                    cached = self._taxonomy = (version, CompactTaxonomy.from_dict(tree))
+        return cached[1]
+
+    def compare_and_swap(self, expected_version: int, tree: Mapping[str, Any]) -> bool:
+        """Pubblica l'albero solo se la versione corrente è ancora quella attesa"""
+        tree = freeze_tree(tree)
+        with self._lock:
+            version, current = self._state
+            if version != expected_version:
+                return False
+            if tree is not current:
+                self._publish(version + 1, tree)
+            return True
+
+    def replace(self, tree: Optional[Mapping[str, Any]]) -> int:
+        """Sostituisce l'albero incondizionatamente e restituisce la nuova versione"""
+        tree = freeze_tree(tree)
+        with self._lock:
+            version = self._state[0] + 1
+            self._publish(version, tree)
+            return version
+
+    def update(self, change: Callable[[CategoryTreeNode], CategoryTreeNode],
+               expected_version: Optional[int] = None) -> Tuple[CategoryTreeNode, CategoryTreeNode, int]:
+        """Applica una modifica all'ultima versione e restituisce (albero precedente, albero pubblicato, versione)
+
+        Con expected_version la modifica si applica solo a quella versione (TreeVersionConflictError altrimenti).
+        """
+        while True:
+            version, before = self._state
+            if expected_version is not None and version != expected_version:
+                raise TreeVersionConflictError(
+                    f"L'albero è alla versione {version}, attesa {expected_version}", expected_version, version
+                )
+            after = freeze_tree(change(before))
+            if self.compare_and_swap(version, after):
+                return before, after, version if after is before else version + 1
@@ -0,0 +1,265 @@
+"""Tassonomia compatta: l'albero delle categorie in array di interi, per alberi da milioni di nodi"""
+
+import hashlib
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Nodo assente (radice virtuale, nessun figlio, nessun fratello)
+NO_NODE = -1
+
+# Hash dei percorsi: FNV-1a a 64 bit sugli hash dei nomi
+_PATH_HASH_OFFSET = np.uint64(0xCBF29CE484222325)
+_PATH_HASH_PRIME = np.uint64(0x100000001B3)
+
+def _name_hash(name: str) -> int:
+    """Hash stabile a 64 bit di un nome di categoria (indipendente da PYTHONHASHSEED)"""
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+class CompactTaxonomy:
+    """Albero delle categorie in array paralleli, numerato in pre-ordine
+
+    Ogni nodo è un intero: parent, first_child e next_sibling descrivono la struttura, name_id
+    punta alla tabella dei nomi (ogni nome distinto è memorizzato una volta), depth è la
+    profondità (0 per le categorie principali) e subtree_end delimita il sottoalbero, che
+    occupa gli ID [nodo, subtree_end[nodo]): un test di discendenza è un confronto di interi.
+    I percorsi si risolvono con una ricerca binaria sugli hash ordinati dei percorsi.
+    """
+
+    def __init__(self, names: List[str], name_ids: Sequence[int], parents: Sequence[int]):
+        """Costruisce la tassonomia da nomi e genitori di nodi già in pre-ordine"""
+        # Tabella dei nomi: un solo buffer UTF-8 con gli offset, ricercabile per hash
+        encoded = [name.encode("utf-8") for name in names]
+        self.name_data = b"".join(encoded)
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        self.name_offsets = offsets.astype(np.int32) if len(self.name_data) < 2 ** 31 else offsets
+        name_hashes = np.fromiter((_name_hash(name) for name in names), dtype=np.uint64, count=len(names))
+        self._name_order = np.argsort(name_hashes, kind="stable").astype(np.int32)
+        self._sorted_name_hashes = name_hashes[self._name_order]
+
+        node_count = len(parents)
+        self.name_id = np.asarray(name_ids, dtype=np.int32)
+        self.parent = np.asarray(parents, dtype=np.int32)
+
+        # Profondità e fine del sottoalbero (i genitori precedono sempre i figli)
+        depth = np.zeros(node_count, dtype=np.int32)
+        subtree_end = np.arange(1, node_count + 1, dtype=np.int32)
+        parent_list = self.parent.tolist()
+        depth_list = depth.tolist()
+        for node, parent in enumerate(parent_list):
+            if parent != NO_NODE:
+                depth_list[node] = depth_list[parent] + 1
+        end_list = subtree_end.tolist()
+        for node in range(node_count - 1, -1, -1):
+            parent = parent_list[node]
+            if parent != NO_NODE and end_list[node] > end_list[parent]:
+                end_list[parent] = end_list[node]
+        max_depth = max(depth_list, default=0)
+        self.depth = np.asarray(depth_list, dtype=np.int8 if max_depth < 128 else np.int32)
+        self.subtree_end = np.asarray(end_list, dtype=np.int32)
+
+        # Primo figlio e fratello successivo derivano dal pre-ordine
+        nodes = np.arange(node_count, dtype=np.int32)
+        has_children = self.subtree_end > nodes + 1
+        self.first_child = np.where(has_children, nodes + 1, NO_NODE).astype(np.int32)
+        next_node = self.subtree_end
+        same_parent = np.zeros(node_count, dtype=bool)
+        in_range = next_node < node_count
+        same_parent[in_range] = self.parent[next_node[in_range]] == self.parent[in_range]
+        self.next_sibling = np.where(same_parent, next_node, NO_NODE).astype(np.int32)
+
+        # Indice hash del percorso -> nodo, calcolato un livello alla volta
+        path_hash = np.zeros(node_count, dtype=np.uint64)
+        depth_values = self.depth
+        with np.errstate(over="ignore"):
+            for level in range(max_depth + 1 if node_count else 0):
+                level_nodes = np.flatnonzero(depth_values == level)
+                parent_hash = (np.full(len(level_nodes), _PATH_HASH_OFFSET, dtype=np.uint64) if level == 0
+                               else path_hash[self.parent[level_nodes]])
+                path_hash[level_nodes] = (parent_hash ^ name_hashes[self.name_id[level_nodes]]) * _PATH_HASH_PRIME
+        order = np.argsort(path_hash, kind="stable")
+        self.path_hashes = path_hash[order]
+        self.path_nodes = order.astype(np.int32)
+
+    @classmethod
+    def from_dict(cls, tree: Optional[Mapping[str, Any]]) -> "CompactTaxonomy":
+        """Converte un albero annidato {nome: {figlio: {...}}} (i valori non dict sono foglie)"""
+        names: List[str] = []
+        name_index: Dict[str, int] = {}
+        name_ids: List[int] = []
+        parents: List[int] = []
+
+        stack = [(iter(tree.items()) if tree else iter(()), NO_NODE)]
+        while stack:
+            children, parent = stack[-1]
+            entry = next(children, None)
+            if entry is None:
+                stack.pop()
+                continue
+            name, subtree = entry
+            name_id = name_index.get(name)
+            if name_id is None:
+                name_id = name_index[name] = len(names)
+                names.append(name)
+            node = len(parents)
+            name_ids.append(name_id)
+            parents.append(parent)
+            if isinstance(subtree, Mapping) and subtree:
+                stack.append((iter(subtree.items()), node))
+
+        return cls(names, name_ids, parents)
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[Sequence[str]]) -> "CompactTaxonomy":
+        """Costruisce la tassonomia da un elenco di percorsi"""
+        tree: Dict[str, Any] = {}
+        for path in paths:
+            current = tree
+            for category in path:
+                current = current.setdefault(category, {})
+        return cls.from_dict(tree)
+
+    @classmethod
+    def from_category_config(cls, category_config: Dict[str, Any]) -> "CompactTaxonomy":
+        """Tassonomia di una configurazione nel formato di ITALIAN_CATEGORY_CONFIG (categoria > sottocategorie)"""
+        tree = {
+            category_data.get("main_category", category_id): {
+                subcategory.get("name", subcategory_id): {}
+                for subcategory_id, subcategory in category_data.get("subcategories", {}).items()
+            }
+            for category_id, category_data in category_config.items()
+        }
+        return cls.from_dict(tree)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Albero annidato equivalente (stesso ordine dei figli), per le API e la serializzazione"""
+        tree: Dict[str, Any] = {}
+        names = self.names()
+        # Dict di ogni nodo, creato quando si incontra il nodo (il genitore è sempre già presente)
+        node_dicts: List[Dict[str, Any]] = []
+        for name_id, parent in zip(self.name_id.tolist(), self.parent.tolist()):
+            children: Dict[str, Any] = {}
+            (tree if parent == NO_NODE else node_dicts[parent])[names[name_id]] = children
+            node_dicts.append(children)
+        return tree
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria occupata dagli array e dalla tabella dei nomi"""
+        arrays = (self.parent, self.first_child, self.next_sibling, self.name_id, self.depth, self.subtree_end,
+                  self.path_hashes, self.path_nodes, self.name_offsets, self._name_order, self._sorted_name_hashes)
+        return len(self.name_data) + sum(array.nbytes for array in arrays)
+
+    @property
+    def name_count(self) -> int:
+        """Numero di nomi distinti"""
+        return len(self.name_offsets) - 1
+
+    def name_of(self, name_id: int) -> str:
+        """Nome dalla tabella dei nomi"""
+        return self.name_data[self.name_offsets[name_id]:self.name_offsets[name_id + 1]].decode("utf-8")
+
+    def names(self) -> List[str]:
+        """Tutti i nomi distinti, indicizzati per name_id"""
+        offsets = self.name_offsets.tolist()
+        data = self.name_data
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    def name_id_of(self, name: str) -> int:
+        """ID di un nome, oppure NO_NODE se il nome non compare nell'albero"""
+        name_hash = _name_hash(name)
+        position = int(np.searchsorted(self._sorted_name_hashes, np.uint64(name_hash)))
+        while position < len(self._sorted_name_hashes) and int(self._sorted_name_hashes[position]) == name_hash:
+            name_id = int(self._name_order[position])
+            if self.name_of(name_id) == name:
+                return name_id
+            position += 1
+        return NO_NODE
+
+    def name(self, node: int) -> str:
+        return self.name_of(int(self.name_id[node]))
+
+    def path(self, node: int) -> List[str]:
+        """Percorso dalla categoria principale al nodo"""
+        path = []
+        while node != NO_NODE:
+            path.append(self.name(node))
+            node = int(self.parent[node])
+        path.reverse()
+        return path
+
+    def roots(self) -> Iterator[int]:
+        """Categorie principali"""
+        return self._siblings(0 if len(self) else NO_NODE)
+
+    def children(self, node: int) -> Iterator[int]:
+        """Figli diretti di un nodo, nell'ordine originale"""
+        return self._siblings(int(self.first_child[node]))
+
+    def _siblings(self, node: int) -> Iterator[int]:
+        while node != NO_NODE:
+            yield node
+            node = int(self.next_sibling[node])
+
+    def subtree(self, node: int) -> range:
+        """ID dei nodi del sottoalbero (il nodo stesso compreso)"""
+        return range(node, int(self.subtree_end[node]))
+
+    def is_ancestor(self, ancestor: int, node: int) -> bool:
+        """Verifica in O(1) se ancestor è il nodo stesso o un suo antenato"""
+        return ancestor <= node < self.subtree_end[ancestor]
+
+    def find(self, path: Sequence[str]) -> int:
+        """Nodo del percorso, oppure NO_NODE"""
+        node = NO_NODE
+        for node in self._prefix_nodes(path):
+            if node == NO_NODE:
+                break
+        return node
+
+    def __contains__(self, path: Sequence[str]) -> bool:
+        return bool(path) and self.find(path) != NO_NODE
+
+    def matched_depth(self, path: Sequence[str]) -> int:
+        """Numero di elementi iniziali del percorso presenti nell'albero"""
+        depth = 0
+        for node in self._prefix_nodes(path):
+            if node == NO_NODE:
+                break
+            depth += 1
+        return depth
+
+    def _prefix_nodes(self, path: Sequence[str]) -> Iterator[int]:
+        """Nodo di ogni prefisso del percorso (NO_NODE dal primo prefisso mancante)"""
+        path_hash = int(_PATH_HASH_OFFSET)
+        parent = NO_NODE
+        for category in path:
+            name_id = self.name_id_of(category)
+            if name_id == NO_NODE:
+                yield NO_NODE
+                return
+            path_hash = ((path_hash ^ _name_hash(category)) * int(_PATH_HASH_PRIME)) & 0xFFFFFFFFFFFFFFFF
+            node = self._lookup_hash(path_hash, parent, name_id)
+            if node == NO_NODE:
+                yield NO_NODE
+                return
+            yield node
+            parent = node
+
+    def _lookup_hash(self, path_hash: int, parent: int, name_id: int) -> int:
+        """Cerca l'hash del percorso e verifica genitore e nome (gestisce le collisioni)"""
+        position = int(np.searchsorted(self.path_hashes, np.uint64(path_hash)))
+        while position < len(self.path_hashes) and int(self.path_hashes[position]) == path_hash:
+            node = int(self.path_nodes[position])
+            if self.parent[node] == parent and self.name_id[node] == name_id:
+                return node
+            position += 1
+        return NO_NODE
+
+    def nodes_named(self, name_ids: Iterable[int]) -> np.ndarray:
+        """Nodi (in pre-ordine) il cui nome è tra quelli indicati"""
+        return np.flatnonzero(np.isin(self.name_id, np.fromiter(name_ids, dtype=np.int32)))
@@ -37,9 +37,32 @@ class CacheConfig:
     enabled: bool = True
     ttl_seconds: int = 3600  # 1 ora
     max_size: int = 1000
+    max_bytes: Optional[int] = None  # Limite di memoria della cache in processo (None = solo max_size)
     cache_type: str = "memory"  # "memory" o "redis"
     redis_url: Optional[str] = None
 
+@dataclass
+class BatchConfig:
+    """Configurazione per l'elaborazione batch"""
+    executor: str = "thread"  # "thread" nell'API servita, "process" per CLI e job batch, o "serial"
+    max_workers: Optional[int] = None  # None = numero di core
+    chunk_size: int = 8
+    min_parallel_items: int = 16  # Sotto questa soglia si elabora in serie
+
+@dataclass
+class ServerConfig:
+    """Configurazione del server di produzione (master + worker pre-fork)"""
+    workers: Optional[int] = None  # None = numero di core
+    threads: int = 1  # Thread per worker (>1 usa worker gthread)
+    backlog: int = 2048
+    keepalive: int = 5  # Secondi
+    timeout: int = 30  # Secondi prima di riavviare un worker bloccato
+    graceful_timeout: int = 30
+    max_requests: int = 0  # Riavvia il worker dopo N richieste (0 = mai)
+    max_requests_jitter: int = 0
+    mode: str = "wsgi"  # "wsgi" (thread per richiesta) o "asgi" (event loop + WSGIMiddleware di uvicorn)
+    async_threads: int = 32  # Thread per processo che eseguono l'app WSGI in ASGI (concorrenza, non parallelismo)
+
 class Config:
     """Configurazione principale del sistema"""
     
@@ -48,6 +71,8 @@ class Config:
         self.seo = SEOConfig()
         self.api = APIConfig()
         self.cache = CacheConfig()
+        self.batch = BatchConfig()
+        self.server = ServerConfig()
         
         # Carica configurazioni da variabili d'ambiente
         self._load_from_env()
@@ -76,8 +101,27 @@ class Config:
         # Cache Config
         self.cache.enabled = os.getenv("CACHE_ENABLED", "true").lower() == "true"
         self.cache.redis_url = os.getenv("REDIS_URL")
+        if os.getenv("CACHE_MAX_BYTES"):
+            self.cache.max_bytes = int(os.getenv("CACHE_MAX_BYTES"))
         if self.cache.redis_url:
             self.cache.cache_type = "redis"
+        
+        # Batch Config
+        self.batch.executor = os.getenv("BATCH_EXECUTOR", self.batch.executor)
+        if os.getenv("BATCH_WORKERS"):
+            self.batch.max_workers = int(os.getenv("BATCH_WORKERS"))
+        self.batch.chunk_size = int(os.getenv("BATCH_CHUNK_SIZE", self.batch.chunk_size))
+        
+        # Server Config
+        if os.getenv("SERVER_WORKERS"):
+            self.server.workers = int(os.getenv("SERVER_WORKERS"))
+        self.server.threads = int(os.getenv("SERVER_THREADS", self.server.threads))
+        self.server.backlog = int(os.getenv("SERVER_BACKLOG", self.server.backlog))
+        self.server.keepalive = int(os.getenv("SERVER_KEEPALIVE", self.server.keepalive))
+        self.server.timeout = int(os.getenv("SERVER_TIMEOUT", self.server.timeout))
+        self.server.max_requests = int(os.getenv("SERVER_MAX_REQUESTS", self.server.max_requests))
+        self.server.mode = os.getenv("SERVER_MODE", self.server.mode)
+        self.server.async_threads = int(os.getenv("ASYNC_THREADS", self.server.async_threads))
     
     def _get_automotive_config(self) -> Dict:
         """Configurazioni specifiche per il settore automotive"""
@@ -201,6 +245,19 @@ class Config:
             "timeout_seconds": 30,
             "retry_attempts": 3,
             "memory_limit_mb": 512,
+            "batch_executor": self.batch.executor,
+            "batch_max_workers": self.batch.max_workers or os.cpu_count(),
+            "batch_chunk_size": self.batch.chunk_size,
+            "server_workers": self.server.workers or os.cpu_count() or 1,
+            "server_threads": self.server.threads,
+            "server_backlog": self.server.backlog,
+            "server_keepalive": self.server.keepalive,
+            "server_timeout": self.server.timeout,
+            "server_graceful_timeout": self.server.graceful_timeout,
+            "server_max_requests": self.server.max_requests,
+            "server_max_requests_jitter": self.server.max_requests_jitter,
+            "server_mode": self.server.mode,
+            "async_threads": self.server.async_threads,
             "enable_profiling": self.api.debug,
             "log_level": "DEBUG" if self.api.debug else "INFO"
         }
@@ -226,6 +283,20 @@ class Config:
         if not 1024 <= self.api.port <= 65535:
             errors.append("port deve essere tra 1024 e 65535")
         
+        # Valida batch
+        if self.batch.executor not in ("process", "thread", "serial"):
+            errors.append("batch executor deve essere 'process', 'thread' o 'serial'")
+        
+        # Valida server
+        if self.server.workers is not None and self.server.workers < 1:
+            errors.append("server workers deve essere >= 1")
+        if self.server.threads < 1:
+            errors.append("server threads deve essere >= 1")
+        if self.server.mode not in ("wsgi", "asgi"):
+            errors.append("server mode deve essere 'wsgi' o 'asgi'")
+        if self.server.async_threads < 1:
+            errors.append("async threads deve essere >= 1")
+        
         return errors
     
     def to_dict(self) -> Dict:
@@ -258,8 +329,27 @@ class Config:
                 "enabled": self.cache.enabled,
                 "ttl_seconds": self.cache.ttl_seconds,
                 "max_size": self.cache.max_size,
+                "max_bytes": self.cache.max_bytes,
                 "cache_type": self.cache.cache_type,
                 "redis_url": self.cache.redis_url
+            },
+            "batch": {
+                "executor": self.batch.executor,
+                "max_workers": self.batch.max_workers,
+                "chunk_size": self.batch.chunk_size,
+                "min_parallel_items": self.batch.min_parallel_items
+            },
+            "server": {
+                "workers": self.server.workers,
+                "threads": self.server.threads,
+                "backlog": self.server.backlog,
+                "keepalive": self.server.keepalive,
+                "timeout": self.server.timeout,
+                "graceful_timeout": self.server.graceful_timeout,
+                "max_requests": self.server.max_requests,
+                "max_requests_jitter": self.server.max_requests_jitter,
+                "mode": self.server.mode,
+                "async_threads": self.server.async_threads
             }
         }
 
@@ -63,4 +63,19 @@ class ConfigurationError(ProductCategorizerError):
     def __init__(self, message: str, config_key: str = None):
         super().__init__(message, "CONFIGURATION_ERROR")
         self.config_key = config_key
-        self.details = {"config_key": config_key}
\ No newline at end of file
+        self.details = {"config_key": config_key}
+
+class TreePatchError(ProductCategorizerError):
+    """Errore nell'applicazione di una modifica all'albero delle categorie"""
+    def __init__(self, message: str, operation: dict = None):
+        super().__init__(message, "TREE_PATCH_ERROR")
+        self.operation = operation
+        self.details = {"operation": operation}
+
+class TreeVersionConflictError(ProductCategorizerError):
+    """Errore quando l'albero è cambiato rispetto alla versione attesa"""
+    def __init__(self, message: str, expected_version: int = None, current_version: int = None):
+        super().__init__(message, "TREE_VERSION_CONFLICT")
+        self.expected_version = expected_version
+        self.current_version = current_version
+        self.details = {"expected_version": expected_version, "current_version": current_version}
@@ -0,0 +1,209 @@
+"""Motore di estrazione a passata singola: tutti i pattern dell'analisi prodotto in un'unica regex"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Gruppi nominati dello scanner combinato
+TERM_GROUP = "term"
+NUMBER_GROUP = "number"
+
+@dataclass(frozen=True)
+class TermRule:
+    """Valore associato a un letterale per un campo dell'analisi"""
+    field: str
+    value: Any
+    priority: int
+    word_bounded: bool = False
+
+@dataclass
+class ScanResult:
+    """Occorrenze trovate in una passata: per campo (posizione, priorità, valore) e numeri isolati"""
+    hits: Dict[str, List[Tuple[int, int, Any]]] = field(default_factory=dict)
+    numbers: List[str] = field(default_factory=list)
+
+    def first_by_priority(self, field_name: str) -> Optional[Any]:
+        """Valore del pattern con priorità più alta che compare nel testo (prima occorrenza)"""
+        hits = self.hits.get(field_name)
+        if not hits:
+            return None
+        return min(hits, key=lambda hit: (hit[1], hit[0]))[2]
+
+    def values(self, field_name: str) -> List[Any]:
+        """Valori distinti trovati per il campo, in ordine di priorità"""
+        found = {}
+        for _, priority, value in self.hits.get(field_name, ()):
+            found.setdefault(value, priority)
+        return sorted(found, key=found.get)
+
+    def __contains__(self, field_name: str) -> bool:
+        return bool(self.hits.get(field_name))
+
+def expand_pattern(pattern: str) -> Tuple[List[str], bool]:
+    """Espande un pattern a linguaggio finito nei suoi letterali
+
+    Supporta caratteri letterali, classi [..], gruppi (a|b), il quantificatore ? e \\s;
+    \\b è ammesso solo all'inizio e alla fine. Restituisce i letterali e se sono delimitati da \\b.
+    """
+    word_bounded = pattern.startswith(r"\b") and pattern.endswith(r"\b")
+    body = pattern[2:-2] if word_bounded else pattern
+    literals, position = _expand_sequence(body, 0, pattern)
+    if position != len(body):
+        raise ValueError(f"Pattern non supportato dal motore di estrazione: {pattern!r}")
+    return literals, word_bounded
+
+def _expand_sequence(body: str, position: int, pattern: str) -> Tuple[List[str], int]:
+    """Espande una sequenza di atomi fino a '|' o ')'"""
+    results = [""]
+    while position < len(body) and body[position] not in "|)":
+        options, position = _expand_atom(body, position, pattern)
+        if position < len(body) and body[position] == "?":
+            options = options + [""]
+            position += 1
+        results = [prefix + option for prefix in results for option in options]
+    return results, position
+
+def _expand_atom(body: str, position: int, pattern: str) -> Tuple[List[str], int]:
+    """Espande un singolo atomo: carattere, escape, classe o gruppo"""
+    char = body[position]
+    if char == "[":
+        end = body.index("]", position)
+        members = body[position + 1:end]
+        if not members or "-" in members or "^" in members or "\\" in members:
+            raise ValueError(f"Classe non supportata dal motore di estrazione: {pattern!r}")
+        return list(members), end + 1
+    if char == "(":
+        alternatives = []
+        position += 1
+        while True:
+            options, position = _expand_sequence(body, position, pattern)
+            alternatives.extend(options)
+            if position >= len(body):
+                raise ValueError(f"Gruppo non chiuso nel pattern: {pattern!r}")
+            if body[position] == ")":
+                return alternatives, position + 1
+            position += 1
+    if char == "\\":
+        escaped = body[position + 1:position + 2]
+        if escaped == "s":
+            # Il testo normalizzato ha solo spazi singoli come separatori
+            return [" "], position + 2
+        if escaped and not escaped.isalnum():
+            return [escaped], position + 2
+        raise ValueError(f"Escape non supportato dal motore di estrazione: {pattern!r}")
+    if char in ".*+{}^$":
+        raise ValueError(f"Metacarattere non supportato dal motore di estrazione: {pattern!r}")
+    return [char], position + 1
+
+class ExtractionEngine:
+    """Scanner precompilato che trova in una sola passata i letterali di tutti i campi e i numeri isolati
+
+    A ogni posizione vince il letterale più lungo; le occorrenze sovrapposte che la regex
+    consumerebbe (prefissi e letterali contenuti in quello trovato) vengono ricavate da una tabella
+    precalcolata, e la scansione riprende dentro il letterale solo dove un altro letterale potrebbe
+    iniziare e proseguire oltre la sua fine.
+    """
+
+    def __init__(self):
+        self._rules: Dict[str, List[TermRule]] = {}
+        # letterale trovato -> (regola, scostamento, lunghezza) delle occorrenze che implica
+        self._implied: Dict[str, Tuple[Tuple[TermRule, int, int], ...]] = {}
+        # letterale trovato -> scostamento da cui riprendere la scansione
+        self._resume: Dict[str, int] = {}
+        self._scanner: Optional[re.Pattern] = None
+
+    def add_literal(self, field_name: str, literal: str, value: Any, priority: int = 0,
+                    word_bounded: bool = False) -> None:
+        """Registra un letterale per un campo"""
+        if self._scanner is not None:
+            raise RuntimeError("Impossibile aggiungere letterali a un motore già compilato")
+        if not literal:
+            return
+        if any(char.isdigit() for char in literal):
+            # Le cifre sono riservate al gruppo dei numeri
+            raise ValueError(f"I letterali non possono contenere cifre: {literal!r}")
+        self._rules.setdefault(literal, []).append(TermRule(field_name, value, priority, word_bounded))
+
+    def add_pattern(self, field_name: str, pattern: str, value: Any, priority: int = 0,
+                    ignore_case: bool = False) -> None:
+        """Registra tutti i letterali di un pattern a linguaggio finito"""
+        literals, word_bounded = expand_pattern(pattern)
+        for literal in literals:
+            self.add_literal(field_name, literal.lower() if ignore_case else literal, value, priority, word_bounded)
+
+    def build(self) -> "ExtractionEngine":
+        """Compila lo scanner combinato e la tabella dei prefissi"""
+        literals = sorted(self._rules, key=lambda literal: (-len(literal), literal))
+        for literal in literals:
+            resume = next(
+                (offset for offset in range(1, len(literal))
+                 if any(other.startswith(literal[offset:]) and len(other) > len(literal) - offset
+                        for other in literals)),
+                len(literal)
+            )
+            self._resume[literal] = resume
+            self._implied[literal] = tuple(
+                (rule, offset, len(other))
+                for offset in range(resume)
+                for other in literals if literal.startswith(other, offset)
+                for rule in self._rules[other]
+            )
+        alternatives = _trie_regex(literals) if literals else r"(?!)"
+        self._scanner = re.compile(rf"(?P<{NUMBER_GROUP}>\b\d+\b)|(?P<{TERM_GROUP}>{alternatives})")
+        return self
+
+    def scan(self, text: str) -> ScanResult:
+        """Scansiona il testo normalizzato una sola volta"""
+        if self._scanner is None:
+            self.build()
+
+        result = ScanResult()
+        hits = result.hits
+        text_length = len(text)
+        search = self._scanner.search
+        match = search(text)
+        while match is not None:
+            number = match.group(NUMBER_GROUP)
+            if number is not None:
+                result.numbers.append(number)
+                match = search(text, match.end())
+                continue
+            start = match.start()
+            term = match.group(TERM_GROUP)
+            for rule, offset, length in self._implied[term]:
+                position = start + offset
+                if rule.word_bounded and not _is_word_bounded(text, position, position + length, text_length):
+                    continue
+                hits.setdefault(rule.field, []).append((position, rule.priority, rule.value))
+            match = search(text, start + self._resume[term])
+        return result
+
+def _is_word_bounded(text: str, start: int, end: int, text_length: int) -> bool:
+    """Equivalente di \\b...\\b per un'occorrenza (caratteri di parola: alfanumerici e _)"""
+    if start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_"):
+        return False
+    if end < text_length and (text[end].isalnum() or text[end] == "_"):
+        return False
+    return True
+
+def _trie_regex(literals: List[str]) -> str:
+    """Regex ad albero dei prefissi: a ogni posizione il motore scarta subito i rami che non iniziano col carattere letto"""
+    trie: Dict[str, Any] = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def render(node: Dict[str, Any]) -> str:
+        # I rami più lunghi vengono prima: a parità di posizione vince il letterale più lungo
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        if "" in node:
+            branches.append("")
+        return "(?:" + "|".join(branches) + ")"
+
+    return render(trie)
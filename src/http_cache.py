@@ -0,0 +1,145 @@
+"""Risposte condizionali per gli endpoint delle categorie: ETag, 304 e corpi pre-compressi per versione"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codifiche in ordine di preferenza a parità di qualità richiesta dal client
+PREFERRED_ENCODINGS = ("zstd", "gzip")
+# Sotto questa dimensione la compressione non conviene
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+# Rappresentazioni (query diverse) conservate per la versione corrente
+MAX_REPRESENTATIONS = 64
+
+@dataclass
+class EncodedBody:
+    """Corpo JSON serializzato una volta, con le sue versioni compresse"""
+    etag: str
+    bodies: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag_for(self, encoding: str) -> str:
+        """ETag forte della singola codifica (le codifiche hanno byte diversi)"""
+        return self.etag if encoding == "identity" else f'{self.etag[:-1]}-{encoding}"'
+
+def compress_body(body: bytes, min_size: int = MIN_COMPRESS_SIZE) -> Dict[str, bytes]:
+    """Corpo originale e compresso con le codifiche disponibili (zstd solo se installato)"""
+    bodies = {"identity": body}
+    if len(body) < min_size:
+        return bodies
+    bodies["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if zstandard is not None:
+        bodies["zstd"] = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return bodies
+
+def make_etag(body: bytes) -> str:
+    """ETag dal contenuto: uguale in tutti i worker che servono la stessa versione"""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Confronto debole di If-None-Match con l'ETag (ignora W/ e il suffisso della codifica)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        for encoding in PREFERRED_ENCODINGS:
+            if candidate.endswith("-" + encoding):
+                candidate = candidate[:-len(encoding) - 1]
+                break
+        if candidate == base:
+            return True
+    return False
+
+def choose_encoding(accept_encoding: Optional[str], available: Dict[str, bytes]) -> str:
+    """Codifica da usare tra quelle disponibili secondo Accept-Encoding (identity se nessuna è accettata)"""
+    if not accept_encoding:
+        return "identity"
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    best, best_quality = "identity", 0.0
+    for encoding in PREFERRED_ENCODINGS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if encoding in available and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+class RepresentationCache:
+    """Rappresentazioni JSON pre-serializzate e pre-compresse, ricostruite solo al cambio di versione
+
+    La chiave è (versione, query): quando arriva una versione nuova le rappresentazioni della
+    precedente vengono scartate. Le richieste successive costano una ricerca nel dizionario.
+    """
+
+    def __init__(self, serialize: Callable[[Any], bytes], max_entries: int = MAX_REPRESENTATIONS,
+                 min_compress_size: int = MIN_COMPRESS_SIZE):
+        self.serialize = serialize
+        self.max_entries = max_entries
+        self.min_compress_size = min_compress_size
+        self._version: Any = None
+        self._entries: "OrderedDict[Hashable, EncodedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, version: Any, key: Hashable, build: Callable[[], Any]) -> EncodedBody:
+        """Rappresentazione della query per la versione, costruita con build() se manca
+
+        La versione può essere un numero o l'oggetto stesso da servire (confrontato prima per identità).
+        """
+        with self._lock:
+            if version is not self._version and version != self._version:
+                self._version = version
+                self._entries.clear()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+            # Costruzione sotto lock: polling simultanei sulla stessa versione serializzano una volta sola
+            body = self.serialize(build())
+            entry = EncodedBody(etag=make_etag(body), bodies=compress_body(body, self.min_compress_size))
+            self.builds += 1
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+def conditional_response(entry: EncodedBody, if_none_match: Optional[str],
+                         accept_encoding: Optional[str]) -> Tuple[int, List[Tuple[str, str]], bytes]:
+    """Stato, header e corpo della risposta (304 senza corpo se il client ha già la rappresentazione)"""
+    encoding = choose_encoding(accept_encoding, entry.bodies)
+    headers = [
+        ("ETag", entry.etag_for(encoding)),
+        ("Vary", "Accept-Encoding"),
+        ("Cache-Control", "no-cache"),
+    ]
+    if etag_matches(if_none_match, entry.etag):
+        return 304, headers, b""
+    if encoding != "identity":
+        headers.append(("Content-Encoding", encoding))
+    headers.append(("Content-Type", "application/json"))
+    return 200, headers, entry.bodies[encoding]
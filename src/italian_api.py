@@ -5,7 +5,7 @@ import json
 import time
 import logging
 from typing import Dict, Any, Optional
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -16,6 +16,8 @@ from src.italian_categorizer import ItalianProductCategorizer
 from src.validators import ProductInput
 from src.exceptions import ProductCategorizerError, InvalidInputError, CategoryNotFoundError, ValidationError, RateLimitError
 from src.monitoring import MetricsCollector
+from src.category_tree import TreePatchError, pointer_to_path, subtree_at, truncate_tree
+from src.http_cache import RepresentationCache, conditional_response
 
 # Configura il logger
 logging.basicConfig(
@@ -41,9 +43,14 @@ limiter = Limiter(
 # Imposta la dimensione massima del contenuto
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB
 
+# Numero massimo di parole chiave SEO restituite per richiesta
+MAX_SEO_KEYWORDS = int(os.getenv('MAX_SEO_KEYWORDS', 1000))
+
 # Inizializza il categorizzatore e il collector di metriche
 categorizer = ItalianProductCategorizer()
 metrics = MetricsCollector()
+# Corpi di /api/categories serializzati e compressi una volta per configurazione delle categorie
+categories_cache = RepresentationCache(lambda payload: app.json.dumps(payload).encode('utf-8'))
 
 # Context manager per la gestione degli errori
 class error_handler:
@@ -117,7 +124,8 @@ def health_check() -> Dict[str, Any]:
     return jsonify({
         "status": "ok",
         "version": "1.0.0",
-        "language": "it"
+        "language": "it",
+        "nlp_pipeline_load_ms": round(categorizer.pipeline.load_time * 1000, 2)
     })
 
 @app.route('/api/metrics', methods=['GET'])
@@ -177,18 +185,37 @@ def categorize_product() -> Dict[str, Any]:
 
 @app.route('/api/categories', methods=['GET'])
 def get_categories() -> Dict[str, Any]:
-    """Endpoint per ottenere tutte le categorie disponibili"""
+    """Endpoint per ottenere tutte le categorie disponibili
+    
+    Con ?root=/<id categoria> e ?depth=<livelli> restituisce solo una parte della configurazione.
+    Le risposte hanno un ETag e rispondono 304 a If-None-Match finché le categorie non cambiano.
+    """
     with error_handler():
         # Ottieni le categorie dal categorizzatore
         categories = categorizer.category_tree
         
-        # Prepara la risposta
-        response = {
-            "categories": categories,
-            "language": "it"
-        }
+        depth = request.args.get('depth', type=int)
+        if depth is not None and depth < 0:
+            raise InvalidInputError("depth deve essere un intero non negativo")
+        try:
+            root = pointer_to_path(request.args.get('root', ''))
+        except TreePatchError as e:
+            raise InvalidInputError(e.message) from e
+        if subtree_at(categories, root) is None:
+            raise CategoryNotFoundError(f"Categoria non trovata: {request.args.get('root')}")
         
-        return jsonify(response)
+        # Prepara la risposta (una volta sola finché la configurazione resta la stessa)
+        def build_payload() -> Dict[str, Any]:
+            return {
+                "categories": truncate_tree(subtree_at(categories, root), depth),
+                "language": "it"
+            }
+        
+        entry = categories_cache.get(categories, (tuple(root), depth), build_payload)
+        status, headers, body = conditional_response(
+            entry, request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding')
+        )
+        return Response(body, status=status, headers=headers)
 
 @app.route('/api/seo/keywords', methods=['POST'])
 @limiter.limit("20 per minute")
@@ -208,11 +235,19 @@ def generate_seo_keywords() -> Dict[str, Any]:
         if not category or not product_terms:
             raise InvalidInputError("Categoria e termini di prodotto sono obbligatori")
         
+        # Numero di parole chiave da restituire (corpo JSON o query string)
+        try:
+            limit = int(data.get('limit', request.args.get('limit', MAX_SEO_KEYWORDS)))
+        except (TypeError, ValueError):
+            raise InvalidInputError("limit deve essere un intero")
+        if not 1 <= limit <= MAX_SEO_KEYWORDS:
+            raise InvalidInputError(f"limit deve essere compreso tra 1 e {MAX_SEO_KEYWORDS}")
+        
         # Importa la funzione di generazione delle parole chiave
         from src.italian_support import generate_italian_seo_keywords
         
-        # Genera le parole chiave SEO
-        keywords = generate_italian_seo_keywords(category, subcategory, product_terms)
+        # Genera solo le prime limit parole chiave SEO, in ordine di priorità
+        keywords = generate_italian_seo_keywords(category, subcategory, product_terms, limit=limit)
         
         # Prepara la risposta
         response = {
@@ -220,6 +255,7 @@ def generate_seo_keywords() -> Dict[str, Any]:
             "subcategory": subcategory,
             "product_terms": product_terms,
             "keywords": keywords,
+            "limit": limit,
             "language": "it"
         }
         
@@ -241,11 +277,8 @@ def analyze_title() -> Dict[str, Any]:
         if not title:
             raise InvalidInputError("Il titolo è obbligatorio")
         
-        # Importa la funzione di analisi del titolo
-        from src.italian_support import analyze_italian_product_title
-        
-        # Analizza il titolo
-        analysis = analyze_italian_product_title(title)
+        # Analizza il titolo con la pipeline precompilata del categorizzatore
+        analysis = categorizer.pipeline.analyze_title(title)
         
         # Prepara la risposta
         response = {
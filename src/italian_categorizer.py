@@ -3,15 +3,25 @@
 import os
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+from collections import Counter
 from dataclasses import dataclass, field
 
 # Importa i moduli di supporto per l'italiano
-from src.italian_support import ItalianNLPSupport, analyze_italian_product_title, generate_italian_seo_keywords
+from src.analysis_document import AnalysisDocument
+from src.italian_support import get_italian_nlp_pipeline
 from src.italian_config import get_italian_config, ITALIAN_CATEGORY_CONFIG
+from src.category_index import CategoryKeywordIndex
 from src.exceptions import ProductCategorizerError, InvalidInputError, CategoryNotFoundError
 from src.validators import ProductInput
 from src.monitoring import MetricsCollector
+from src.result_cache import ResultCache, compute_version, create_result_cache
+
+# Lo scoring a matrici sparse dei batch richiede NumPy e SciPy
+try:
+    from src.category_matrix import CategoryScoringMatrix
+except ImportError:
+    CategoryScoringMatrix = None
 
 # Configura il logger
 logging.basicConfig(
@@ -50,16 +60,41 @@ class ItalianCategoryResult:
 class ItalianProductCategorizer:
     """Categorizzatore di prodotti ottimizzato per la lingua italiana"""
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None, result_cache: Optional[ResultCache] = None):
         """Inizializza il categorizzatore di prodotti in italiano"""
-        self.nlp_support = ItalianNLPSupport()
+        self.pipeline = get_italian_nlp_pipeline()
+        self.nlp_support = self.pipeline.nlp_support
         self.config = self._load_config(config_path)
         self.category_tree = ITALIAN_CATEGORY_CONFIG
+        self.category_index = CategoryKeywordIndex.from_category_config(self.category_tree)
+        self.category_matrix = CategoryScoringMatrix(self.category_index) if CategoryScoringMatrix else None
         self.metrics = MetricsCollector()
         self.seo_keywords = self._load_seo_keywords()
         self.brand_database = self._load_brand_database()
+        
+        # Cache dei risultati: la versione cambia con tassonomia, configurazione e lessici
+        nlp_support = self.nlp_support
+        self.content_version = compute_version(
+            self.category_tree, self.config, self.seo_keywords,
+            nlp_support.stopwords, nlp_support.stemming_rules, nlp_support.compound_words,
+            nlp_support.automotive_terms, nlp_support.regional_variants
+        )
+        self.result_cache = result_cache if result_cache is not None else self._create_result_cache()
         logger.info("Inizializzato categorizzatore prodotti in italiano")
     
+    def _create_result_cache(self) -> Optional[ResultCache]:
+        """Crea la cache dei risultati dalla sezione 'caching' della configurazione"""
+        caching = self.config.get("caching", {})
+        return create_result_cache(
+            caching.get("cache_key_prefix", "italian_categorizer"),
+            enabled=caching.get("enabled", True),
+            max_size=caching.get("max_entries", 10000),
+            ttl_seconds=caching.get("ttl_seconds", 3600),
+            max_bytes=caching.get("max_bytes"),
+            redis_url=os.getenv("REDIS_URL"),
+            metrics=self.metrics
+        )
+    
     def _load_config(self, config_path: Optional[str] = None) -> Dict[str, Any]:
         """Carica la configurazione da file o utilizza quella predefinita"""
         if config_path and os.path.exists(config_path):
@@ -139,35 +174,11 @@ class ItalianProductCategorizer:
         self.metrics.increment_requests()
         
         try:
-            # Valida l'input
-            if product_input.language != "it":
-                raise InvalidInputError("La lingua deve essere impostata su 'it' per l'italiano")
-            
-            # Analizza il titolo del prodotto
-            title_analysis = analyze_italian_product_title(product_input.title)
-            
-            # Identifica le categorie
-            categories, confidence = self._identify_categories(title_analysis, product_input.description)
+            self._validate_language(product_input)
             
-            # Genera parole chiave SEO
-            keywords = self._generate_seo_keywords(categories, title_analysis)
-            
-            # Crea l'analisi del prodotto
-            product_analysis = ItalianProductAnalysis(
-                product_id=product_input.product_id or "unknown",
-                title=product_input.title,
-                description=product_input.description,
-                brand=product_input.brand,
-                language=product_input.language,
-                categories=categories,
-                keywords=keywords,
-                confidence=confidence,
-                technical_terms=self._extract_technical_terms(title_analysis, product_input.description),
-                automotive_terms=title_analysis.get("automotive_terms", {}),
-                compound_words=title_analysis.get("compound_words", []),
-                title_analysis=title_analysis,
-                seo_suggestions=self._generate_seo_suggestions(title_analysis, product_input.description, categories)
-            )
+            # Analisi del contenuto (dalla cache se lo stesso testo normalizzato è già stato visto)
+            content = self._analyze_content(product_input.title, product_input.description)
+            product_analysis = self._build_product_analysis(product_input, content)
             
             self.metrics.increment_categorizations()
             return product_analysis
@@ -177,18 +188,151 @@ class ItalianProductCategorizer:
             logger.error(f"Errore nella categorizzazione del prodotto: {str(e)}")
             raise ProductCategorizerError(f"Errore nella categorizzazione del prodotto: {str(e)}")
     
-    def _identify_categories(self, title_analysis: Dict[str, Any], description: Optional[str] = None) -> Tuple[List[Dict[str, Any]], float]:
-        """Identifica le categorie del prodotto in base all'analisi del titolo e alla descrizione"""
-        categories = []
-        max_confidence = 0.0
+    def categorize_products(self, product_inputs: Sequence[ProductInput]) -> List[ItalianProductAnalysis]:
+        """Categorizza un batch di prodotti calcolando i punteggi di tutti con un solo prodotto matriciale"""
+        for _ in product_inputs:
+            self.metrics.increment_requests()
         
+        try:
+            for product_input in product_inputs:
+                self._validate_language(product_input)
+            
+            documents = [
+                (AnalysisDocument(product_input.title),
+                 AnalysisDocument(product_input.description) if product_input.description else None)
+                for product_input in product_inputs
+            ]
+            contents: List[Optional[Dict[str, Any]]] = [None] * len(documents)
+            cache_keys: List[Optional[str]] = [None] * len(documents)
+            
+            # Prima la cache; i testi ripetuti nel batch vengono analizzati una sola volta
+            pending: Dict[Tuple[str, Optional[str]], List[int]] = {}
+            for position, (title_document, description_document) in enumerate(documents):
+                text_key = (title_document.italian, description_document.italian if description_document else None)
+                if self.result_cache is not None:
+                    cache_keys[position] = self.result_cache.key_for(self.content_version, *text_key)
+                    if text_key not in pending:
+                        contents[position] = self.result_cache.get(cache_keys[position])
+                        if contents[position] is not None:
+                            continue
+                pending.setdefault(text_key, []).append(position)
+            
+            analyses = [self._analyze_texts(*documents[positions[0]]) for positions in pending.values()]
+            batch_scores = self._score_batch([self._term_counts(*analysis).items() for analysis in analyses])
+            for positions, analysis, scores in zip(pending.values(), analyses, batch_scores):
+                content = self._content_from_scores(*analysis, scores)
+                if self.result_cache is not None:
+                    self.result_cache.set(cache_keys[positions[0]], content)
+                for position in positions:
+                    contents[position] = content
+            
+            results = []
+            for product_input, content in zip(product_inputs, contents):
+                results.append(self._build_product_analysis(product_input, content))
+                self.metrics.increment_categorizations()
+            return results
+            
+        except Exception as e:
+            self.metrics.increment_errors()
+            logger.error(f"Errore nella categorizzazione del batch di prodotti: {str(e)}")
+            raise ProductCategorizerError(f"Errore nella categorizzazione del batch di prodotti: {str(e)}")
+    
+    def _validate_language(self, product_input: ProductInput) -> None:
+        """Valida la lingua dell'input"""
+        if product_input.language != "it":
+            raise InvalidInputError("La lingua deve essere impostata su 'it' per l'italiano")
+    
+    def _build_product_analysis(self, product_input: ProductInput, content: Dict[str, Any]) -> ItalianProductAnalysis:
+        """Compone il risultato a partire dall'analisi del contenuto"""
+        title_analysis = {"original": product_input.title, **content["title_analysis"]}
+        categories = content["categories"]
+        return ItalianProductAnalysis(
+            product_id=getattr(product_input, "product_id", None) or "unknown",
+            title=product_input.title,
+            description=product_input.description,
+            brand=product_input.brand,
+            language=product_input.language,
+            categories=categories,
+            keywords=content["keywords"],
+            confidence=content["confidence"],
+            technical_terms=content["technical_terms"],
+            automotive_terms=title_analysis.get("automotive_terms", {}),
+            compound_words=title_analysis.get("compound_words", []),
+            title_analysis=title_analysis,
+            seo_suggestions=self._generate_seo_suggestions(title_analysis, product_input.description, categories)
+        )
+    
+    def _analyze_content(self, title: str, description: Optional[str]) -> Dict[str, Any]:
+        """Analisi dipendente solo dal testo normalizzato di titolo e descrizione"""
+        # Titolo e descrizione vengono puliti una sola volta, per la chiave e per l'analisi
+        title_document = AnalysisDocument(title)
+        description_document = AnalysisDocument(description) if description else None
+        if self.result_cache is None:
+            return self._compute_content(title_document, description_document)
+        
+        cache_key = self.result_cache.key_for(
+            self.content_version,
+            title_document.italian,
+            description_document.italian if description_document else None
+        )
+        return self.result_cache.get_or_compute(
+            cache_key, lambda: self._compute_content(title_document, description_document)
+        )
+    
+    def _analyze_texts(self, title: AnalysisDocument,
+                       description: Optional[AnalysisDocument]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Analizza titolo e descrizione con la pipeline condivisa"""
+        title_analysis = self.pipeline.analyze_title(title)
+        description_analysis = self.pipeline.analyze_title(description) if description else None
+        return title_analysis, description_analysis
+    
+    def _compute_content(self, title: AnalysisDocument, description: Optional[AnalysisDocument]) -> Dict[str, Any]:
+        """Analizza titolo e descrizione una sola volta con la pipeline condivisa"""
+        title_analysis, description_analysis = self._analyze_texts(title, description)
+        scores = self.category_index.score_terms(self._term_counts(title_analysis, description_analysis).items())
+        return self._content_from_scores(title_analysis, description_analysis, scores)
+    
+    def _content_from_scores(self, title_analysis: Dict[str, Any], description_analysis: Optional[Dict[str, Any]],
+                             scores) -> Dict[str, Any]:
+        """Categorie, parole chiave e termini tecnici a partire dai punteggi calcolati"""
+        # Identifica le categorie
+        categories, confidence = self._categories_from_scores(scores)
+        
+        # Genera parole chiave SEO
+        keywords = self._generate_seo_keywords(categories, title_analysis)
+        technical_terms = self._extract_technical_terms(title_analysis, description_analysis)
+        
+        # Il titolo originale non fa parte del risultato in cache
+        title_analysis = {key: value for key, value in title_analysis.items() if key != "original"}
+        return {
+            "title_analysis": title_analysis,
+            "categories": categories,
+            "confidence": confidence,
+            "keywords": keywords,
+            "technical_terms": technical_terms
+        }
+    
+    def _score_batch(self, batch_term_counts: List[Any]) -> List[Any]:
+        """Punteggi di un batch: matrice sparsa se disponibile, altrimenti indice invertito prodotto per prodotto"""
+        if not batch_term_counts:
+            return []
+        if self.category_matrix is not None:
+            return list(self.category_matrix.score_batch(batch_term_counts))
+        return [self.category_index.score_terms(term_counts) for term_counts in batch_term_counts]
+    
+    def _identify_categories(self, title_analysis: Dict[str, Any], description_analysis: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], float]:
+        """Identifica le categorie del prodotto in base all'analisi del titolo e della descrizione"""
+        term_counts = self._term_counts(title_analysis, description_analysis)
+        return self._categories_from_scores(self.category_index.score_terms(term_counts.items()))
+    
+    def _term_counts(self, title_analysis: Dict[str, Any], description_analysis: Optional[Dict[str, Any]] = None) -> Counter:
+        """Conteggio dei termini automotive di titolo e descrizione"""
         # Estrai termini automotive dall'analisi del titolo
         automotive_terms = title_analysis.get("automotive_terms", {})
         
-        # Analizza la descrizione se disponibile
+        # Usa l'analisi della descrizione se disponibile
         description_terms = {}
-        if description:
-            description_analysis = analyze_italian_product_title(description)
+        if description_analysis:
             description_terms = description_analysis.get("automotive_terms", {})
         
         # Combina i termini dal titolo e dalla descrizione
@@ -203,71 +347,45 @@ class ItalianProductCategorizer:
             else:
                 all_terms[category] = terms
         
-        # Calcola il punteggio per ogni categoria principale
-        category_scores = {}
-        for main_category, data in self.category_tree.items():
-            category_scores[main_category] = 0
-            
-            # Controlla ogni sottocategoria
-            for subcategory_key, subcategory_data in data.get("subcategories", {}).items():
-                subcategory_score = 0
-                subcategory_keywords = subcategory_data.get("keywords", [])
-                
-                # Controlla se i termini automotive corrispondono alle parole chiave della sottocategoria
-                for category, terms in all_terms.items():
-                    for term in terms:
-                        if term in subcategory_keywords:
-                            subcategory_score += 1
-                
-                # Aggiorna il punteggio della categoria principale
-                category_scores[main_category] += subcategory_score
-        
-        # Ordina le categorie per punteggio
-        sorted_categories = sorted(category_scores.items(), key=lambda x: x[1], reverse=True)
+        # Conta le occorrenze di ogni termine
+        return Counter(term for terms in all_terms.values() for term in terms)
+    
+    def _categories_from_scores(self, scores) -> Tuple[List[Dict[str, Any]], float]:
+        """Categorie e sottocategorie più rilevanti a partire dai punteggi (indice invertito o matrice)"""
+        categories = []
+        max_confidence = 0.0
         
         # Prendi le prime N categorie con punteggio > 0
         max_categories = self.config["model"].get("max_categories", 3)
-        for category_id, score in sorted_categories:
-            if score > 0 and len(categories) < max_categories:
-                category_data = self.category_tree.get(category_id, {})
-                main_category_name = category_data.get("main_category", category_id)
-                
-                # Calcola la confidenza (normalizzata tra 0 e 1)
-                confidence = min(score / 10.0, 1.0)  # Normalizza il punteggio
-                max_confidence = max(max_confidence, confidence)
-                
-                # Trova le sottocategorie più rilevanti
-                subcategories = []
-                for subcategory_key, subcategory_data in category_data.get("subcategories", {}).items():
-                    subcategory_score = 0
-                    subcategory_keywords = subcategory_data.get("keywords", [])
-                    
-                    # Controlla se i termini automotive corrispondono alle parole chiave della sottocategoria
-                    for category, terms in all_terms.items():
-                        for term in terms:
-                            if term in subcategory_keywords:
-                                subcategory_score += 1
-                    
-                    if subcategory_score > 0:
-                        subcategory_confidence = min(subcategory_score / 5.0, 1.0)  # Normalizza il punteggio
-                        subcategories.append({
-                            "id": subcategory_key,
-                            "name": subcategory_data.get("name", subcategory_key),
-                            "confidence": subcategory_confidence
-                        })
-                
-                # Ordina le sottocategorie per confidenza
-                subcategories = sorted(subcategories, key=lambda x: x["confidence"], reverse=True)
-                
-                # Crea il risultato della categoria
-                category_result = {
-                    "id": category_id,
-                    "name": main_category_name,
-                    "confidence": confidence,
-                    "subcategories": subcategories[:3]  # Prendi le prime 3 sottocategorie
-                }
-                
-                categories.append(category_result)
+        for category_id, score in scores.ranked_categories(max_categories):
+            main_category_name = self.category_index.category_name(category_id)
+            
+            # Calcola la confidenza (normalizzata tra 0 e 1)
+            confidence = min(score / 10.0, 1.0)  # Normalizza il punteggio
+            max_confidence = max(max_confidence, confidence)
+            
+            # Trova le sottocategorie più rilevanti
+            subcategories = []
+            for subcategory_key, subcategory_score in scores.subcategories_of(category_id):
+                subcategory_confidence = min(subcategory_score / 5.0, 1.0)  # Normalizza il punteggio
+                subcategories.append({
+                    "id": subcategory_key,
+                    "name": self.category_index.subcategory_name(category_id, subcategory_key),
+                    "confidence": subcategory_confidence
+                })
+            
+            # Ordina le sottocategorie per confidenza
+            subcategories = sorted(subcategories, key=lambda x: x["confidence"], reverse=True)
+            
+            # Crea il risultato della categoria
+            category_result = {
+                "id": category_id,
+                "name": main_category_name,
+                "confidence": confidence,
+                "subcategories": subcategories[:3]  # Prendi le prime 3 sottocategorie
+            }
+            
+            categories.append(category_result)
         
         # Se non sono state trovate categorie, restituisci una categoria generica
         if not categories:
@@ -297,28 +415,25 @@ class ItalianProductCategorizer:
                 if subcategory_id in self.seo_keywords:
                     keywords.extend(self.seo_keywords[subcategory_id])
         
-        # Aggiungi parole chiave basate sui termini automotive identificati
+        # Aggiungi parole chiave basate sui termini automotive identificati (categorie di data/italian_automotive_terms.txt)
         automotive_terms = title_analysis.get("automotive_terms", {})
         for category, terms in automotive_terms.items():
-            if category == "parti_motore":
+            if category == "motore":
                 keywords.append("ricambi motore")
                 keywords.append("parti motore auto")
-            elif category == "parti_freni":
+            elif category == "freni":
                 keywords.append("ricambi freni auto")
                 keywords.append("sistema frenante")
-            elif category == "parti_sospensioni":
+            elif category == "sospensioni":
                 keywords.append("ricambi sospensioni")
                 keywords.append("ammortizzatori auto")
-            elif category == "parti_elettriche":
+            elif category == "elettrico":
                 keywords.append("componenti elettrici auto")
                 keywords.append("impianto elettrico auto")
-            elif category == "parti_carrozzeria":
+            elif category == "carrozzeria":
                 keywords.append("ricambi carrozzeria auto")
                 keywords.append("parti carrozzeria")
-            elif category == "fluidi_e_filtri":
-                keywords.append("filtri auto")
-                keywords.append("olio motore")
-            elif category == "pneumatici_e_ruote":
+            elif category == "ruote":
                 keywords.append("pneumatici auto")
                 keywords.append("cerchi in lega")
         
@@ -328,7 +443,7 @@ class ItalianProductCategorizer:
         
         return keywords[:max_keywords]
     
-    def _extract_technical_terms(self, title_analysis: Dict[str, Any], description: Optional[str] = None) -> Dict[str, List[str]]:
+    def _extract_technical_terms(self, title_analysis: Dict[str, Any], description_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
         """Estrae termini tecnici dal titolo e dalla descrizione"""
         technical_terms = {}
         
@@ -336,8 +451,8 @@ class ItalianProductCategorizer:
         title_text = title_analysis.get("cleaned", "")
         
         # Aggiungi termini dalla descrizione se disponibile
-        if description:
-            description_text = self.nlp_support.clean_text(description)
+        if description_analysis:
+            description_text = description_analysis.get("cleaned", "")
             text_to_analyze = f"{title_text} {description_text}"
         else:
             text_to_analyze = title_text
@@ -354,7 +469,7 @@ class ItalianProductCategorizer:
         
         return technical_terms
     
-    def _generate_seo_suggestions(self, title_analysis: Dict[str, Any], description: Optional[str] = None, categories: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _generate_seo_suggestions(self, title_analysis: Dict[str, Any], description: Optional[str], categories: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Genera suggerimenti SEO per il prodotto"""
         suggestions = {}
         
@@ -1,9 +1,23 @@
 """Modulo di supporto specifico per la lingua italiana"""
 
-from typing import Dict, List, Set, Tuple, Optional
-import re
+from array import array
+from typing import Dict, List, Set, Tuple, Optional, Any, Iterable, Iterator, Mapping, Union
 import json
+import heapq
+import time
+import logging
+import threading
+from types import MappingProxyType
 from dataclasses import dataclass
+from itertools import islice
+
+from src.aho_corasick import AhoCorasickAutomaton
+from src.analysis_document import AnalysisDocument, as_document, fold_accents
+from src.lexicon_store import LexiconStore, get_lexicon_store
+from src.suffix_stemmer import SuffixTrieStemmer
+from src.token_vocabulary import UNKNOWN_ID, TokenVocabulary, get_token_vocabulary
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class ItalianNLPConfig:
@@ -14,367 +28,445 @@ class ItalianNLPConfig:
     accent_normalization: bool = True
     enable_lemmatization: bool = True
 
+@dataclass(frozen=True)
+class AutomotiveTermHit:
+    """Occorrenza di un termine automotive (offset riferiti al testo pulito)"""
+    term: str
+    category: str
+    start: int
+    end: int
+
 class ItalianNLPSupport:
     """Classe di supporto per l'elaborazione del linguaggio naturale in italiano"""
     
-    def __init__(self):
-        self.stopwords = self._load_stopwords()
-        self.stemming_rules = self._load_stemming_rules()
-        self.compound_words = self._load_compound_words()
-        self.automotive_terms = self._load_automotive_terms()
-        self.regional_variants = self._load_regional_variants()
+    def __init__(self, stemmer: Optional[SuffixTrieStemmer] = None, vocabulary: Optional[TokenVocabulary] = None,
+                 store: Optional[LexiconStore] = None):
+        # I lessici arrivano dall'archivio mappato in memoria e vengono congelati:
+        # l'istanza è condivisa tra richieste e thread
+        store = store or get_lexicon_store()
+        self.stopwords = frozenset(word for (word,) in store.rows("stopwords"))
+        self.stemming_rules = MappingProxyType(dict(store.stemming_rules()))
+        self.compound_words = tuple((first, second) for _, first, second in store.rows("compound_words"))
+        automotive_terms: Dict[str, List[str]] = {}
+        for term, category in store.rows("automotive_terms"):
+            automotive_terms.setdefault(category, []).append(term)
+        self.automotive_terms = MappingProxyType({
+            category: tuple(terms) for category, terms in automotive_terms.items()
+        })
+        regional_variants: Dict[str, List[str]] = {}
+        for variant, standard, _ in store.rows("regional_variants"):
+            regional_variants.setdefault(standard, []).append(variant)
+        self.regional_variants = MappingProxyType({
+            standard: tuple(variants) for standard, variants in regional_variants.items()
+        })
         
-    def _load_stopwords(self) -> Set[str]:
-        """Carica le stopwords italiane"""
-        return {
-            "il", "lo", "la", "i", "gli", "le", "un", "uno", "una", 
-            "di", "a", "da", "in", "con", "su", "per", "tra", "fra",
-            "e", "ed", "o", "ma", "se", "perché", "come", "dove", "quando",
-            "chi", "che", "cui", "quale", "quali", "del", "dello", "della", "dei", "degli", "delle",
-            "al", "allo", "alla", "ai", "agli", "alle", "dal", "dallo", "dalla", "dai", "dagli", "dalle",
-            "nel", "nello", "nella", "nei", "negli", "nelle", "sul", "sullo", "sulla", "sui", "sugli", "sulle",
-            "questo", "questa", "questi", "queste", "quello", "quella", "quelli", "quelle",
-            "mio", "mia", "miei", "mie", "tuo", "tua", "tuoi", "tue", "suo", "sua", "suoi", "sue",
-            "nostro", "nostra", "nostri", "nostre", "vostro", "vostra", "vostri", "vostre",
-            "loro", "sì", "no", "non", "più", "meno", "molto", "poco", "troppo", "tanto",
-            "essere", "avere", "fare", "dire", "vedere", "sapere", "potere", "dovere", "volere"
-        }
+        # Strutture precompilate usate nei metodi di elaborazione
+        self._stemmer = stemmer or self._build_stemmer(store)
+        self._compound_pairs = frozenset(self.compound_words)
+        self._variant_lookup = self._build_variant_lookup()
+        self._term_automaton = self._build_term_automaton()
+        
+        # Lessici come insiemi e mappe di ID interi del vocabolario condiviso
+        self.vocabulary = vocabulary or get_token_vocabulary()
+        self._stopword_ids = self.vocabulary.id_set(
+            word for stopword in self.stopwords for word in (stopword, fold_accents(stopword))
+        )
+        self._compound_id_pairs = frozenset(
+            (self.vocabulary.id_of(first, force=True), self.vocabulary.id_of(second, force=True))
+            for first, second in self._compound_pairs
+        )
+        self._variant_ids = self._build_variant_ids()
+        # ID -> radice dei soli token dei lessici, calcolata all'avvio e mai modificata;
+        # i token fuori vocabolario passano dalla cache limitata dello stemmer
+        self._stem_by_id = self._build_stem_ids()
+        
+    def _build_stemmer(self, store: LexiconStore) -> SuffixTrieStemmer:
+        """Compila le regole di stemming dell'archivio in un trie di suffissi"""
+        stemmer = SuffixTrieStemmer.from_lexicon_store(store)
+        
+        # Le radici del vocabolario automotive vengono calcolate una sola volta
+        vocabulary = [word for terms in self.automotive_terms.values() for term in terms for word in term.split()]
+        vocabulary.extend(word for pair in self.compound_words for word in pair)
+        stemmer.preload_vocabulary(vocabulary)
+        return stemmer
     
-    def _load_stemming_rules(self) -> Dict[str, str]:
-        """Regole di stemming per l'italiano"""
-        return {
-            # Plurali
-            r'i$': 'o',  # es. ricambi -> ricambo
-            r'e$': 'a',  # es. cinghie -> cinghia
-            r'oni$': 'one',  # es. pistoni -> pistone
-            r'ini$': 'ino',  # es. cuscinettini -> cuscinettino
-            r'etti$': 'etto',  # es. cuscinetti -> cuscinetto
-            r'elli$': 'ello',  # es. pistoncelli -> pistoncello
-            r'ori$': 'ore',  # es. ammortizzatori -> ammortizzatore
-            
-            # Suffissi
-            r'mente$': '',  # es. facilmente -> facil
-            r'abile$': 'are',  # es. regolabile -> regolare
-            r'ibile$': 'ire',  # es. sostituibile -> sostituire
-            r'anza$': 'are',  # es. resistanza -> resistare
-            r'enza$': 'ere',  # es. efficienza -> efficere
-            r'aggio$': 'are',  # es. montaggio -> montare
-            r'atore$': 'are',  # es. regolatore -> regolare
-            r'zione$': 'to',  # es. regolazione -> regolato
-            r'mento$': 're',  # es. funzionamento -> funzionare
-        }
+    def _build_term_automaton(self) -> AhoCorasickAutomaton:
+        """Compila i termini automotive in un automa di Aho-Corasick"""
+        automaton = AhoCorasickAutomaton()
+        for category, terms in self.automotive_terms.items():
+            for term in terms:
+                # I termini vengono normalizzati come il testo in cui verranno cercati
+                automaton.add_pattern(self.clean_text(term), (category, term))
+        return automaton.build()
     
-    def _load_compound_words(self) -> List[Tuple[str, str]]:
-        """Parole composte comuni nel settore automotive"""
-        return [
-            ("auto", "ricambi"),
-            ("ricambi", "auto"),
-            ("kit", "frizione"),
-            ("cinghia", "distribuzione"),
-            ("filtro", "olio"),
-            ("filtro", "aria"),
-            ("filtro", "abitacolo"),
-            ("pastiglie", "freno"),
-            ("dischi", "freno"),
-            ("pompa", "acqua"),
-            ("pompa", "olio"),
-            ("ammortizzatore", "anteriore"),
-            ("ammortizzatore", "posteriore"),
-            ("faro", "anteriore"),
-            ("faro", "posteriore"),
-            ("sensore", "temperatura"),
-            ("sensore", "pressione"),
-            ("olio", "motore"),
-            ("candela", "accensione"),
-            ("testina", "sterzo"),
-            ("braccio", "oscillante"),
-            ("albero", "motore"),
-            ("albero", "trasmissione"),
-            ("guarnizione", "testata"),
-            ("cuscinetto", "ruota"),
-        ]
+    def _build_variant_lookup(self) -> Mapping[str, str]:
+        """Costruisce la mappa variante -> termine standard (vince il primo standard)"""
+        lookup = {}
+        for standard, variants in self.regional_variants.items():
+            for variant in variants:
+                lookup.setdefault(variant, standard)
+        return MappingProxyType(lookup)
     
-    def _load_automotive_terms(self) -> Dict[str, List[str]]:
-        """Termini specifici del settore automotive in italiano"""
-        return {
-            "parti_motore": [
-                "pistone", "biella", "albero motore", "testata", "valvola", "distribuzione",
-                "cinghia", "catena", "punteria", "guarnizione", "cilindro", "carter",
-                "basamento", "monoblocco", "bronzina", "cuscinetto", "pompa olio", "pompa acqua",
-                "termostato", "radiatore", "ventola", "intercooler", "turbocompressore", "aspirazione",
-                "scarico", "collettore", "marmitta", "catalizzatore", "sonda lambda", "iniettore",
-                "carburatore", "candela", "candeletta", "bobina", "spinterogeno", "alternatore",
-                "motorino avviamento", "volano", "frizione", "cambio", "differenziale", "semiasse"
-            ],
-            "parti_freni": [
-                "pastiglie", "disco", "tamburo", "pinza", "pistoncino", "cilindretti", "pompa freno",
-                "servofreno", "abs", "liquido freni", "tubo freno", "cavo freno", "leva freno",
-                "pedale freno", "freno a mano", "freno di stazionamento", "freno di servizio"
-            ],
-            "parti_sospensioni": [
-                "ammortizzatore", "molla", "braccio oscillante", "barra stabilizzatrice",
-                "silent block", "boccola", "testina sterzo", "scatola sterzo", "cremagliera",
-                "idroguida", "servosterzo", "culla", "traversa", "montante", "mozzo", "cuscinetto ruota"
-            ],
-            "parti_elettriche": [
-                "batteria", "alternatore", "motorino avviamento", "centralina", "fusibile",
-                "relè", "interruttore", "sensore", "attuatore", "cablaggio", "faro", "fanale",
-                "lampadina", "led", "xenon", "clacson", "tergicristallo", "motorino tergicristallo",
-                "pompa lavavetri", "alzacristalli", "chiusura centralizzata", "antenna", "autoradio"
-            ],
-            "parti_carrozzeria": [
-                "paraurti", "cofano", "parafango", "portiera", "maniglia", "serratura",
-                "vetro", "parabrezza", "lunotto", "specchietto", "retrovisore", "tetto",
-                "baule", "portellone", "spoiler", "minigonna", "modanatura", "griglia",
-                "mascherina", "emblema", "logo", "stemma", "antenna", "tergicristallo"
-            ],
-            "parti_interni": [
-                "sedile", "poggiatesta", "cintura", "airbag", "volante", "cruscotto",
-                "quadro strumenti", "contachilometri", "contagiri", "tachimetro", "indicatore",
-                "spia", "leva cambio", "pomello", "pedale", "freno a mano", "tappetino",
-                "rivestimento", "pannello porta", "consolle", "climatizzatore", "riscaldamento"
-            ],
-            "fluidi_e_filtri": [
-                "olio motore", "olio cambio", "olio differenziale", "liquido freni",
-                "liquido raffreddamento", "antigelo", "liquido servosterzo", "liquido lavavetri",
-                "filtro olio", "filtro aria", "filtro abitacolo", "filtro carburante", "filtro gasolio"
-            ],
-            "pneumatici_e_ruote": [
-                "pneumatico", "gomma", "copertone", "cerchio", "cerchione", "ruota",
-                "bullone", "dado", "coprimozzo", "copricerchio", "valvola", "camera d'aria"
-            ]
-        }
+    def _build_variant_ids(self) -> Dict[int, Tuple[Tuple[int, str], ...]]:
+        """Mappa ID variante -> (ID, token) del termine standard; le varianti composte non coincidono mai con una parola"""
+        vocabulary = self.vocabulary
+        variant_ids = {}
+        for variant, standard in self._variant_lookup.items():
+            if " " in variant:
+                continue
+            variant_ids[vocabulary.id_of(variant, force=True)] = tuple(
+                (vocabulary.id_of(word, force=True), word) for word in standard.split()
+            )
+        return variant_ids
     
-    def _load_regional_variants(self) -> Dict[str, List[str]]:
-        """Varianti regionali italiane per termini automotive"""
-        return {
-            "gomma": ["copertone", "pneumatico"],
-            "cerchio": ["cerchione", "ruota"],
-            "cofano": ["cappotta", "bonnet"],
-            "portiera": ["sportello"],
-            "parabrezza": ["vetro anteriore", "cristallo"],
-            "lunotto": ["vetro posteriore"],
-            "baule": ["portabagagli", "bagagliaio", "vano bagagli"],
-            "paraurti": ["parafango", "bumper"],
-            "clacson": ["tromba", "avvisatore acustico"],
-            "fanale": ["faro", "luce"],
-            "freccia": ["indicatore di direzione", "lampeggiante"],
-            "marmitta": ["silenziatore", "scarico"],
-            "motorino d'avviamento": ["starter", "avviamento"],
-            "freno a mano": ["freno di stazionamento", "freno di emergenza"],
-            "cruscotto": ["plancia", "dashboard"],
-            "volante": ["sterzo", "guida"],
-            "benzina": ["carburante", "combustibile"],
-            "gasolio": ["diesel", "nafta"],
-            "tergicristallo": ["spazzola", "pulitore", "wiper"],
-            "specchietto": ["retrovisore", "specchio"],
-            "cintura": ["cintura di sicurezza", "safety belt"],
-            "sedile": ["poltrona", "seat"],
-            "cambio": ["trasmissione", "scatola del cambio"],
-            "frizione": ["clutch", "innesto"],
-            "acceleratore": ["gas", "pedale dell'acceleratore"],
-            "batteria": ["accumulatore", "pila"]
-        }
+    def _build_stem_ids(self) -> Mapping[int, str]:
+        """Radici dei token dei composti e dei termini standard, indicizzate per ID"""
+        words = [word for pair in self._compound_pairs for word in pair]
+        words.extend(token for standard in self._variant_ids.values() for _, token in standard)
+        return MappingProxyType({
+            self.vocabulary.id_of(word, force=True): self._stemmer.stem(word) for word in dict.fromkeys(words)
+        })
     
-    def clean_text(self, text: str) -> str:
-        """Pulisce e normalizza il testo in italiano"""
-        # Converti in minuscolo
-        text = text.lower()
-        
-        # Normalizza accenti
-        text = self._normalize_accents(text)
-        
-        # Rimuovi caratteri speciali mantenendo lettere, numeri e spazi
-        text = re.sub(r'[^\w\s]', ' ', text)
-        
-        # Sostituisci numeri con spazi
-        text = re.sub(r'\d+', ' ', text)
-        
-        # Rimuovi spazi multipli
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+    def clean_text(self, text: Union[str, AnalysisDocument]) -> str:
+        """Pulisce e normalizza il testo in italiano (minuscolo, senza accenti, numeri e punteggiatura)"""
+        return as_document(text).italian
     
-    def _normalize_accents(self, text: str) -> str:
-        """Normalizza i caratteri accentati in italiano"""
-        replacements = {
-            'à': 'a', 'è': 'e', 'é': 'e', 'ì': 'i', 'ò': 'o', 'ù': 'u',
-            'À': 'A', 'È': 'E', 'É': 'E', 'Ì': 'I', 'Ò': 'O', 'Ù': 'U'
-        }
-        
-        for accented, normal in replacements.items():
-            text = text.replace(accented, normal)
-        
-        return text
+    def encode_tokens(self, tokens: Iterable[str]) -> array:
+        """Token come array di ID del vocabolario condiviso"""
+        return self.vocabulary.encode(tokens)
     
     def remove_stopwords(self, text: str) -> str:
         """Rimuove le stopwords italiane dal testo"""
         words = text.split()
-        filtered_words = [word for word in words if word.lower() not in self.stopwords]
-        return ' '.join(filtered_words)
+        word_ids = self.encode_tokens(word.lower() for word in words)
+        stopword_ids = self._stopword_ids
+        return ' '.join(word for word, word_id in zip(words, word_ids) if word_id not in stopword_ids)
     
     def stem_word(self, word: str) -> str:
-        """Applica lo stemming a una parola italiana"""
-        for pattern, replacement in self.stemming_rules.items():
-            if re.search(pattern, word):
-                return re.sub(pattern, replacement, word)
-        return word
+        """Applica lo stemming a una parola italiana (regola con il suffisso più lungo)"""
+        return self._stemmer.stem(word)
+    
+    def stem_tokens(self, tokens: List[str]) -> List[str]:
+        """Applica lo stemming a una lista di token"""
+        return self._stemmer.stem_tokens(tokens)
     
     def stem_text(self, text: str) -> str:
         """Applica lo stemming a un testo italiano"""
-        words = text.split()
-        stemmed_words = [self.stem_word(word) for word in words]
-        return ' '.join(stemmed_words)
+        return ' '.join(self._stemmer.stem_tokens(text.split()))
     
     def identify_compound_words(self, text: str) -> List[str]:
         """Identifica parole composte nel testo"""
         words = text.split()
-        compounds = []
+        return self._compounds_from_ids(words, self.encode_tokens(words))
+    
+    def _compounds_from_ids(self, words: List[str], word_ids: array) -> List[str]:
+        """Coppie consecutive di ID presenti tra le parole composte"""
+        pairs = self._compound_id_pairs
+        return [
+            f"{words[i]} {words[i + 1]}"
+            for i in range(len(words) - 1)
+            if (word_ids[i], word_ids[i + 1]) in pairs
+        ]
+    
+    def process_tokens(self, words: List[str]) -> Dict[str, List[str]]:
+        """Composti, varianti, stopwords e stemming di un testo pulito con una sola codifica in ID"""
+        word_ids = self.encode_tokens(words)
+        
+        # Varianti regionali: (ID, token) del termine standard al posto della variante
+        variant_ids = self._variant_ids
+        normalized: List[Tuple[int, str]] = []
+        for word_id, word in zip(word_ids, words):
+            standard = variant_ids.get(word_id)
+            if standard is None:
+                normalized.append((word_id, word))
+            else:
+                normalized.extend(standard)
         
-        for i in range(len(words) - 1):
-            for first, second in self.compound_words:
-                if words[i] == first and words[i+1] == second:
-                    compounds.append(f"{first} {second}")
+        # Stopwords e radici come operazioni su interi
+        stopword_ids = self._stopword_ids
+        filtered = [(word_id, word) for word_id, word in normalized if word_id not in stopword_ids]
+        stems = self._stem_by_id
+        stemmed = []
+        for word_id, word in filtered:
+            stem = stems.get(word_id) if word_id != UNKNOWN_ID else None
+            stemmed.append(stem if stem is not None else self._stemmer.stem(word))
         
-        return compounds
+        return {
+            "compound_words": self._compounds_from_ids(words, word_ids),
+            "normalized": [word for _, word in normalized],
+            "filtered": [word for _, word in filtered],
+            "stemmed": stemmed
+        }
     
-    def extract_automotive_terms(self, text: str) -> Dict[str, List[str]]:
-        """Estrae termini automotive dal testo"""
+    def find_automotive_terms(self, text: Union[str, AnalysisDocument]) -> List[AutomotiveTermHit]:
+        """Trova tutte le occorrenze dei termini automotive con una sola scansione del testo"""
         clean_text = self.clean_text(text)
-        words = clean_text.split()
+        hits = []
         
-        results = {category: [] for category in self.automotive_terms.keys()}
-        
-        # Cerca termini singoli
-        for word in words:
-            for category, terms in self.automotive_terms.items():
-                for term in terms:
-                    if term == word or term in word:
-                        results[category].append(term)
+        for match in self._term_automaton.iter_matches(clean_text):
+            category, term = match.payload
+            is_multiword = " " in match.pattern
+            
+            # I termini composti devono coincidere con parole intere,
+            # i termini singoli possono comparire anche dentro una parola
+            if is_multiword and not self._is_word_aligned(clean_text, match.start, match.end):
+                continue
+            
+            hits.append(AutomotiveTermHit(term=term, category=category, start=match.start, end=match.end))
         
-        # Cerca termini composti
-        for i in range(len(words) - 1):
-            bigram = f"{words[i]} {words[i+1]}"
-            for category, terms in self.automotive_terms.items():
-                for term in terms:
-                    if len(term.split()) > 1 and term == bigram:
-                        results[category].append(term)
+        return hits
+    
+    @staticmethod
+    def _is_word_aligned(text: str, start: int, end: int) -> bool:
+        """Verifica che l'intervallo inizi e finisca su un confine di parola"""
+        return (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " ")
+    
+    def extract_automotive_terms(self, text: Union[str, AnalysisDocument]) -> Dict[str, List[str]]:
+        """Estrae termini automotive dal testo"""
+        results = {category: [] for category in self.automotive_terms.keys()}
+        seen = set()
         
-        # Rimuovi duplicati
-        for category in results:
-            results[category] = list(set(results[category]))
+        # Un termine compare una sola volta per categoria, in ordine di occorrenza
+        for hit in self.find_automotive_terms(text):
+            if (hit.category, hit.term) not in seen:
+                seen.add((hit.category, hit.term))
+                results[hit.category].append(hit.term)
         
         return results
     
     def normalize_regional_variants(self, text: str) -> str:
         """Normalizza varianti regionali a termini standard"""
         words = text.split()
+        variant_ids = self._variant_ids
         normalized = []
         
-        for word in words:
-            normalized_word = word
-            for standard, variants in self.regional_variants.items():
-                if word in variants:
-                    normalized_word = standard
-                    break
-            normalized.append(normalized_word)
+        for word_id, word in zip(self.encode_tokens(words), words):
+            standard = variant_ids.get(word_id)
+            if standard is None:
+                normalized.append(word)
+            else:
+                normalized.extend(token for _, token in standard)
         
         return ' '.join(normalized)
 
 # Funzioni di utilità per l'italiano
-def generate_italian_seo_keywords(category: str, subcategory: str, product_terms: List[str]) -> List[str]:
-    """Genera keywords SEO ottimizzate per l'italiano"""
-    base_templates = [
-        "{product} per {brand}",
-        "migliori {product} {category}",
-        "{product} {category} online",
-        "{product} {category} prezzo",
-        "{product} {subcategory} economici",
-        "{product} {subcategory} professionali",
-        "vendita {product} {category}",
-        "{product} {category} offerta",
-        "{product} {category} originali",
-        "{product} {category} compatibili",
-        "{brand} {product} {subcategory}",
-        "{product} {category} {year}",
-        "ricambi {category} {subcategory}",
-        "componenti {category} {product}",
-        "accessori {category} {product}",
-        "{product} {category} recensioni",
-        "{product} {category} qualità",
-        "{product} {category} confronto",
-        "{product} {category} caratteristiche",
-        "{product} {category} specifiche"
+# Template delle keyword SEO, in ordine di priorità a parità di volume
+ITALIAN_SEO_TEMPLATES = (
+    "{product} per {brand}",
+    "migliori {product} {category}",
+    "{product} {category} online",
+    "{product} {category} prezzo",
+    "{product} {subcategory} economici",
+    "{product} {subcategory} professionali",
+    "vendita {product} {category}",
+    "{product} {category} offerta",
+    "{product} {category} originali",
+    "{product} {category} compatibili",
+    "{brand} {product} {subcategory}",
+    "{product} {category} {year}",
+    "ricambi {category} {subcategory}",
+    "componenti {category} {product}",
+    "accessori {category} {product}",
+    "{product} {category} recensioni",
+    "{product} {category} qualità",
+    "{product} {category} confronto",
+    "{product} {category} caratteristiche",
+    "{product} {category} specifiche",
+)
+
+# Varianti con preposizioni italiane
+ITALIAN_SEO_PREPOSITIONS = ("per", "di", "da", "con", "senza", "a")
+ITALIAN_SEO_PREPOSITION_TEMPLATES = (
+    "{product} {preposition} {category}",
+    "{product} {preposition} {subcategory}",
+    "{category} {preposition} {product}",
+    "{subcategory} {preposition} {product}",
+)
+
+# Peso di una parola in base alla fascia di volume di data/italian_seo_keywords.json
+SEO_VOLUME_TIER_WEIGHTS = {
+    "high_volume": 1.0,
+    "medium_volume": 0.6,
+    "low_volume": 0.3,
+    "long_tail": 0.1,
+}
+
+_seo_volume_lock = threading.Lock()
+_seo_volume_weights: Optional[Mapping[str, float]] = None
+_seo_stopwords: frozenset = frozenset()
+
+def load_italian_seo_volume_weights() -> Mapping[str, float]:
+    """Peso di volume di parole e frasi delle keyword SEO (la fascia più alta in cui compaiono), condiviso nel processo"""
+    global _seo_volume_weights, _seo_stopwords
+    if _seo_volume_weights is None:
+        with _seo_volume_lock:
+            if _seo_volume_weights is None:
+                stopwords = frozenset(load_italian_stopwords())
+                weights: Dict[str, float] = {}
+                for _, tier, keyword in get_lexicon_store().rows("seo_keywords"):
+                    weight = SEO_VOLUME_TIER_WEIGHTS.get(tier, 0.0)
+                    keyword = keyword.lower()
+                    for entry in [keyword] + [word for word in keyword.split() if word not in stopwords]:
+                        if weights.get(entry, 0.0) < weight:
+                            weights[entry] = weight
+                _seo_stopwords = stopwords
+                _seo_volume_weights = MappingProxyType(weights)
+    return _seo_volume_weights
+
+def _seo_volume_score(text: str, volume_weights: Mapping[str, float]) -> float:
+    """Volume stimato di un frammento: la frase intera se nota, altrimenti la media delle parole non stopword"""
+    exact = volume_weights.get(text, 0.0)
+    words = [word for word in text.split() if word not in _seo_stopwords]
+    if not words:
+        return exact
+    return max(exact, sum(volume_weights.get(word, 0.0) for word in words) / len(words))
+
+def iter_italian_seo_keywords(category: str, subcategory: str, product_terms: Iterable[str],
+                              brand: Optional[str] = None, year: Optional[Union[str, int]] = None) -> Iterator[str]:
+    """Genera le keyword SEO in ordine di priorità, una alla volta e senza duplicati
+
+    Il punteggio di una keyword è la somma del volume della parte fissa del template e del volume
+    del termine di prodotto: i termini vengono ordinati una volta e i template fusi con un heap,
+    così fermarsi dopo k keyword costa O(k log T) invece di costruire tutto il prodotto cartesiano.
+    I template con segnaposto senza valore ({brand}, {year}, sottocategoria vuota) vengono saltati.
+    """
+    volume_weights = load_italian_seo_volume_weights()
+    fields = {
+        "category": ' '.join(category.lower().split()),
+        "subcategory": ' '.join(subcategory.lower().split()),
+        "brand": ' '.join(str(brand).lower().split()) if brand else "",
+        "year": str(year).strip() if year else "",
+    }
+
+    terms = list(dict.fromkeys(' '.join(term.lower().split()) for term in product_terms))
+    terms = [term for term in terms if term]
+    if not terms:
+        return
+    term_scores = [_seo_volume_score(term, volume_weights) for term in terms]
+    order = sorted(range(len(terms)), key=lambda position: -term_scores[position])
+
+    # Template risolti (senza il prodotto) con il punteggio della parte fissa
+    templates = list(ITALIAN_SEO_TEMPLATES) + [
+        template.replace("{preposition}", preposition)
+        for template in ITALIAN_SEO_PREPOSITION_TEMPLATES
+        for preposition in ITALIAN_SEO_PREPOSITIONS
     ]
+    resolved = []
+    for template in templates:
+        if any(f"{{{name}}}" in template and not value for name, value in fields.items()):
+            continue
+        pattern = template.format(product="{product}", **fields)
+        fixed = ' '.join(pattern.replace("{product}", " ").split())
+        resolved.append((pattern, _seo_volume_score(fixed, volume_weights)))
+
+    # Un cursore per template sui termini ordinati per volume (i template senza prodotto hanno un solo elemento)
+    heap = []
+    for template_index, (pattern, fixed_score) in enumerate(resolved):
+        if "{product}" in pattern:
+            heap.append((-(fixed_score + term_scores[order[0]]), template_index, 0))
+        else:
+            heap.append((-fixed_score, template_index, -1))
+    heapq.heapify(heap)
+
+    seen: Set[str] = set()
+    while heap:
+        _, template_index, cursor = heapq.heappop(heap)
+        pattern, fixed_score = resolved[template_index]
+        if cursor < 0:
+            keyword = pattern
+        else:
+            keyword = pattern.replace("{product}", terms[order[cursor]])
+            if cursor + 1 < len(order):
+                heapq.heappush(heap, (-(fixed_score + term_scores[order[cursor + 1]]), template_index, cursor + 1))
+        if keyword not in seen:
+            seen.add(keyword)
+            yield keyword
+
+def generate_italian_seo_keywords(category: str, subcategory: str, product_terms: List[str],
+                                  limit: Optional[int] = None, brand: Optional[str] = None,
+                                  year: Optional[Union[str, int]] = None) -> List[str]:
+    """Genera keywords SEO ottimizzate per l'italiano, le più rilevanti per prime (al massimo limit)"""
+    keywords = iter_italian_seo_keywords(category, subcategory, product_terms, brand=brand, year=year)
+    return list(islice(keywords, limit))
+
+class ItalianNLPPipeline:
+    """Pipeline NLP italiana precompilata, immutabile e condivisa nel processo"""
     
-    # Genera keywords di base
-    keywords = []
-    for template in base_templates:
-        for term in product_terms:
-            keyword = template.format(
-                product=term,
-                category=category.lower(),
-                subcategory=subcategory.lower(),
-                brand="{brand}",  # Placeholder per brand specifici
-                year="{year}"  # Placeholder per anni specifici
-            )
-            keywords.append(keyword)
-    
-    # Aggiungi varianti con preposizioni italiane
-    preposition_variants = [
-        "per", "di", "da", "con", "senza", "a"
-    ]
+    __slots__ = ("nlp_support", "load_time")
     
-    preposition_templates = [
-        "{product} {preposition} {category}",
-        "{product} {preposition} {subcategory}",
-        "{category} {preposition} {product}",
-        "{subcategory} {preposition} {product}"
-    ]
+    def __init__(self, nlp_support: Optional[ItalianNLPSupport] = None):
+        start_time = time.perf_counter()
+        object.__setattr__(self, "nlp_support", nlp_support or ItalianNLPSupport())
+        object.__setattr__(self, "load_time", time.perf_counter() - start_time)
     
-    for template in preposition_templates:
-        for preposition in preposition_variants:
-            for term in product_terms:
-                keyword = template.format(
-                    product=term,
-                    category=category.lower(),
-                    subcategory=subcategory.lower(),
-                    preposition=preposition
-                )
-                keywords.append(keyword)
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("ItalianNLPPipeline è immutabile")
     
-    # Rimuovi duplicati e restituisci
-    return list(set(keywords))
+    def analyze_title(self, title: Union[str, AnalysisDocument]) -> Dict[str, Any]:
+        """Analizza un titolo (o una descrizione) riusando i lessici precompilati e la pulizia del documento"""
+        nlp_support = self.nlp_support
+        document = as_document(title)
+        clean_title = document.italian
+        
+        # Estrai termini automotive (il documento è già pulito, nessuna seconda passata)
+        automotive_terms = nlp_support.extract_automotive_terms(document)
+        
+        # Composti, varianti, stopwords e stemming sugli ID dei token
+        processed = nlp_support.process_tokens(clean_title.split())
+        normalized_title = ' '.join(processed["normalized"])
+        filtered_title = ' '.join(processed["filtered"])
+        stemmed_title = ' '.join(processed["stemmed"])
+        compound_words = processed["compound_words"]
+        
+        return {
+            "original": document.text,
+            "cleaned": clean_title,
+            "normalized": normalized_title,
+            "filtered": filtered_title,
+            "stemmed": stemmed_title,
+            "automotive_terms": automotive_terms,
+            "compound_words": compound_words
+        }
+
+_pipeline_lock = threading.Lock()
+_shared_pipeline: Optional[ItalianNLPPipeline] = None
+
+def get_italian_nlp_pipeline() -> ItalianNLPPipeline:
+    """Restituisce la pipeline condivisa, costruendola una sola volta per processo"""
+    global _shared_pipeline
+    if _shared_pipeline is None:
+        with _pipeline_lock:
+            if _shared_pipeline is None:
+                _shared_pipeline = ItalianNLPPipeline()
+                logger.info(f"Pipeline NLP italiana caricata in {_shared_pipeline.load_time * 1000:.2f} ms")
+    return _shared_pipeline
 
 def analyze_italian_product_title(title: str) -> Dict[str, Any]:
     """Analizza un titolo di prodotto in italiano"""
-    nlp_support = ItalianNLPSupport()
-    clean_title = nlp_support.clean_text(title)
-    
-    # Estrai termini automotive
-    automotive_terms = nlp_support.extract_automotive_terms(clean_title)
-    
-    # Identifica parole composte
-    compound_words = nlp_support.identify_compound_words(clean_title)
-    
-    # Normalizza varianti regionali
-    normalized_title = nlp_support.normalize_regional_variants(clean_title)
-    
-    # Rimuovi stopwords
-    filtered_title = nlp_support.remove_stopwords(normalized_title)
-    
-    # Applica stemming
-    stemmed_title = nlp_support.stem_text(filtered_title)
-    
-    return {
-        "original": title,
-        "cleaned": clean_title,
-        "normalized": normalized_title,
-        "filtered": filtered_title,
-        "stemmed": stemmed_title,
-        "automotive_terms": automotive_terms,
-        "compound_words": compound_words
-    }
+    return get_italian_nlp_pipeline().analyze_title(title)
+
+def load_italian_stopwords() -> Set[str]:
+    """Carica le stopwords da data/italian_stopwords.txt (tramite l'archivio dei lessici)"""
+    return {word for (word,) in get_lexicon_store().rows("stopwords")}
+
+def load_italian_stemming_rules() -> Dict[str, str]:
+    """Carica le regole di stemming (suffisso -> sostituzione) nell'ordine del file"""
+    return dict(get_lexicon_store().stemming_rules())
+
+def load_italian_compound_words() -> Dict[str, List[str]]:
+    """Carica le parole composte (parola composta -> parole componenti)"""
+    return {compound: [first, second] for compound, first, second in get_lexicon_store().rows("compound_words")}
+
+def load_italian_automotive_terms() -> Dict[str, List[str]]:
+    """Carica i termini automotive raggruppati per categoria"""
+    terms: Dict[str, List[str]] = {}
+    for term, category in get_lexicon_store().rows("automotive_terms"):
+        terms.setdefault(category, []).append(term)
+    return terms
+
+def load_italian_regional_variants() -> Dict[str, Tuple[str, str]]:
+    """Carica le varianti regionali (variante -> (termine standard, regione))"""
+    return {variant: (standard, region) for variant, standard, region in get_lexicon_store().rows("regional_variants")}
 
 # Esempi di utilizzo
 if __name__ == "__main__":
@@ -389,4 +481,4 @@ if __name__ == "__main__":
         "Trasmissione", 
         ["kit frizione", "disco frizione", "spingidisco"]
     )
-    print(json.dumps(keywords[:10], indent=2, ensure_ascii=False))
\ No newline at end of file
+    print(json.dumps(keywords[:10], indent=2, ensure_ascii=False))
@@ -0,0 +1,435 @@
+"""Archivio binario dei lessici italiani, mappato in memoria e condiviso tra i processi"""
+
+import os
+import sys
+import mmap
+import json
+import struct
+import hashlib
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Set, Tuple, Iterator, Any
+
+try:
+    from src.exceptions import ModelLoadError
+except ImportError:
+    from exceptions import ModelLoadError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+DEFAULT_LEXICON_PATH = os.environ.get(
+    "LEXICON_STORE_PATH",
+    os.path.join(DEFAULT_DATA_DIR, "italian_lexicons.lex")
+)
+
+# File sorgente compilati nell'archivio
+LEXICON_SOURCES = {
+    "stopwords": "italian_stopwords.txt",
+    "stemming_rules": "italian_stemming_rules.txt",
+    "compound_words": "italian_compound_words.txt",
+    "automotive_terms": "italian_automotive_terms.txt",
+    "regional_variants": "italian_regional_variants.txt",
+    "categories": "italian_categories.json",
+    "seo_keywords": "italian_seo_keywords.json",
+}
+
+# Tabelle dell'archivio e numero di colonne (id di stringa) per riga
+LEXICON_TABLES = {
+    "stopwords": 1,            # parola
+    "stemming_rules": 2,       # suffisso, sostituzione (ordine del file)
+    "compound_words": 3,       # parola composta, parola1, parola2
+    "automotive_terms": 2,     # termine, categoria
+    "regional_variants": 3,    # variante, termine standard, regione
+    "categories": 3,           # id, nome, descrizione
+    "category_keywords": 2,    # id categoria, parola chiave
+    "category_children": 2,    # id categoria, id sottocategoria
+    "seo_keywords": 3,         # id categoria, fascia di volume, parola chiave
+}
+
+_MAGIC = b"PCLEX\x00\x00\x01"
+_FORMAT_VERSION = 2
+_HEADER = struct.Struct("<8sIIc3x32s")
+_SECTION = struct.Struct("<32sQQ")
+_BYTEORDER = b"L" if sys.byteorder == "little" else b"B"
+_EMPTY_SLOT = 0
+
+# Desinenze plurali e singolari ammesse nelle regole di stemming compilate
+_PLURAL_ENDINGS = "ie"
+_SINGULAR_ENDINGS = "oa"
+
+def _fnv1a(data: bytes) -> int:
+    """Hash FNV-1a a 32 bit"""
+    value = 0x811C9DC5
+    for byte in data:
+        value = ((value ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return value
+
+def _read_pairs(path: str) -> Dict[str, str]:
+    """Legge un file nel formato chiave=valore (l'ultima occorrenza vince, come in un dict)"""
+    entries = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            entries[key.strip()] = value.strip()
+    return entries
+
+def _read_words(path: str) -> List[str]:
+    """Legge un file con una parola per riga"""
+    with open(path, 'r', encoding='utf-8') as f:
+        words = [line.strip() for line in f]
+    return list(dict.fromkeys(word for word in words if word and not word.startswith('#')))
+
+def _is_plural_rule(suffix: str, replacement: str) -> bool:
+    """Vero per le regole plurale -> singolare (i -> o, che -> ca, gli -> glio)
+
+    Le regole derivative (zione, uto, eria con sostituzione vuota) e gli alterati (one -> o)
+    troncano le parole del lessico (frizione -> fri, auto -> a) e non entrano nell'archivio.
+    """
+    return (suffix.endswith(tuple(_PLURAL_ENDINGS)) and replacement.endswith(tuple(_SINGULAR_ENDINGS))
+            and len(replacement) >= len(suffix) - 1)
+
+def _lexicon_words(tables: Dict[str, List[Tuple[str, ...]]]) -> Set[str]:
+    """Parole dei termini automotive, dei composti e delle parole chiave delle categorie"""
+    words = set()
+    for name, columns in (("automotive_terms", (0,)), ("compound_words", (0, 1, 2)),
+                          ("category_keywords", (1,)), ("seo_keywords", (2,))):
+        for row in tables[name]:
+            for column in columns:
+                words.update(row[column].lower().split())
+    return words
+
+def compute_sources_digest(data_dir: str = DEFAULT_DATA_DIR) -> bytes:
+    """Calcola l'impronta SHA-256 dei file sorgente dei lessici"""
+    digest = hashlib.sha256()
+    for name, filename in sorted(LEXICON_SOURCES.items()):
+        digest.update(name.encode('utf-8') + b"\0")
+        with open(os.path.join(data_dir, filename), 'rb') as f:
+            digest.update(f.read())
+        digest.update(b"\0")
+    return digest.digest()
+
+def _parse_sources(data_dir: str) -> Dict[str, List[Tuple[str, ...]]]:
+    """Converte i file sorgente nelle righe delle tabelle dell'archivio"""
+    path = lambda name: os.path.join(data_dir, LEXICON_SOURCES[name])
+    tables: Dict[str, List[Tuple[str, ...]]] = {}
+
+    tables["stopwords"] = [(word,) for word in _read_words(path("stopwords"))]
+    tables["stemming_rules"] = [
+        (suffix, replacement) for suffix, replacement in _read_pairs(path("stemming_rules")).items()
+        if _is_plural_rule(suffix, replacement)
+    ]
+
+    tables["compound_words"] = []
+    for compound, parts in _read_pairs(path("compound_words")).items():
+        words = [part.strip() for part in parts.split(',')]
+        if len(words) == 2:
+            tables["compound_words"].append((compound, words[0], words[1]))
+
+    tables["automotive_terms"] = list(_read_pairs(path("automotive_terms")).items())
+
+    with open(path("categories"), 'r', encoding='utf-8') as f:
+        categories = json.load(f).get("categories", [])
+    tables["categories"] = [
+        (category["id"], category.get("name", category["id"]), category.get("description", ""))
+        for category in categories
+    ]
+    tables["category_keywords"] = [
+        (category["id"], keyword) for category in categories for keyword in category.get("keywords", [])
+    ]
+    tables["category_children"] = [
+        (category["id"], child) for category in categories for child in category.get("subcategories", [])
+    ]
+
+    with open(path("seo_keywords"), 'r', encoding='utf-8') as f:
+        seo_keywords = json.load(f).get("seo_keywords", {})
+    tables["seo_keywords"] = [
+        (category_id, tier, keyword)
+        for category_id, tiers in seo_keywords.items()
+        for tier, keywords in tiers.items()
+        for keyword in keywords
+    ]
+
+    # Solo varianti dialettali verso termini italiani del lessico: i termini del lessico non vengono
+    # riscritti (frizione -> clutch, auto -> automobile) e gli standard fuori lessico vengono scartati
+    terms = {row[0] for row in tables["automotive_terms"]}
+    terms.update(word for row in tables["compound_words"] for word in row)
+    words = _lexicon_words(tables)
+    tables["regional_variants"] = []
+    for variant, value in _read_pairs(path("regional_variants")).items():
+        standard, _, region = value.partition(',')
+        standard = standard.strip()
+        if variant not in terms and all(word in words for word in standard.split()):
+            tables["regional_variants"].append((variant, standard, region.strip()))
+
+    return tables
+
+def _uint32(values) -> bytes:
+    """Serializza un array di uint32 nell'ordine di byte nativo"""
+    return array('I', values).tobytes()
+
+def compile_lexicon_store(data_dir: str = DEFAULT_DATA_DIR, output_path: str = DEFAULT_LEXICON_PATH) -> str:
+    """Compila i lessici di data/ nell'archivio binario (scrittura atomica)"""
+    digest = compute_sources_digest(data_dir)
+    tables = _parse_sources(data_dir)
+
+    # Pool di stringhe internate, ordinate per byte UTF-8 (quindi per code point)
+    strings = sorted({value for rows in tables.values() for row in rows for value in row},
+                     key=lambda value: value.encode('utf-8'))
+    string_ids = {value: index for index, value in enumerate(strings)}
+    encoded = [value.encode('utf-8') for value in strings]
+
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    # Tabella hash a indirizzamento aperto (sonda lineare), slot = id + 1
+    capacity = 1
+    while capacity < max(2 * len(strings), 8):
+        capacity *= 2
+    slots = [_EMPTY_SLOT] * capacity
+    for index, data in enumerate(encoded):
+        slot = _fnv1a(data) & (capacity - 1)
+        while slots[slot] != _EMPTY_SLOT:
+            slot = (slot + 1) & (capacity - 1)
+        slots[slot] = index + 1
+
+    sections: List[Tuple[str, bytes]] = [
+        ("str_offsets", _uint32(offsets)),
+        ("str_data", b"".join(encoded)),
+        ("str_hash", _uint32(slots)),
+    ]
+    for name, width in LEXICON_TABLES.items():
+        rows = tables[name]
+        cells = [string_ids[value] for row in rows for value in row]
+        # Indice ordinato per chiave (prima colonna), stabile rispetto all'ordine del file
+        order = sorted(range(len(rows)), key=lambda row: cells[row * width])
+        sections.append(("t:" + name, _uint32(cells)))
+        sections.append(("i:" + name, _uint32(order)))
+
+    header_size = _HEADER.size + _SECTION.size * len(sections)
+    directory = []
+    position = (header_size + 7) & ~7
+    for name, payload in sections:
+        directory.append((name, position, len(payload)))
+        position = (position + len(payload) + 7) & ~7
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(sections), _BYTEORDER, digest))
+        for name, offset, length in directory:
+            f.write(_SECTION.pack(name.encode('ascii'), offset, length))
+        for (name, offset, length), (_, payload) in zip(directory, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(payload)
+    os.replace(temp_path, output_path)
+
+    logger.info(f"Archivio lessici compilato in {output_path} ({len(strings)} stringhe, {position} byte)")
+    return output_path
+
+class LexiconStore:
+    """Vista in sola lettura sull'archivio dei lessici mappato in memoria"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ModelLoadError(f"Archivio lessici vuoto: {path}", model_name="lexicon_store")
+        self._view = memoryview(self._mmap)
+
+        if len(self._mmap) < _HEADER.size:
+            self.close()
+            raise ModelLoadError(f"Archivio lessici troncato: {path}", model_name="lexicon_store")
+        magic, version, section_count, byteorder, digest = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION or byteorder != _BYTEORDER:
+            self.close()
+            raise ModelLoadError(f"Formato dell'archivio lessici non supportato: {path}", model_name="lexicon_store")
+        self.source_digest = digest
+
+        self._sections: Dict[str, memoryview] = {}
+        for index in range(section_count):
+            name, offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + index * _SECTION.size)
+            if offset + length > len(self._mmap):
+                self.close()
+                raise ModelLoadError(f"Archivio lessici troncato: {path}", model_name="lexicon_store")
+            self._sections[name.rstrip(b"\0").decode('ascii')] = self._view[offset:offset + length]
+
+        self._offsets = self._uint32_section("str_offsets")
+        self._data = self._sections["str_data"]
+        self._slots = self._uint32_section("str_hash")
+        self._tables = {name: self._uint32_section("t:" + name) for name in LEXICON_TABLES}
+        self._indexes = {name: self._uint32_section("i:" + name) for name in LEXICON_TABLES}
+
+    def _uint32_section(self, name: str) -> memoryview:
+        return self._sections[name].cast('I')
+
+    def close(self) -> None:
+        """Rilascia la mappatura e il file"""
+        for attribute in ("_offsets", "_slots", "_data"):
+            if hasattr(self, attribute):
+                getattr(self, attribute).release()
+        for views in (getattr(self, "_tables", {}), getattr(self, "_indexes", {}), getattr(self, "_sections", {})):
+            for view in views.values():
+                view.release()
+        if hasattr(self, "_view"):
+            self._view.release()
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "LexiconStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # Pool di stringhe
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def string(self, string_id: int) -> str:
+        """Restituisce la stringa internata con l'id indicato"""
+        return bytes(self._data[self._offsets[string_id]:self._offsets[string_id + 1]]).decode('utf-8')
+
+    def string_id(self, value: str) -> Optional[int]:
+        """Restituisce l'id di una stringa tramite la tabella hash precalcolata"""
+        data = value.encode('utf-8')
+        mask = len(self._slots) - 1
+        slot = _fnv1a(data) & mask
+        while True:
+            entry = self._slots[slot]
+            if entry == _EMPTY_SLOT:
+                return None
+            string_id = entry - 1
+            if self._data[self._offsets[string_id]:self._offsets[string_id + 1]] == data:
+                return string_id
+            slot = (slot + 1) & mask
+
+    def __contains__(self, value: str) -> bool:
+        return self.string_id(value) is not None
+
+    # Tabelle
+
+    def table_size(self, table: str) -> int:
+        return len(self._tables[table]) // LEXICON_TABLES[table]
+
+    def rows(self, table: str) -> Iterator[Tuple[str, ...]]:
+        """Itera le righe di una tabella nell'ordine dei file sorgente"""
+        cells = self._tables[table]
+        width = LEXICON_TABLES[table]
+        for start in range(0, len(cells), width):
+            yield tuple(self.string(cells[start + column]) for column in range(width))
+
+    def lookup(self, table: str, key: str) -> List[Tuple[str, ...]]:
+        """Righe della tabella la cui prima colonna vale key (ricerca binaria sull'indice ordinato)"""
+        key_id = self.string_id(key)
+        if key_id is None:
+            return []
+
+        cells = self._tables[table]
+        width = LEXICON_TABLES[table]
+        index = self._indexes[table]
+        first_column = lambda row: cells[row * width]
+        low = bisect_left(index, key_id, key=first_column)
+        high = bisect_right(index, key_id, lo=low, key=first_column)
+        return [
+            tuple(self.string(cells[index[position] * width + column]) for column in range(width))
+            for position in range(low, high)
+        ]
+
+    # Accesso ai singoli lessici
+
+    def is_stopword(self, word: str) -> bool:
+        return bool(self.lookup("stopwords", word))
+
+    def stemming_rules(self) -> List[Tuple[str, str]]:
+        return list(self.rows("stemming_rules"))
+
+    def compound_parts(self, compound: str) -> Optional[Tuple[str, str]]:
+        rows = self.lookup("compound_words", compound)
+        return rows[0][1:] if rows else None
+
+    def automotive_category(self, term: str) -> Optional[str]:
+        rows = self.lookup("automotive_terms", term)
+        return rows[0][1] if rows else None
+
+    def regional_variant(self, variant: str) -> Optional[Tuple[str, str]]:
+        rows = self.lookup("regional_variants", variant)
+        return rows[0][1:] if rows else None
+
+    def category(self, category_id: str) -> Optional[Dict[str, Any]]:
+        """Restituisce una categoria nel formato di data/italian_categories.json"""
+        rows = self.lookup("categories", category_id)
+        if not rows:
+            return None
+        _, name, description = rows[0]
+        return {
+            "id": category_id,
+            "name": name,
+            "description": description,
+            "keywords": [keyword for _, keyword in self.lookup("category_keywords", category_id)],
+            "subcategories": [child for _, child in self.lookup("category_children", category_id)],
+        }
+
+    def categories(self) -> Iterator[Dict[str, Any]]:
+        for category_id, _, _ in self.rows("categories"):
+            yield self.category(category_id)
+
+    def seo_keywords(self, category_id: str) -> Dict[str, List[str]]:
+        """Parole chiave SEO di una categoria raggruppate per fascia di volume"""
+        tiers: Dict[str, List[str]] = {}
+        for _, tier, keyword in self.lookup("seo_keywords", category_id):
+            tiers.setdefault(tier, []).append(keyword)
+        return tiers
+
+def open_lexicon_store(path: str = DEFAULT_LEXICON_PATH, data_dir: str = DEFAULT_DATA_DIR,
+                       auto_compile: bool = True) -> LexiconStore:
+    """Apre l'archivio dei lessici, ricompilandolo se manca o non corrisponde ai sorgenti"""
+    if auto_compile and os.path.isdir(data_dir):
+        digest = compute_sources_digest(data_dir)
+        store = None
+        if os.path.exists(path):
+            try:
+                store = LexiconStore(path)
+            except ModelLoadError as e:
+                logger.warning(f"Archivio lessici non valido, verrà ricompilato: {str(e)}")
+        if store is not None and store.source_digest == digest:
+            return store
+        if store is not None:
+            store.close()
+        compile_lexicon_store(data_dir, path)
+
+    return LexiconStore(path)
+
+_store_lock = threading.Lock()
+_lexicon_store: Optional[LexiconStore] = None
+
+def get_lexicon_store() -> LexiconStore:
+    """Restituisce l'archivio dei lessici condiviso dal processo (aperto una sola volta)"""
+    global _lexicon_store
+    if _lexicon_store is None:
+        with _store_lock:
+            if _lexicon_store is None:
+                _lexicon_store = open_lexicon_store()
+    return _lexicon_store
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compila i lessici italiani nell'archivio binario")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--output", default=DEFAULT_LEXICON_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    compile_lexicon_store(args.data_dir, args.output)
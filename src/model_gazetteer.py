@@ -0,0 +1,146 @@
+"""Gazetteer dei modelli di veicolo: trie di token per brand, consultato solo dopo il riconoscimento del brand"""
+
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+try:
+    from src.analysis_document import AnalysisDocument, as_document
+    from src.brand_resolver import DATA_DIR, fold_tokens
+except ImportError:
+    from analysis_document import AnalysisDocument, as_document
+    from brand_resolver import DATA_DIR, fold_tokens
+
+logger = logging.getLogger(__name__)
+
+MODELS_FILE = os.path.join(DATA_DIR, "vehicle_models.json")
+
+# Chiave del nodo terminale nel trie (i token non sono mai vuoti)
+_END = ""
+
+class ModelGazetteer:
+    """Modelli noti per brand; la ricerca percorre il titolo una volta per ogni brand trovato"""
+
+    def __init__(self):
+        # brand canonico -> trie {token: {token: ..., "": nome modello}}
+        self._tries: Dict[str, Dict[str, Any]] = {}
+        # alias del brand (token) -> brand canonico
+        self._brand_aliases: Dict[Tuple[str, ...], str] = {}
+
+    @classmethod
+    def from_mapping(cls, brands: Mapping[str, Mapping[str, Any]]) -> "ModelGazetteer":
+        """Costruisce il gazetteer da {brand: {"aliases": [...], "models": {modello: [alias]}}}"""
+        gazetteer = cls()
+        for brand, entry in brands.items():
+            gazetteer.add_brand(brand, entry.get("aliases", ()))
+            for model, aliases in entry.get("models", {}).items():
+                gazetteer.add_model(brand, model, aliases or [model])
+        return gazetteer
+
+    @classmethod
+    def from_file(cls, path: str = MODELS_FILE) -> "ModelGazetteer":
+        """Carica il gazetteer dal file dati (vuoto se il file non esiste)"""
+        if not os.path.exists(path):
+            logger.warning(f"File dei modelli non trovato: {path}")
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_mapping(json.load(f).get("brands", {}))
+
+    def __len__(self) -> int:
+        return len(self._tries)
+
+    def add_brand(self, brand: str, aliases: Iterable[str] = ()) -> None:
+        """Registra un brand e i nomi con cui può essere indicato"""
+        self._tries.setdefault(brand, {})
+        for alias in (brand, *aliases):
+            tokens = tuple(fold_tokens(alias))
+            if tokens:
+                self._brand_aliases.setdefault(tokens, brand)
+
+    def add_model(self, brand: str, model: str, aliases: Iterable[str]) -> None:
+        """Aggiunge un modello al trie del brand"""
+        self.add_brand(brand)
+        trie = self._tries[brand]
+        for alias in aliases:
+            tokens = fold_tokens(alias)
+            if not tokens:
+                continue
+            node = trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(_END, model)
+
+    def models(self) -> Dict[str, List[str]]:
+        """Modelli registrati per brand"""
+        catalog = {}
+        for brand, trie in self._tries.items():
+            names = set()
+            stack = [trie]
+            while stack:
+                node = stack.pop()
+                for token, child in node.items():
+                    if token == _END:
+                        names.add(child)
+                    else:
+                        stack.append(child)
+            catalog[brand] = sorted(names)
+        return catalog
+
+    def canonical_brand(self, brand: str) -> Optional[str]:
+        """Brand canonico a partire dal nome o da un alias"""
+        return self._brand_aliases.get(tuple(fold_tokens(brand)))
+
+    def find_models(self, tokens: Sequence[str], brands: Iterable[str]) -> List[Tuple[str, str, int, int]]:
+        """Occorrenze (brand, modello, token iniziale, token finale) dei modelli dei brand indicati
+
+        A ogni posizione vince il modello più lungo ("punto evo" prima di "punto").
+        """
+        matches = []
+        seen = set()
+        for brand in brands:
+            canonical = self._brand_aliases.get(tuple(fold_tokens(brand)))
+            if canonical is None or canonical in seen:
+                continue
+            seen.add(canonical)
+            trie = self._tries[canonical]
+            position = 0
+            while position < len(tokens):
+                node = trie.get(tokens[position])
+                best = None
+                end = position + 1
+                while node is not None:
+                    if _END in node:
+                        best = (node[_END], end)
+                    if end >= len(tokens):
+                        break
+                    node = node.get(tokens[end])
+                    end += 1
+                if best is None:
+                    position += 1
+                    continue
+                matches.append((canonical, best[0], position, best[1]))
+                position = best[1]
+        matches.sort(key=lambda match: match[2])
+        return matches
+
+    def resolve(self, text: Union[str, AnalysisDocument], brands: Iterable[str]) -> List[str]:
+        """Modelli distinti presenti nel testo (o nei token del documento), in ordine di apparizione"""
+        models = []
+        for _, model, _, _ in self.find_models(as_document(text).tokens, brands):
+            if model not in models:
+                models.append(model)
+        return models
+
+_gazetteer: Optional[ModelGazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+def get_model_gazetteer() -> ModelGazetteer:
+    """Gazetteer condiviso dal processo, caricato alla prima richiesta"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = ModelGazetteer.from_file()
+    return _gazetteer
@@ -108,7 +108,22 @@ class MetricsCollector:
         """Registra un cache miss"""
         with self._lock:
             self.metrics['cache_misses'] += 1
-    
+
+    def increment_requests(self, name: str = "categorize"):
+        """Incrementa il contatore delle richieste (senza tempi di risposta)"""
+        with self._lock:
+            self.metrics['requests'][name] += 1
+
+    def increment_categorizations(self, category: str = "total"):
+        """Incrementa il contatore delle categorizzazioni completate"""
+        with self._lock:
+            self.metrics['categorizations'][category] += 1
+
+    def increment_errors(self, name: str = "categorize"):
+        """Incrementa il contatore degli errori"""
+        with self._lock:
+            self.metrics['errors'][name] += 1
+
     def get_summary(self) -> Dict[str, Any]:
         """Restituisce un riassunto delle metriche"""
         with self._lock:
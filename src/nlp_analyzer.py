@@ -1,9 +1,12 @@
 import re
 import json
-from typing import Dict, List, Tuple, Optional, Set
+from typing import Dict, List, Tuple, Optional, Set, Union
 from dataclasses import dataclass
 from collections import Counter
-import unicodedata
+
+from analysis_document import AnalysisDocument, as_document, fold_accents
+from brand_resolver import BrandResolver, load_brand_groups
+from model_gazetteer import get_model_gazetteer
 
 @dataclass
 class EntityRecognitionResult:
@@ -21,9 +24,19 @@ class MultilingualNLPAnalyzer:
     
     def __init__(self):
         self.brand_database = self._load_brand_database()
+        self.brand_resolver = BrandResolver.from_brand_database(self.brand_database)
+        self.model_gazetteer = get_model_gazetteer()
         self.category_keywords = self._load_category_keywords()
+        # Keyword piegate come il testo normalizzato (le originali restano per le keyword SEO)
+        self._folded_category_keywords = {
+            category: {lang: [fold_accents(keyword) for keyword in keywords] for lang, keywords in lang_keywords.items()}
+            for category, lang_keywords in self.category_keywords.items()
+        }
         self.technical_patterns = self._load_technical_patterns()
-        self.language_patterns = self._load_language_patterns()
+        self.language_patterns = {
+            lang: [fold_accents(pattern) for pattern in patterns]
+            for lang, patterns in self._load_language_patterns().items()
+        }
         self.stopwords = self._load_stopwords()
         
     def _load_brand_database(self) -> Dict[str, Dict[str, List[str]]]:
@@ -61,7 +74,9 @@ class MultilingualNLPAnalyzer:
                 "Seat": ["seat"],
                 "Skoda": ["skoda", "škoda"],
                 "Volvo": ["volvo"]
-            }
+            },
+            # Brand OEM aggiuntivi e aftermarket (Bosch, Brembo, Valeo, ...) dal file dati
+            **load_brand_groups()
         }
     
     def _load_category_keywords(self) -> Dict[str, Dict[str, List[str]]]:
@@ -135,17 +150,18 @@ class MultilingualNLPAnalyzer:
             "es": {"el", "la", "de", "que", "y", "a", "en", "un", "ser", "se", "no", "te"}
         }
     
-    def analyze_entities(self, text: str) -> EntityRecognitionResult:
+    def analyze_entities(self, text: Union[str, AnalysisDocument]) -> EntityRecognitionResult:
         """Analizza il testo per estrarre entità automotive"""
-        # Normalizza il testo
-        normalized_text = self._normalize_text(text)
+        # Normalizza e tokenizza il testo una sola volta
+        document = as_document(text)
+        normalized_text = document.folded
         
         # Rileva lingue
         languages = self._detect_languages(normalized_text)
         
         # Estrai entità
-        brands = self._extract_brands(normalized_text)
-        models = self._extract_models(normalized_text)
+        brands = self._extract_brands(document)
+        models = self._extract_models(document, brands)
         categories = self._extract_product_categories(normalized_text, languages)
         technical_specs = self._extract_technical_specs(normalized_text)
         years = self._extract_years(normalized_text)
@@ -166,24 +182,8 @@ class MultilingualNLPAnalyzer:
         )
     
     def _normalize_text(self, text: str) -> str:
-        """Normalizza il testo per l'analisi"""
-        # Converti in lowercase
-        text = text.lower()
-        
-        # Rimuovi accenti ma mantieni caratteri speciali per il riconoscimento lingua
-        text = unicodedata.normalize('NFD', text)
-        
-        # Sostituisci caratteri speciali comuni
-        replacements = {
-            'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss',
-            'à': 'a', 'è': 'e', 'ì': 'i', 'ò': 'o', 'ù': 'u',
-            'é': 'e', 'ç': 'c', 'ñ': 'n'
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        return text
+        """Normalizza il testo per l'analisi (minuscolo, senza accenti)"""
+        return as_document(text).folded
     
     def _detect_languages(self, text: str) -> List[str]:
         """Rileva le lingue presenti nel testo"""
@@ -200,45 +200,21 @@ class MultilingualNLPAnalyzer:
         
         return detected_languages
     
-    def _extract_brands(self, text: str) -> List[str]:
-        """Estrae brand automobilistici dal testo"""
-        found_brands = []
-        
-        for category, brands in self.brand_database.items():
-            for brand, variants in brands.items():
-                for variant in variants:
-                    if variant in text:
-                        if brand not in found_brands:
-                            found_brands.append(brand)
-                        break
-        
-        return found_brands
+    def _extract_brands(self, text: Union[str, AnalysisDocument]) -> List[str]:
+        """Estrae brand automobilistici dal testo (alias confrontati a livello di parola)"""
+        return self.brand_resolver.resolve(text)
     
-    def _extract_models(self, text: str) -> List[str]:
-        """Estrae modelli di veicoli dal testo"""
-        models = []
-        
-        # Pattern per modelli comuni
-        model_patterns = [
-            r'\b([a-z]\d{1,3}[a-z]?)\b',  # Es: a4, x5, 320i
-            r'\b(\d{3,4}[a-z]{0,3})\b',   # Es: 320i, 500l
-            r'\b([a-z]{2,}\s?\d+)\b',     # Es: golf 7, punto evo
-            r'\b([a-z]+\s[a-z]+)\b'       # Es: serie 3, classe a
-        ]
-        
-        for pattern in model_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                if len(match) > 1 and match not in models:
-                    models.append(match)
-        
-        return models[:5]  # Limita a 5 modelli per evitare rumore
+    def _extract_models(self, text: Union[str, AnalysisDocument], brands: List[str]) -> List[str]:
+        """Estrae i modelli noti dei brand trovati (es. Golf 7, Punto Evo, Serie 3)"""
+        if not brands:
+            return []
+        return self.model_gazetteer.resolve(text, brands)[:5]  # Limita a 5 modelli
     
     def _extract_product_categories(self, text: str, languages: List[str]) -> List[str]:
         """Estrae categorie di prodotto basate sulle lingue rilevate"""
         categories = []
         
-        for category, lang_keywords in self.category_keywords.items():
+        for category, lang_keywords in self._folded_category_keywords.items():
             for lang in languages:
                 if lang in lang_keywords:
                     keywords = lang_keywords[lang]
@@ -1,10 +1,18 @@
-import re
 import json
 from typing import Dict, List, Tuple, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from collections import defaultdict
-import unicodedata
 
+from analysis_document import AnalysisDocument
+from category_tree import VersionedCategoryTree, contains_path, diff_trees, freeze_tree, insert_path
+from result_cache import ResultCache, cacheable, compute_version
+from extraction_engine import ExtractionEngine, expand_pattern
+from model_gazetteer import get_model_gazetteer
+
+# Da incrementare quando cambia la logica di estrazione (invalida i risultati in cache)
+EXTRACTION_RULES_REVISION = 4
+
+@cacheable
 @dataclass
 class ProductAnalysis:
     """Risultato dell'analisi semantica di un prodotto"""
@@ -25,15 +33,37 @@ class CategoryResult:
     nuovo_albero: Dict[str, Any]
     confidence_score: float
     is_new_category: bool
+    # Nodi aggiunti rispetto all'albero di partenza (operazioni JSON Patch) e versione dell'albero condiviso
+    modifiche_albero: List[Dict[str, Any]] = field(default_factory=list)
+    versione_albero: Optional[int] = None
+
+@cacheable
+@dataclass
+class PreparedCategorization:
+    """Risultato della fase di analisi, non ancora applicato all'albero delle categorie"""
+    analysis: ProductAnalysis
+    category_path: List[str]
+    seo_tags: List[str]
 
 class ProductCategorizer:
     """Sistema di categorizzazione automatica dei prodotti con ottimizzazione SEO"""
     
-    def __init__(self):
-        self.category_tree = {}
+    def __init__(self, result_cache: Optional[ResultCache] = None):
+        # Albero condiviso tra le richieste: snapshot immutabili pubblicate in modo atomico
+        self.tree_store = VersionedCategoryTree()
         self.seo_keywords_db = self._load_seo_keywords()
         self.brand_patterns = self._load_brand_patterns()
         self.product_type_patterns = self._load_product_type_patterns()
+        self.function_keywords = self._load_function_keywords()
+        self.model_gazetteer = get_model_gazetteer()
+        self.extraction_engine = self._build_extraction_engine()
+        
+        # Cache della fase di analisi: la versione cambia con le regole di estrazione
+        self.result_cache = result_cache
+        self.rules_version = compute_version(
+            self.seo_keywords_db, self.brand_patterns, self.product_type_patterns,
+            self.function_keywords, self.model_gazetteer.models(), EXTRACTION_RULES_REVISION
+        )
         
     def _load_seo_keywords(self) -> Dict[str, List[str]]:
         """Carica database di parole chiave SEO per categoria"""
@@ -66,20 +96,37 @@ class ProductCategorizer:
             "ammortizzatori": [r'ammortizzator[ei]', r'shock absorber', r'sospension[ei]']
         }
     
+    def _load_function_keywords(self) -> Dict[str, List[str]]:
+        """Parole chiave per la funzione principale del prodotto"""
+        return {
+            "frenata": ["freno", "frenata", "brake", "stop"],
+            "filtrazione": ["filtro", "filter", "filtraggio"],
+            "lubrificazione": ["olio", "oil", "lubrificante"],
+            "accensione": ["candela", "spark", "accensione"],
+            "sospensione": ["ammortizzatore", "shock", "sospensione"]
+        }
+    
     def analyze_product(self, title: str, description: str) -> ProductAnalysis:
         """Analizza semanticamente titolo e descrizione del prodotto"""
-        text = f"{title} {description}".lower()
-        
-        # Normalizza il testo
-        text = self._normalize_text(text)
-        
-        # Estrai informazioni
-        product_type = self._extract_product_type(text)
-        brand = self._extract_brand(text)
-        model = self._extract_model(text)
-        main_function = self._extract_main_function(text)
-        compatibility = self._extract_compatibility(text)
-        seo_keywords = self._extract_seo_keywords(text)
+        return self._analyze_normalized_text(self._prepare_text(title, description))
+    
+    def _prepare_text(self, title: str, description: str) -> str:
+        """Testo minuscolo e normalizzato su cui lavorano tutte le estrazioni"""
+        return AnalysisDocument.from_parts(title, description).normalized
+    
+    def _analyze_normalized_text(self, text: str) -> ProductAnalysis:
+        """Analisi del testo già normalizzato"""
+        # Estrai tutte le informazioni con una sola scansione del testo
+        scan = self.extraction_engine.scan(text)
+        
+        product_type = scan.first_by_priority("product_type")
+        if product_type is None:
+            product_type = "Ricambi Generici" if "generic_parts" in scan else "Prodotto Generico"
+        brand = scan.first_by_priority("brand")
+        model = self._extract_model(text, brand)
+        main_function = scan.first_by_priority("main_function") or "Funzione Generica"
+        compatibility = self._extract_compatibility(scan.numbers)
+        seo_keywords = scan.values("seo_keywords")
         
         # Calcola confidence score
         confidence = self._calculate_confidence(product_type, brand, main_function)
@@ -94,128 +141,134 @@ class ProductCategorizer:
             confidence_score=confidence
         )
     
+    @property
+    def category_tree(self) -> Dict[str, Any]:
+        """Ultima versione pubblicata dell'albero delle categorie (immutabile)"""
+        return self.tree_store.snapshot()
+    
+    @category_tree.setter
+    def category_tree(self, tree: Dict[str, Any]) -> None:
+        self.tree_store.replace(tree)
+    
     def categorize_product(self, title: str, description: str, 
                           current_tree: Dict[str, Any] = None,
                           target_seo_keywords: List[str] = None) -> CategoryResult:
         """Categorizza automaticamente il prodotto"""
-        if current_tree:
-            self.category_tree = current_tree
+        prepared = self.prepare_categorization(title, description, target_seo_keywords)
+        return self.apply_categorization(prepared, current_tree)
+    
+    def prepare_categorization(self, title: str, description: str,
+                               target_seo_keywords: List[str] = None) -> PreparedCategorization:
+        """Fase indipendente dall'albero: analisi, percorso di categoria e tag SEO"""
+        text = self._prepare_text(title, description)
+        
+        if self.result_cache is None:
+            return self._prepare_from_text(text, target_seo_keywords)
         
+        cache_key = self._cache_key_for_text(text, target_seo_keywords)
+        return self.result_cache.get_or_compute(
+            cache_key, lambda: self._prepare_from_text(text, target_seo_keywords)
+        )
+    
+    def preparation_cache_key(self, title: str, description: str,
+                              target_seo_keywords: List[str] = None) -> str:
+        """Chiave di cache della fase di analisi per un prodotto"""
+        return self._cache_key_for_text(self._prepare_text(title, description), target_seo_keywords)
+    
+    def _cache_key_for_text(self, text: str, target_seo_keywords: List[str] = None) -> str:
+        """Chiave di cache: testo normalizzato, parole chiave target (come usate nei tag) e versione delle regole"""
+        keywords = sorted({kw.lower() for kw in target_seo_keywords}) if target_seo_keywords else []
+        return self.result_cache.key_for(self.rules_version, text, keywords)
+    
+    def _prepare_from_text(self, text: str, target_seo_keywords: List[str] = None) -> PreparedCategorization:
         # Analizza il prodotto
-        analysis = self.analyze_product(title, description)
+        analysis = self._analyze_normalized_text(text)
         
         # Trova o crea categoria appropriata
         category_path = self._find_or_create_category(analysis, target_seo_keywords)
         
-        # Aggiorna albero categorie
-        updated_tree = self._update_category_tree(category_path)
-        
         # Genera tags SEO
         seo_tags = self._generate_seo_tags(analysis, target_seo_keywords)
         
+        return PreparedCategorization(
+            analysis=analysis,
+            category_path=category_path,
+            seo_tags=seo_tags
+        )
+    
+    def apply_categorization(self, prepared: PreparedCategorization,
+                             current_tree: Dict[str, Any] = None) -> CategoryResult:
+        """Fase dipendente dall'albero: inserisce il percorso e costruisce il risultato
+        
+        Senza albero (o con l'ultima snapshot condivisa) il percorso viene pubblicato nell'albero
+        condiviso; un albero diverso fornito dalla richiesta fa da overlay privato e non viene
+        pubblicato. In entrambi i casi l'albero di partenza non viene mai modificato.
+        """
+        category_path = prepared.category_path
+        
+        # Aggiorna albero categorie
+        if not current_tree or current_tree is self.tree_store.snapshot():
+            previous_tree, updated_tree, version = self.tree_store.update(
+                lambda tree: self._update_category_tree(tree, category_path)
+            )
+        else:
+            previous_tree = freeze_tree(current_tree)
+            updated_tree = self._update_category_tree(previous_tree, category_path)
+            version = None
+        
         return CategoryResult(
             categoria_principale=category_path[0],
             sottocategoria=" > ".join(category_path[1:]) if len(category_path) > 1 else "",
-            tags_seo=seo_tags,
+            tags_seo=prepared.seo_tags,
             nuovo_albero=updated_tree,
-            confidence_score=analysis.confidence_score,
-            is_new_category=self._is_new_category(category_path)
+            confidence_score=prepared.analysis.confidence_score,
+            is_new_category=self._is_new_category(category_path, previous_tree),
+            modifiche_albero=diff_trees(previous_tree, updated_tree),
+            versione_albero=version
         )
     
     def _normalize_text(self, text: str) -> str:
         """Normalizza il testo rimuovendo accenti e caratteri speciali"""
-        # Rimuovi accenti
-        text = unicodedata.normalize('NFD', text)
-        text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
-        
-        # Rimuovi caratteri speciali
-        text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)
-        
-        # Normalizza spazi
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return AnalysisDocument(text).normalized
     
-    def _extract_product_type(self, text: str) -> str:
-        """Estrae la tipologia di prodotto dal testo"""
-        for product_type, patterns in self.product_type_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, text, re.IGNORECASE):
-                    return product_type.replace('_', ' ').title()
+    def _build_extraction_engine(self) -> ExtractionEngine:
+        """Compila tutti i pattern di tipologia, brand, funzione e parole chiave in un unico scanner"""
+        engine = ExtractionEngine()
         
-        # Fallback: cerca parole chiave generiche
-        if any(word in text for word in ['ricambi', 'parts', 'componenti']):
-            return "Ricambi Generici"
-        
-        return "Prodotto Generico"
-    
-    def _extract_brand(self, text: str) -> Optional[str]:
-        """Estrae il brand dal testo"""
-        for pattern in self.brand_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        return None
-    
-    def _extract_model(self, text: str) -> Optional[str]:
-        """Estrae il modello dal testo"""
-        # Pattern per modelli comuni
-        model_patterns = [
-            r'\b([A-Z]\d{2,4}[A-Z]?)\b',  # Es: A4, X5, 320i
-            r'\b(\d{3,4}[A-Z]{0,2})\b',   # Es: 320i, 500L
-            r'\b([A-Z]{2,}\s?\d+)\b'      # Es: Golf 7, Punto Evo
-        ]
-        
-        for pattern in model_patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(1)
-        return None
-    
-    def _extract_main_function(self, text: str) -> str:
-        """Estrae la funzione principale del prodotto"""
-        function_keywords = {
-            "frenata": ["freno", "frenata", "brake", "stop"],
-            "filtrazione": ["filtro", "filter", "filtraggio"],
-            "lubrificazione": ["olio", "oil", "lubrificante"],
-            "accensione": ["candela", "spark", "accensione"],
-            "sospensione": ["ammortizzatore", "shock", "sospensione"]
-        }
-        
-        for function, keywords in function_keywords.items():
-            if any(keyword in text for keyword in keywords):
-                return function.title()
-        
-        return "Funzione Generica"
+        # Tipologie e brand: vince il primo pattern (in ordine) presente nel testo
+        for priority, (product_type, patterns) in enumerate(self.product_type_patterns.items()):
+            for pattern in patterns:
+                engine.add_pattern("product_type", pattern, product_type.replace('_', ' ').title(),
+                                   priority, ignore_case=True)
+        for priority, pattern in enumerate(self.brand_patterns):
+            literals, word_bounded = expand_pattern(pattern)
+            for literal in literals:
+                engine.add_literal("brand", literal.lower(), literal.lower(), priority, word_bounded)
+        
+        # Fallback per i ricambi generici
+        for keyword in ['ricambi', 'parts', 'componenti']:
+            engine.add_literal("generic_parts", keyword, keyword)
+        
+        for priority, (function, keywords) in enumerate(self.function_keywords.items()):
+            for keyword in keywords:
+                engine.add_literal("main_function", keyword, function.title(), priority)
+        
+        seo_keywords = [keyword for keywords in self.seo_keywords_db.values() for keyword in keywords]
+        for priority, keyword in enumerate(seo_keywords):
+            engine.add_literal("seo_keywords", keyword, keyword, priority)
+        
+        return engine.build()
     
-    def _extract_compatibility(self, text: str) -> List[str]:
-        """Estrae informazioni di compatibilità"""
-        compatibility = []
-        
-        # Pattern per anni
-        year_pattern = r'\b(19|20)\d{2}\b'
-        years = re.findall(year_pattern, text)
-        if years:
-            compatibility.extend([f"Anno {year}" for year in years])
-        
-        # Pattern per cilindrata
-        engine_pattern = r'\b(\d+\.\d+)\s?(l|litri?)\b'
-        engines = re.findall(engine_pattern, text, re.IGNORECASE)
-        if engines:
-            compatibility.extend([f"{engine[0]}L" for engine in engines])
-        
-        return compatibility
+    def _extract_model(self, text: str, brand: Optional[str]) -> Optional[str]:
+        """Estrae il modello dal gazetteer del brand riconosciuto (es. Serie 3, Golf 7)"""
+        if not brand:
+            return None
+        models = self.model_gazetteer.find_models(text.split(), [brand])
+        return models[0][1] if models else None
     
-    def _extract_seo_keywords(self, text: str) -> List[str]:
-        """Estrae parole chiave SEO rilevanti"""
-        keywords = set()
-        
-        for category, category_keywords in self.seo_keywords_db.items():
-            for keyword in category_keywords:
-                if keyword in text:
-                    keywords.add(keyword)
-        
-        return list(keywords)
+    def _extract_compatibility(self, numbers: List[str]) -> List[str]:
+        """Estrae informazioni di compatibilità (anni)"""
+        return [f"Anno {number}" for number in numbers if len(number) == 4 and number[:2] in ("19", "20")]
     
     def _calculate_confidence(self, product_type: str, brand: Optional[str], 
                             main_function: str) -> float:
@@ -260,16 +313,9 @@ class ProductCategorizer:
         # Categoria di fallback
         return ["Ricambi Auto", "Altri Componenti"]
     
-    def _update_category_tree(self, category_path: List[str]) -> Dict[str, Any]:
-        """Aggiorna l'albero delle categorie"""
-        current = self.category_tree
-        
-        for category in category_path:
-            if category not in current:
-                current[category] = {}
-            current = current[category]
-        
-        return self.category_tree
+    def _update_category_tree(self, tree: Dict[str, Any], category_path: List[str]) -> Dict[str, Any]:
+        """Restituisce l'albero con il percorso aggiunto (copia solo i nodi lungo il percorso)"""
+        return insert_path(tree, category_path)
     
     def _generate_seo_tags(self, analysis: ProductAnalysis, 
                           target_seo_keywords: List[str] = None) -> List[str]:
@@ -298,16 +344,9 @@ class ProductCategorizer:
         # Rimuovi duplicati e ordina per rilevanza
         return sorted(list(tags))
     
-    def _is_new_category(self, category_path: List[str]) -> bool:
-        """Verifica se la categoria è stata creata ex novo"""
-        current = self.category_tree
-        
-        for category in category_path:
-            if category not in current:
-                return True
-            current = current[category]
-        
-        return False
+    def _is_new_category(self, category_path: List[str], previous_tree: Dict[str, Any]) -> bool:
+        """Verifica se la categoria è stata creata ex novo (rispetto all'albero prima dell'aggiornamento)"""
+        return not contains_path(previous_tree, category_path)
     
     def get_category_suggestions(self, partial_analysis: ProductAnalysis, 
                                max_suggestions: int = 5) -> List[Tuple[List[str], float]]:
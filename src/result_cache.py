@@ -0,0 +1,167 @@
+"""Cache dei risultati di categorizzazione indirizzata per contenuto (memoria + Redis opzionale)"""
+
+import json
+import hashlib
+import logging
+import dataclasses
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from src.utils import CacheUtils
+except ImportError:
+    from utils import CacheUtils
+
+logger = logging.getLogger(__name__)
+
+_KEY_SEPARATOR = "\x1f"
+# Campo che identifica una dataclass serializzata nella cache
+_TYPE_FIELD = "__cache_type__"
+# Dataclass ricostruibili dalla cache: i dati letti (anche da Redis) non possono istanziare altri tipi
+_CACHEABLE_TYPES: Dict[str, type] = {}
+
+def cacheable(cls: type) -> type:
+    """Registra una dataclass come valore ammesso nella cache dei risultati"""
+    _CACHEABLE_TYPES[cls.__qualname__] = cls
+    return cls
+
+def _encode_value(value: Any) -> Any:
+    """Conversione JSON delle dataclass registrate e degli insiemi"""
+    if dataclasses.is_dataclass(value) and _CACHEABLE_TYPES.get(type(value).__qualname__) is type(value):
+        return {_TYPE_FIELD: type(value).__qualname__,
+                **{item.name: getattr(value, item.name) for item in dataclasses.fields(value)}}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    raise TypeError(f"Valore non memorizzabile nella cache: {type(value).__name__}")
+
+def _decode_object(data: Dict[str, Any]) -> Any:
+    type_name = data.get(_TYPE_FIELD)
+    if type_name is None:
+        return data
+    cls = _CACHEABLE_TYPES.get(type_name)
+    if cls is None:
+        raise ValueError(f"Tipo non ammesso nella cache: {type_name}")
+    return cls(**{name: value for name, value in data.items() if name != _TYPE_FIELD})
+
+def dumps_value(value: Any) -> bytes:
+    """Serializza un risultato in JSON (le dataclass registrate con cacheable sono ammesse)"""
+    return json.dumps(value, default=_encode_value, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+def loads_value(data: bytes) -> Any:
+    """Ricostruisce un risultato serializzato con dumps_value"""
+    return json.loads(data, object_hook=_decode_object)
+
+def _canonical(value: Any) -> Any:
+    """Rende deterministica la serializzazione di mapping, set e tuple"""
+    if isinstance(value, dict) or hasattr(value, "items"):
+        return {str(key): _canonical(item) for key, item in sorted(value.items(), key=lambda pair: str(pair[0]))}
+    if isinstance(value, (set, frozenset)):
+        return sorted(_canonical(item) for item in value)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+def compute_version(*components: Any) -> str:
+    """Impronta delle regole/tassonomie/lessici che determinano il risultato"""
+    payload = json.dumps([_canonical(component) for component in components], sort_keys=True,
+                         ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+class ResultCache:
+    """Cache a due livelli: LRU in processo e, se configurato, Redis condiviso tra i worker"""
+
+    def __init__(self, namespace: str, memory: Optional[CacheUtils] = None, redis_client: Any = None,
+                 ttl_seconds: int = 3600, metrics: Any = None):
+        self.namespace = namespace
+        self.memory = memory if memory is not None else CacheUtils(ttl_seconds=ttl_seconds)
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.metrics = metrics
+
+    def key_for(self, version: str, *parts: Any) -> str:
+        """Chiave indirizzata per contenuto: sha256 della versione e del testo normalizzato"""
+        digest = hashlib.sha256()
+        digest.update(version.encode('utf-8'))
+        for part in parts:
+            digest.update(_KEY_SEPARATOR.encode('utf-8'))
+            digest.update(json.dumps(_canonical(part), ensure_ascii=False).encode('utf-8'))
+        return f"{self.namespace}:{version}:{digest.hexdigest()}"
+
+    def _record(self, hit: bool) -> None:
+        if self.metrics is None:
+            return
+        if hit:
+            self.metrics.record_cache_hit()
+        else:
+            self.metrics.record_cache_miss()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Restituisce il valore in cache (una copia) oppure None"""
+        data = self.memory.get(key)
+        if data is None and self.redis is not None:
+            try:
+                data = self.redis.get(key)
+            except Exception as e:
+                logger.warning(f"Cache Redis non disponibile in lettura: {str(e)}")
+                data = None
+            promote = data is not None
+        else:
+            promote = False
+
+        value = None
+        if data is not None:
+            try:
+                value = loads_value(data)
+            except (ValueError, TypeError) as e:
+                # Valore non valido (formato precedente o scritto da terzi): trattato come assente
+                logger.warning(f"Valore non valido nella cache dei risultati: {str(e)}")
+            else:
+                if promote:
+                    # Promuove il valore nel livello in memoria
+                    self.memory.set(key, data)
+        self._record(value is not None)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Salva il valore (in JSON) in entrambi i livelli"""
+        data = dumps_value(value)
+        self.memory.set(key, data)
+        if self.redis is not None:
+            try:
+                self.redis.setex(key, self.ttl_seconds, data)
+            except Exception as e:
+                logger.warning(f"Cache Redis non disponibile in scrittura: {str(e)}")
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Restituisce il valore in cache o lo calcola e lo salva"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Svuota il livello in memoria (Redis scade tramite TTL e versione)"""
+        self.memory.clear()
+
+def create_result_cache(namespace: str, enabled: bool = True, max_size: int = 1000, ttl_seconds: int = 3600,
+                        redis_url: Optional[str] = None, metrics: Any = None,
+                        max_bytes: Optional[int] = None) -> Optional[ResultCache]:
+    """Crea la cache dei risultati; il livello Redis viene attivato solo se il client è installato"""
+    if not enabled:
+        return None
+
+    redis_client = None
+    if redis_url:
+        try:
+            import redis
+            redis_client = redis.Redis.from_url(redis_url)
+        except ImportError:
+            logger.warning("Pacchetto redis non installato: cache dei risultati solo in memoria")
+
+    return ResultCache(
+        namespace,
+        memory=CacheUtils(max_size=max_size, ttl_seconds=ttl_seconds, max_bytes=max_bytes),
+        redis_client=redis_client,
+        ttl_seconds=ttl_seconds,
+        metrics=metrics
+    )
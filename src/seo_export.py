@@ -0,0 +1,282 @@
+"""Esportazione in streaming di meta tag e sitemap per tutto l'albero delle categorie"""
+
+import os
+import sys
+import csv
+import json
+import time
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+from urllib.parse import urlparse
+from xml.sax.saxutils import escape
+
+try:
+    from src.analysis_document import AnalysisDocument
+    from src.seo_optimizer import SEOOptimizer
+except ImportError:
+    from analysis_document import AnalysisDocument
+    from seo_optimizer import SEOOptimizer
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("meta-ndjson", "sitemap-xml", "sitemap-csv")
+# Formati con URL pubblici, che richiedono un URL di base assoluto
+SITEMAP_FORMATS = ("sitemap-xml", "sitemap-csv")
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+SITEMAP_HEADER = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NAMESPACE}">\n'
+SITEMAP_FOOTER = "</urlset>\n"
+# Limiti del protocollo sitemap per singolo file (oltre si usa un indice di sitemap)
+SITEMAP_MAX_URLS = 50000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+# Nomi di nodo distinti di cui tenere le keyword long-tail
+LONG_TAIL_MEMO_SIZE = 10000
+# Ogni quanti nodi viene registrato l'avanzamento
+PROGRESS_EVERY = 10000
+
+@dataclass
+class CategoryMeta:
+    """Meta tag e URL di un nodo dell'albero"""
+    path: List[str]
+    url: str
+    title: str
+    description: str
+    keywords: str
+
+@dataclass
+class ExportStats:
+    """Riepilogo di un'esportazione"""
+    nodes: int = 0
+    bytes_written: int = 0
+    seconds: float = 0.0
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+def is_absolute_url(url: str) -> bool:
+    """Vero per URL http(s) con host, come richiesto nei <loc> delle sitemap"""
+    parsed = urlparse(url)
+    return parsed.scheme in ("http", "https") and bool(parsed.netloc)
+
+def category_slug(name: str) -> str:
+    """Segmento di URL di una categoria (minuscolo, senza accenti, parole separate da trattini)"""
+    return AnalysisDocument(name).normalized.replace(" ", "-")
+
+class SEOTreeExporter:
+    """Visita l'albero una volta, condividendo tra i figli i valori calcolati sui prefissi del path
+
+    La memoria usata è proporzionale alla profondità dell'albero, non al numero di nodi:
+    i nodi vengono prodotti uno alla volta e scritti subito.
+    """
+
+    def __init__(self, optimizer: Optional[SEOOptimizer] = None, product_keywords: Optional[List[str]] = None,
+                 base_url: str = "", max_sitemap_urls: int = SITEMAP_MAX_URLS):
+        self.optimizer = optimizer or SEOOptimizer()
+        self.product_keywords = product_keywords
+        self.base_url = base_url.rstrip("/")
+        self.max_sitemap_urls = max_sitemap_urls
+        # Le keyword long-tail dipendono solo dal nome del nodo
+        self._long_tail: Dict[str, List[str]] = {}
+
+    def iter_nodes(self, tree: Dict[str, Any]) -> Iterator[CategoryMeta]:
+        """Meta tag di ogni nodo in pre-ordine (albero annidato {nome: {figlio: {...}}})"""
+        optimizer = self.optimizer
+        # Stato di un prefisso: path, testo minuscolo, breadcrumb, varianti, URL
+        root_state: Tuple[List[str], str, str, List[str], str] = ([], "", "", [], self.base_url)
+        stack = [(iter(tree.items()), root_state)]
+        while stack:
+            children, (path, text, breadcrumb, variants, url) = stack[-1]
+            entry = next(children, None)
+            if entry is None:
+                stack.pop()
+                continue
+            name, subtree = entry
+
+            node_path = path + [name]
+            node_text = f"{text} {name.lower()}" if path else name.lower()
+            node_breadcrumb = f"{breadcrumb} > {name}" if path else name
+            node_variants = variants + optimizer._category_variants(name)
+            node_url = f"{url}/{category_slug(name)}"
+
+            primary_keywords = optimizer._generate_primary_keywords(node_path, node_text, node_variants)
+            leaf = name.lower()
+            long_tail_keywords = self._long_tail.get(leaf)
+            if long_tail_keywords is None:
+                if len(self._long_tail) >= LONG_TAIL_MEMO_SIZE:
+                    self._long_tail.clear()
+                long_tail_keywords = self._long_tail[leaf] = \
+                    optimizer._generate_long_tail_keywords(node_path, self.product_keywords)
+            meta = optimizer._build_meta_tags(node_path, primary_keywords, long_tail_keywords, node_breadcrumb)
+            yield CategoryMeta(path=node_path, url=node_url, **meta)
+
+            if isinstance(subtree, dict) and subtree:
+                stack.append((iter(subtree.items()), (node_path, node_text, node_breadcrumb, node_variants, node_url)))
+
+    def export(self, tree: Dict[str, Any], output: TextIO, export_format: str = "meta-ndjson") -> ExportStats:
+        """Scrive l'esportazione sul file un nodo alla volta e restituisce le statistiche"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Formato di esportazione non supportato: {export_format}")
+        self._check_base_url(export_format)
+
+        stats = ExportStats()
+        start_time = time.perf_counter()
+
+        def write(text: str) -> None:
+            output.write(text)
+            stats.bytes_written += len(text.encode("utf-8"))
+
+        csv_writer = None
+        if export_format == "sitemap-xml":
+            write(SITEMAP_HEADER)
+        elif export_format == "sitemap-csv":
+            csv_writer = csv.writer(_WriteAdapter(write), lineterminator="\n")
+            csv_writer.writerow(["path", "url", "title", "description", "keywords"])
+
+        for meta in self.iter_nodes(tree):
+            if export_format == "meta-ndjson":
+                write(json.dumps(asdict(meta), ensure_ascii=False) + "\n")
+            elif export_format == "sitemap-xml":
+                if stats.nodes >= self.max_sitemap_urls:
+                    raise ValueError(f"La sitemap supera {self.max_sitemap_urls} URL: usa write_sitemap_files "
+                                     f"(o -o da riga di comando) per dividerla con un indice")
+                write(_sitemap_entry(meta.url))
+            else:
+                csv_writer.writerow([" > ".join(meta.path), meta.url, meta.title, meta.description, meta.keywords])
+
+            stats.nodes += 1
+            _log_progress(stats, start_time)
+
+        if export_format == "sitemap-xml":
+            write(SITEMAP_FOOTER)
+
+        stats.seconds = time.perf_counter() - start_time
+        logger.info(f"Esportazione {export_format} completata: {stats.nodes} nodi, {stats.bytes_written} byte "
+                    f"in {stats.seconds:.2f} s ({stats.nodes_per_second:.0f} nodi/s)")
+        return stats
+
+    def write_sitemap_files(self, tree: Dict[str, Any], path: str) -> Tuple[ExportStats, List[str]]:
+        """Sitemap XML su file, divisa in parti da max_sitemap_urls URL (e 50 MB) con un indice se serve
+
+        Con una sola parte il file è `path`; altrimenti le parti sono path-1.xml, path-2.xml, ... e `path`
+        diventa l'indice, con le parti pubblicate accanto a lui alla radice di base_url.
+        """
+        self._check_base_url("sitemap-xml")
+        stem, extension = os.path.splitext(path)
+        extension = extension or ".xml"
+        stats = ExportStats()
+        start_time = time.perf_counter()
+        parts: List[str] = []
+        output: Optional[TextIO] = None
+        part_urls = part_bytes = 0
+        footer_bytes = len(SITEMAP_FOOTER.encode("utf-8"))
+
+        try:
+            for meta in self.iter_nodes(tree):
+                entry = _sitemap_entry(meta.url)
+                entry_bytes = len(entry.encode("utf-8"))
+                if output is None or part_urls >= self.max_sitemap_urls \
+                        or part_bytes + entry_bytes + footer_bytes > SITEMAP_MAX_BYTES:
+                    if output is not None:
+                        output.write(SITEMAP_FOOTER)
+                        stats.bytes_written += footer_bytes
+                        output.close()
+                    parts.append(f"{stem}-{len(parts) + 1}{extension}")
+                    output = open(parts[-1], "w", encoding="utf-8")
+                    output.write(SITEMAP_HEADER)
+                    part_urls, part_bytes = 0, len(SITEMAP_HEADER.encode("utf-8"))
+                    stats.bytes_written += part_bytes
+                output.write(entry)
+                part_urls += 1
+                part_bytes += entry_bytes
+                stats.bytes_written += entry_bytes
+                stats.nodes += 1
+                _log_progress(stats, start_time)
+
+            if output is None:
+                parts.append(f"{stem}-1{extension}")
+                output = open(parts[-1], "w", encoding="utf-8")
+                output.write(SITEMAP_HEADER)
+                stats.bytes_written += len(SITEMAP_HEADER.encode("utf-8"))
+            output.write(SITEMAP_FOOTER)
+            stats.bytes_written += footer_bytes
+        finally:
+            if output is not None:
+                output.close()
+
+        if len(parts) == 1:
+            os.replace(parts[0], path)
+            files = [path]
+        else:
+            index = [f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n']
+            for part in parts:
+                index.append(f"  <sitemap><loc>{escape(self.base_url + '/' + os.path.basename(part))}</loc></sitemap>\n")
+            index.append("</sitemapindex>\n")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("".join(index))
+            stats.bytes_written += sum(len(line.encode("utf-8")) for line in index)
+            files = [path] + parts
+
+        stats.seconds = time.perf_counter() - start_time
+        logger.info(f"Sitemap completata: {stats.nodes} URL in {len(parts)} file, {stats.bytes_written} byte "
+                    f"in {stats.seconds:.2f} s ({stats.nodes_per_second:.0f} nodi/s)")
+        return stats, files
+
+    def _check_base_url(self, export_format: str) -> None:
+        """Le sitemap richiedono URL assoluti: senza URL di base i <loc> sarebbero relativi"""
+        if export_format in SITEMAP_FORMATS and not is_absolute_url(self.base_url):
+            raise ValueError(f"Il formato {export_format} richiede un URL di base assoluto (es. https://www.esempio.it)")
+
+def _sitemap_entry(url: str) -> str:
+    return f"  <url><loc>{escape(url)}</loc></url>\n"
+
+def _log_progress(stats: ExportStats, start_time: float) -> None:
+    """Registra l'avanzamento ogni PROGRESS_EVERY nodi"""
+    if stats.nodes % PROGRESS_EVERY == 0:
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"Esportati {stats.nodes} nodi ({stats.nodes / elapsed:.0f} nodi/s)")
+
+class _WriteAdapter:
+    """Adattatore file-like per csv.writer che passa dalla funzione di scrittura dell'esportazione"""
+
+    def __init__(self, write):
+        self.write = write
+
+def load_category_tree(path: str) -> Dict[str, Any]:
+    """Carica un albero annidato da JSON (anche nel formato della risposta di GET /categories)"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get("categories"), dict):
+        return data["categories"]
+    return data
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point a riga di comando"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Esporta meta tag e sitemap per tutto l'albero delle categorie")
+    parser.add_argument("tree", help="File JSON con l'albero delle categorie")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="meta-ndjson", help="Formato di uscita")
+    parser.add_argument("-o", "--output", help="File di uscita (default stdout)")
+    parser.add_argument("--base-url", default=os.getenv("SITEMAP_BASE_URL", ""),
+                        help="URL di base assoluto del sito (obbligatorio per i formati sitemap)")
+    parser.add_argument("--keyword", action="append", dest="keywords", help="Keyword prodotto per le long-tail")
+    args = parser.parse_args(argv)
+    if args.format in SITEMAP_FORMATS and not is_absolute_url(args.base_url):
+        parser.error(f"--format {args.format} richiede --base-url assoluto (o SITEMAP_BASE_URL)")
+
+    exporter = SEOTreeExporter(product_keywords=args.keywords, base_url=args.base_url)
+    tree = load_category_tree(args.tree)
+    if args.format == "sitemap-xml" and args.output:
+        # Oltre i limiti del protocollo: più file e un indice di sitemap in --output
+        exporter.write_sitemap_files(tree, args.output)
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as output:
+            exporter.export(tree, output, args.format)
+    else:
+        exporter.export(tree, sys.stdout, args.format)
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    sys.exit(main())
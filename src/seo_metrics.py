@@ -0,0 +1,146 @@
+"""Archivio colonnare delle metriche SEO delle keyword: un array NumPy per metrica, una riga per keyword"""
+
+import threading
+from typing import Dict, Iterable, List, Mapping, Sequence, Set, Tuple
+
+import numpy as np
+
+# Codici dei trend (colonna int8)
+TREND_NAMES = ("stable", "rising", "declining")
+TREND_CODES = {name: code for code, name in enumerate(TREND_NAMES)}
+
+# Colonne dell'archivio, nell'ordine restituito da lookup ed estimate
+COLUMNS = ("volume", "competition", "difficulty", "relevance", "trend")
+
+# Valori delle stime per keyword senza dati
+DEFAULT_COMPETITION = 0.3
+DEFAULT_RELEVANCE = 0.3
+MIN_SEARCH_VOLUME = 100
+
+class KeywordMetricsStore:
+    """Metriche SEO memorizzate per ID di keyword e stimate in blocco per le keyword nuove
+
+    Le keyword del database hanno metriche esatte; le altre vengono stimate dai dati per parola
+    (volume, competizione, trend) con operazioni vettoriali su tutto il blocco e poi riusate.
+    """
+
+    def __init__(self, search_volume_data: Mapping[str, int], competition_data: Mapping[str, float],
+                 trend_data: Mapping[str, str], relevance_terms: Iterable[str], max_size: int = 100000):
+        self.search_volume_data = search_volume_data
+        self.competition_data = competition_data
+        self.trend_data = trend_data
+        self.relevance_terms: Set[str] = set(relevance_terms)
+        self.max_size = max_size
+
+        self._ids: Dict[str, int] = {}
+        self._seeded = 0
+        self._lock = threading.Lock()
+        self.volume = np.zeros(0, dtype=np.int64)
+        self.competition = np.zeros(0, dtype=np.float64)
+        self.difficulty = np.zeros(0, dtype=np.float64)
+        self.relevance = np.zeros(0, dtype=np.float64)
+        self.trend = np.zeros(0, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, keyword: str) -> bool:
+        return keyword in self._ids
+
+    def seed(self, keyword_database: Mapping[str, Mapping[str, object]]) -> None:
+        """Registra le keyword con metriche note (rilevanza massima); restano anche dopo un reset"""
+        with self._lock:
+            keywords = [keyword for keyword in keyword_database if keyword not in self._ids]
+            self._append(
+                keywords,
+                np.array([keyword_database[k]["volume"] for k in keywords], dtype=np.int64),
+                np.array([keyword_database[k]["competition"] for k in keywords], dtype=np.float64),
+                np.array([keyword_database[k]["difficulty"] for k in keywords], dtype=np.float64),
+                np.ones(len(keywords), dtype=np.float64),
+                np.array([TREND_CODES.get(keyword_database[k]["trend"], 0) for k in keywords], dtype=np.int8)
+            )
+            self._seeded = len(self._ids)
+
+    def lookup(self, keywords: Sequence[str]) -> Tuple[np.ndarray, Tuple[np.ndarray, ...]]:
+        """ID e colonne (volume, competizione, difficoltà, rilevanza, trend) per le keyword richieste"""
+        with self._lock:
+            missing = [keyword for keyword in dict.fromkeys(keywords) if keyword not in self._ids]
+            if missing:
+                if len(self._ids) + len(missing) > self.max_size:
+                    self._reset()
+                self._append(missing, *self.estimate(missing))
+            ids = np.fromiter((self._ids[keyword] for keyword in keywords), dtype=np.int64, count=len(keywords))
+            return ids, (self.volume[ids], self.competition[ids], self.difficulty[ids],
+                         self.relevance[ids], self.trend[ids])
+
+    def estimate(self, keywords: Sequence[str]) -> Tuple[np.ndarray, ...]:
+        """Stime vettoriali di volume, competizione, difficoltà, rilevanza e trend per un blocco di keyword"""
+        keyword_count = len(keywords)
+        split_keywords = [keyword.lower().split() for keyword in keywords]
+        word_counts = np.fromiter((len(words) for words in split_keywords), dtype=np.int64, count=keyword_count)
+
+        # Una riga per parola: keyword di appartenenza e dati della parola (NaN se assenti)
+        owners = np.repeat(np.arange(keyword_count), word_counts)
+        words = [word for keyword_words in split_keywords for word in keyword_words]
+        volumes = np.fromiter((self.search_volume_data.get(word, 0) for word in words), dtype=np.int64, count=len(words))
+        competitions = np.fromiter((self.competition_data.get(word, np.nan) for word in words),
+                                   dtype=np.float64, count=len(words))
+
+        # Volume: somma per keyword, ridotta per le keyword composte, con un minimo
+        total_volume = np.bincount(owners, weights=volumes, minlength=keyword_count)
+        # Fattori calcolati con il pow di Python sulle sole lunghezze distinte, come le stime singole
+        lengths = np.unique(word_counts)
+        factors = np.array([0.3 ** (length - 1) if length > 1 else 1.0 for length in lengths.tolist()])
+        reduction = factors[np.searchsorted(lengths, word_counts)]
+        volume = np.maximum(np.floor(total_volume * reduction).astype(np.int64), MIN_SEARCH_VOLUME)
+
+        # Competizione: media delle parole note, pesata sull'inverso del numero di parole
+        known = ~np.isnan(competitions)
+        competition_sum = np.bincount(owners[known], weights=competitions[known], minlength=keyword_count)
+        competition_count = np.bincount(owners[known], minlength=keyword_count)
+        safe_count = np.maximum(competition_count, 1)
+        weight = 1.0 / np.maximum(word_counts, 1)
+        competition = np.where(
+            competition_count > 0,
+            np.minimum(competition_sum / safe_count * weight, 1.0),
+            DEFAULT_COMPETITION
+        )
+
+        # Difficoltà: competizione ridotta per le keyword più lunghe
+        length_factor = np.maximum(0.1, 1.0 - (word_counts - 1) * 0.2)
+        difficulty = np.minimum(competition * length_factor, 1.0)
+
+        # Rilevanza e trend richiedono insiemi e la prima parola con trend noto
+        relevance = np.empty(keyword_count, dtype=np.float64)
+        trend = np.zeros(keyword_count, dtype=np.int8)
+        for position, keyword_words in enumerate(split_keywords):
+            unique_words = set(keyword_words)
+            automotive_words = len(unique_words & self.relevance_terms)
+            relevance[position] = min(automotive_words / len(unique_words), 1.0) if automotive_words else DEFAULT_RELEVANCE
+            for word in keyword_words:
+                if word in self.trend_data:
+                    trend[position] = TREND_CODES.get(self.trend_data[word], 0)
+                    break
+
+        return volume, competition, difficulty, relevance, trend
+
+    def _append(self, keywords: List[str], volume: np.ndarray, competition: np.ndarray, difficulty: np.ndarray,
+                relevance: np.ndarray, trend: np.ndarray) -> None:
+        """Aggiunge righe alle colonne, raddoppiandone la capacità quando serve (con il lock acquisito)"""
+        start = len(self._ids)
+        end = start + len(keywords)
+        if end > len(self.volume):
+            capacity = max(end, 2 * len(self.volume), 64)
+            for name in COLUMNS:
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:start] = column[:start]
+                setattr(self, name, grown)
+        for keyword in keywords:
+            self._ids[keyword] = len(self._ids)
+        for name, values in zip(COLUMNS, (volume, competition, difficulty, relevance, trend)):
+            getattr(self, name)[start:end] = values
+
+    def _reset(self) -> None:
+        """Dimentica le stime mantenendo le keyword del database (con il lock acquisito)"""
+        self._ids = {keyword: keyword_id for keyword, keyword_id in self._ids.items() if keyword_id < self._seeded}
@@ -1,9 +1,17 @@
 import re
 import json
-from typing import Dict, List, Tuple, Optional, Set
-from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple, Optional, Set
+from dataclasses import dataclass, asdict
 from collections import Counter, defaultdict
 import math
+import heapq
+
+import numpy as np
+
+try:
+    from src.seo_metrics import TREND_NAMES, KeywordMetricsStore
+except ImportError:
+    from seo_metrics import TREND_NAMES, KeywordMetricsStore
 
 @dataclass
 class SEOMetrics:
@@ -34,6 +42,13 @@ class SEOOptimizer:
         self.competition_data = self._load_competition_data()
         self.trend_data = self._load_trend_data()
         self.stop_words = self._load_seo_stop_words()
+        self.relevance_terms = self._load_relevance_terms()
+        
+        # Metriche per keyword in colonne NumPy, stimate in blocco e riusate tra le analisi
+        self.metrics_store = KeywordMetricsStore(
+            self.search_volume_data, self.competition_data, self.trend_data, self.relevance_terms
+        )
+        self.metrics_store.seed(self.keyword_database)
         
     def _load_keyword_database(self) -> Dict[str, Dict[str, any]]:
         """Database di keywords automotive con metriche SEO"""
@@ -175,6 +190,35 @@ class SEOOptimizer:
             "molto", "tanto", "poco", "alcuni", "tutti", "ogni", "qualche"
         }
     
+    def _load_relevance_terms(self) -> Set[str]:
+        """Termini automotive usati per il punteggio di rilevanza"""
+        return {
+            "auto", "car", "ricambi", "parts", "componenti", "accessori",
+            "motore", "engine", "freni", "brake", "filtro", "filter",
+            "olio", "oil", "pneumatici", "tire", "batteria", "battery"
+        }
+    
+    def metrics_for(self, keywords: Sequence[str]) -> List[SEOMetrics]:
+        """Metriche SEO di più keyword in un solo passaggio (stime calcolate una volta e memorizzate)"""
+        _, (volume, competition, difficulty, relevance, trend) = self.metrics_store.lookup(keywords)
+        return [
+            SEOMetrics(
+                keyword=keyword,
+                search_volume=keyword_volume,
+                competition=keyword_competition,
+                difficulty=keyword_difficulty,
+                relevance_score=keyword_relevance,
+                trend=TREND_NAMES[trend_code]
+            )
+            for keyword, keyword_volume, keyword_competition, keyword_difficulty, keyword_relevance, trend_code
+            in zip(keywords, volume.tolist(), competition.tolist(), difficulty.tolist(),
+                   relevance.tolist(), trend.tolist())
+        ]
+    
+    def analyze_keywords(self, keywords: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Metriche SEO per keyword, come dizionari"""
+        return {metrics.keyword: asdict(metrics) for metrics in self.metrics_for(keywords)}
+    
     def analyze_category_seo(self, category_path: List[str], 
                            product_keywords: List[str] = None) -> CategorySEOAnalysis:
         """Analizza le performance SEO di una categoria"""
@@ -182,9 +226,10 @@ class SEOOptimizer:
         primary_keywords = self._generate_primary_keywords(category_path)
         long_tail_keywords = self._generate_long_tail_keywords(category_path, product_keywords)
         
-        # Calcola metriche SEO
-        primary_metrics = [self._calculate_keyword_metrics(kw) for kw in primary_keywords]
-        long_tail_metrics = [self._calculate_keyword_metrics(kw) for kw in long_tail_keywords]
+        # Calcola metriche SEO (un solo passaggio sull'archivio per tutte le keyword)
+        all_metrics = self.metrics_for(primary_keywords + long_tail_keywords)
+        primary_metrics = all_metrics[:len(primary_keywords)]
+        long_tail_metrics = all_metrics[len(primary_keywords):]
         
         # Calcola punteggio SEO complessivo
         seo_score = self._calculate_category_seo_score(primary_metrics, long_tail_metrics)
@@ -206,12 +251,14 @@ class SEOOptimizer:
             competitor_analysis=competitor_analysis
         )
     
-    def _generate_primary_keywords(self, category_path: List[str]) -> List[str]:
-        """Genera keywords primarie per una categoria"""
+    def _generate_primary_keywords(self, category_path: List[str], category_text: Optional[str] = None,
+                                   variants: Optional[List[str]] = None) -> List[str]:
+        """Genera keywords primarie per una categoria (testo e varianti possono arrivare già calcolati)"""
         keywords = []
         
         # Keyword basate sul path della categoria
-        category_text = " ".join(category_path).lower()
+        if category_text is None:
+            category_text = " ".join(category_path).lower()
         keywords.append(category_text)
         
         # Combinazioni di categorie
@@ -219,14 +266,19 @@ class SEOOptimizer:
             keywords.append(f"{category_path[0].lower()} {category_path[-1].lower()}")
         
         # Varianti comuni
-        for category in category_path:
-            category_lower = category.lower()
-            if category_lower in self.keyword_database:
-                related = self.keyword_database[category_lower].get("related", [])
-                keywords.extend(related[:2])  # Limita a 2 varianti per categoria
+        if variants is None:
+            variants = [variant for category in category_path for variant in self._category_variants(category)]
+        keywords.extend(variants)
         
         return list(set(keywords))[:5]  # Massimo 5 keywords primarie
     
+    def _category_variants(self, category: str) -> List[str]:
+        """Varianti comuni di un livello della categoria"""
+        category_lower = category.lower()
+        if category_lower in self.keyword_database:
+            return self.keyword_database[category_lower].get("related", [])[:2]  # Limita a 2 varianti per categoria
+        return []
+    
     def _generate_long_tail_keywords(self, category_path: List[str], 
                                    product_keywords: List[str] = None) -> List[str]:
         """Genera keywords long-tail per una categoria"""
@@ -261,33 +313,7 @@ class SEOOptimizer:
     
     def _calculate_keyword_metrics(self, keyword: str) -> SEOMetrics:
         """Calcola metriche SEO per una keyword"""
-        # Cerca nei dati esistenti
-        if keyword in self.keyword_database:
-            data = self.keyword_database[keyword]
-            return SEOMetrics(
-                keyword=keyword,
-                search_volume=data["volume"],
-                competition=data["competition"],
-                difficulty=data["difficulty"],
-                relevance_score=1.0,
-                trend=data["trend"]
-            )
-        
-        # Calcola metriche stimate
-        estimated_volume = self._estimate_search_volume(keyword)
-        estimated_competition = self._estimate_competition(keyword)
-        estimated_difficulty = self._estimate_difficulty(keyword)
-        relevance = self._calculate_relevance_score(keyword)
-        trend = self._estimate_trend(keyword)
-        
-        return SEOMetrics(
-            keyword=keyword,
-            search_volume=estimated_volume,
-            competition=estimated_competition,
-            difficulty=estimated_difficulty,
-            relevance_score=relevance,
-            trend=trend
-        )
+        return self.metrics_for([keyword])[0]
     
     def _estimate_search_volume(self, keyword: str) -> int:
         """Stima il volume di ricerca per una keyword"""
@@ -331,14 +357,8 @@ class SEOOptimizer:
     
     def _calculate_relevance_score(self, keyword: str) -> float:
         """Calcola il punteggio di rilevanza per una keyword automotive"""
-        automotive_terms = {
-            "auto", "car", "ricambi", "parts", "componenti", "accessori",
-            "motore", "engine", "freni", "brake", "filtro", "filter",
-            "olio", "oil", "pneumatici", "tire", "batteria", "battery"
-        }
-        
         words = set(keyword.lower().split())
-        automotive_words = words.intersection(automotive_terms)
+        automotive_words = words.intersection(self.relevance_terms)
         
         if not automotive_words:
             return 0.3
@@ -448,18 +468,55 @@ class SEOOptimizer:
         return competitors
     
     def rank_categories_by_seo(self, categories: List[List[str]], 
-                             product_keywords: List[str] = None) -> List[Tuple[List[str], float]]:
-        """Classifica le categorie in base al potenziale SEO"""
-        category_scores = []
-        
-        for category_path in categories:
-            analysis = self.analyze_category_seo(category_path, product_keywords)
-            category_scores.append((category_path, analysis.seo_score))
-        
-        # Ordina per punteggio SEO decrescente
-        category_scores.sort(key=lambda x: x[1], reverse=True)
-        
-        return category_scores
+                             product_keywords: List[str] = None,
+                             top_n: Optional[int] = None) -> List[Tuple[List[str], float]]:
+        """Classifica le categorie in base al potenziale SEO (le prime top_n, o tutte)"""
+        scores = self.score_categories_bulk(categories, product_keywords).tolist()
+        ranked = zip(categories, scores)
+        
+        # Ordina per punteggio SEO decrescente (a parità, ordine di input)
+        if top_n is None:
+            return sorted(ranked, key=lambda x: x[1], reverse=True)
+        return heapq.nlargest(top_n, ranked, key=lambda x: x[1])
+    
+    def score_categories_bulk(self, categories: Sequence[List[str]],
+                              product_keywords: List[str] = None) -> np.ndarray:
+        """Punteggi SEO di molte categorie insieme, identici a quelli di analyze_category_seo
+        
+        Le keyword di tutti i path vengono generate una volta, le metriche lette con un solo
+        accesso all'archivio e i punteggi calcolati con operazioni vettoriali.
+        """
+        keywords: List[str] = []
+        owners: List[int] = []
+        is_primary: List[bool] = []
+        long_tail_by_base: Dict[str, List[str]] = {}
+        
+        for position, category_path in enumerate(categories):
+            primary_keywords = self._generate_primary_keywords(category_path)
+            base_category = category_path[-1].lower() if category_path else ""
+            long_tail_keywords = long_tail_by_base.get(base_category)
+            if long_tail_keywords is None:
+                long_tail_keywords = long_tail_by_base[base_category] = \
+                    self._generate_long_tail_keywords(category_path, product_keywords)
+            keywords.extend(primary_keywords)
+            keywords.extend(long_tail_keywords)
+            owners.extend([position] * (len(primary_keywords) + len(long_tail_keywords)))
+            is_primary.extend([True] * len(primary_keywords))
+            is_primary.extend([False] * len(long_tail_keywords))
+        
+        _, (volume, competition, _, relevance, _) = self.metrics_store.lookup(keywords)
+        owners_array = np.asarray(owners, dtype=np.int64)
+        primary = np.asarray(is_primary, dtype=bool)
+        
+        # Stessa formula di _calculate_category_seo_score, una riga per keyword
+        volume_score = np.minimum(volume / np.where(primary, 10000, 5000), 1.0)
+        keyword_score = volume_score * 0.4 + (1.0 - competition) * 0.3 + relevance * 0.3
+        weight = np.where(primary, 0.7, 0.3)
+        
+        # bincount somma nell'ordine delle righe, come l'accumulo per singola categoria
+        total_score = np.bincount(owners_array, weights=keyword_score * weight, minlength=len(categories))
+        total_weight = np.bincount(owners_array, weights=weight, minlength=len(categories))
+        return np.divide(total_score, total_weight, out=np.zeros(len(categories)), where=total_weight > 0)
     
     def optimize_category_name(self, category_name: str, 
                              target_keywords: List[str] = None) -> str:
@@ -491,24 +548,35 @@ class SEOOptimizer:
     def generate_meta_tags(self, category_path: List[str], 
                           product_keywords: List[str] = None) -> Dict[str, str]:
         """Genera meta tags ottimizzati per una categoria"""
-        analysis = self.analyze_category_seo(category_path, product_keywords)
+        # I meta tag usano solo le keyword generate, non le loro metriche
+        return self._build_meta_tags(
+            category_path,
+            self._generate_primary_keywords(category_path),
+            self._generate_long_tail_keywords(category_path, product_keywords)
+        )
+    
+    def _build_meta_tags(self, category_path: List[str], primary_keywords: List[str],
+                         long_tail_keywords: List[str], breadcrumb: Optional[str] = None) -> Dict[str, str]:
+        """Compone title, description e keywords a partire dalle keyword della categoria"""
+        if breadcrumb is None:
+            breadcrumb = ' > '.join(category_path)
         
         # Title tag
-        primary_keyword = analysis.primary_keywords[0].keyword if analysis.primary_keywords else ""
-        title = f"{' > '.join(category_path)} | {primary_keyword.title()} | Ricambi Auto"
+        primary_keyword = primary_keywords[0] if primary_keywords else ""
+        title = f"{breadcrumb} | {primary_keyword.title()} | Ricambi Auto"
         
         # Meta description
-        top_keywords = [m.keyword for m in analysis.primary_keywords[:3]]
+        top_keywords = primary_keywords[:3]
         description = f"Scopri la nostra selezione di {', '.join(top_keywords)}. " \
                      f"Ricambi auto di qualità per {category_path[-1].lower()}. " \
                      f"Spedizione rapida e prezzi competitivi."
         
         # Keywords meta tag
-        all_keywords = [m.keyword for m in analysis.primary_keywords + analysis.long_tail_keywords]
+        all_keywords = primary_keywords + long_tail_keywords
         keywords = ", ".join(all_keywords[:10])  # Massimo 10 keywords
         
         return {
             "title": title[:60],  # Limita a 60 caratteri
             "description": description[:160],  # Limita a 160 caratteri
             "keywords": keywords
-        }
\ No newline at end of file
+        }
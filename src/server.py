@@ -0,0 +1,179 @@
+"""Server di produzione: stato precaricato nel master e worker pre-fork che lo condividono copy-on-write"""
+
+import gc
+import os
+import sys
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Worker gunicorn per la modalità ASGI (SERVER_MODE=asgi)
+ASGI_WORKER_CLASS = "uvicorn.workers.UvicornWorker"
+
+# Radice del progetto: i moduli italiani si importano come pacchetto src (src.lexicon_store, src.italian_api)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Titolo italiano analizzato dalla pipeline condivisa durante il riscaldamento
+WARM_UP_ITALIAN_TITLE = "Pastiglie freno anteriori Brembo per Fiat Punto"
+
+# Prodotto usato per il riscaldamento prima che i worker accettino traffico
+WARM_UP_PRODUCT = {
+    "title": "Pastiglie freno anteriori Brembo per BMW Serie 3",
+    "description": "Kit pastiglie freno in ceramica, compatibili con BMW Serie 3 E90 2005-2012"
+}
+
+def build_server_options(performance: Optional[Dict[str, Any]] = None,
+                         bind: Optional[str] = None) -> Dict[str, Any]:
+    """Traduce le impostazioni di performance nelle opzioni di gunicorn"""
+    performance = performance or config.get_performance_settings()
+    threads = performance["server_threads"]
+    asgi = performance.get("server_mode") == "asgi"
+    return {
+        "bind": bind or f"{config.api.host}:{config.api.port}",
+        "workers": performance["server_workers"],
+        "threads": 1 if asgi else threads,
+        # In modalità ASGI ogni worker è un event loop uvicorn con i pool di asgi.ASGIApplication
+        "worker_class": ASGI_WORKER_CLASS if asgi else ("gthread" if threads > 1 else "sync"),
+        "backlog": performance["server_backlog"],
+        "keepalive": performance["server_keepalive"],
+        "timeout": performance["server_timeout"],
+        "graceful_timeout": performance["server_graceful_timeout"],
+        "max_requests": performance["server_max_requests"],
+        "max_requests_jitter": performance["server_max_requests_jitter"],
+        # L'applicazione viene importata una sola volta nel master, prima del fork
+        "preload_app": True,
+        "loglevel": performance["log_level"].lower()
+    }
+
+def warm_up(categorizer: Any) -> Dict[str, Any]:
+    """Carica lessici e percorsi di codice nel master, poi congela gli oggetti per il copy-on-write"""
+    started = time.perf_counter()
+
+    # Archivio dei lessici: le pagine mappate in memoria sono condivise tra i processi.
+    # Stesso percorso di import di italian_support, così il singleton è uno solo
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    try:
+        from src.lexicon_store import get_lexicon_store
+        stopword_count = sum(1 for _ in get_lexicon_store().rows("stopwords"))
+    except Exception as e:
+        logger.warning(f"Archivio lessici non disponibile durante il riscaldamento: {str(e)}")
+        stopword_count = 0
+
+    # API italiana e pipeline NLP condivisa, costruite qui e non alla prima richiesta di ogni worker
+    try:
+        import src.italian_api
+        from src.italian_support import get_italian_nlp_pipeline
+        get_italian_nlp_pipeline().analyze_title(WARM_UP_ITALIAN_TITLE)
+        italian_loaded = True
+    except Exception as e:
+        logger.warning(f"API italiana non disponibile durante il riscaldamento: {str(e)}")
+        italian_loaded = False
+
+    # Esegue l'analisi senza toccare l'albero né la cache dei risultati
+    analysis = categorizer.analyze_product(WARM_UP_PRODUCT["title"], WARM_UP_PRODUCT["description"])
+
+    # Gli oggetti creati finora non vengono più visitati dal garbage collector nei worker,
+    # così il conteggio dei riferimenti del GC non sporca le pagine condivise
+    gc.collect()
+    gc.freeze()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Riscaldamento completato in {elapsed * 1000:.1f} ms")
+    return {
+        "elapsed_seconds": elapsed,
+        "product_type": analysis.product_type,
+        "stopwords": stopword_count,
+        "italian_loaded": italian_loaded,
+        "frozen_objects": gc.get_freeze_count()
+    }
+
+def load_application() -> Any:
+    """Importa l'API (categorizzatore, tassonomia, cache) ed esegue il riscaldamento"""
+    import api
+
+    warm_up(api.categorizer)
+    return api.app
+
+def load_asgi_application() -> Any:
+    """API precaricata come in load_application, esposta come app ASGI"""
+    from asgi import ASGIApplication
+
+    return ASGIApplication(load_application())
+
+def run(options: Dict[str, Any]) -> None:
+    """Avvia gunicorn con le opzioni indicate; senza gunicorn ripiega su uvicorn o sul server di sviluppo"""
+    asgi = options["worker_class"] == ASGI_WORKER_CLASS
+    if asgi:
+        try:
+            import uvicorn
+        except ImportError:
+            logger.warning("uvicorn non installato: avvio in modalità WSGI")
+            options = {**options, "worker_class": "sync"}
+            asgi = False
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        if asgi:
+            logger.warning("gunicorn non installato: avvio di uvicorn a processo singolo")
+            host, _, port = options["bind"].rpartition(":")
+            uvicorn.run(load_asgi_application(), host=host, port=int(port), backlog=options["backlog"],
+                        timeout_keep_alive=options["keepalive"], log_level=options["loglevel"])
+            return
+        logger.warning("gunicorn non installato: avvio del server di sviluppo Flask a processo singolo")
+        host, _, port = options["bind"].rpartition(":")
+        load_application().run(host=host, port=int(port), threaded=True)
+        return
+
+    class ProductCategorizerServer(BaseApplication):
+        """Applicazione gunicorn con l'API precaricata nel master"""
+
+        def __init__(self, server_options: Dict[str, Any]):
+            self.server_options = server_options
+            self.application = None
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.server_options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            if self.application is None:
+                self.application = load_asgi_application() if asgi else load_application()
+            return self.application
+
+    ProductCategorizerServer(options).run()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point a riga di comando"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Avvia l'API di categorizzazione in modalità produzione")
+    parser.add_argument("--bind", help="Indirizzo host:porta (default da API_HOST/API_PORT)")
+    parser.add_argument("--workers", type=int, help="Numero di processi worker (default SERVER_WORKERS o numero di core)")
+    parser.add_argument("--threads", type=int, help="Thread per worker")
+    parser.add_argument("--mode", choices=("wsgi", "asgi"), help="Modalità del server (default SERVER_MODE)")
+    args = parser.parse_args(argv)
+
+    performance = config.get_performance_settings()
+    if args.workers:
+        performance["server_workers"] = args.workers
+    if args.threads:
+        performance["server_threads"] = args.threads
+    if args.mode:
+        performance["server_mode"] = args.mode
+
+    options = build_server_options(performance, args.bind)
+    logger.info(f"Avvio server {performance['server_mode'].upper()}: {options['workers']} worker x "
+                f"{options['threads']} thread su {options['bind']}")
+    run(options)
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Stemmer a trie di suffissi rovesciati con ricerca del suffisso più lungo"""
+
+from functools import lru_cache
+from typing import Container, Dict, Iterable, List, Mapping, Optional, Tuple
+
+class SuffixTrieStemmer:
+    """Applica la regola con il suffisso più lungo con una sola visita della parola dalla fine"""
+
+    def __init__(self, rules: Iterable[Tuple[str, str]], cache_size: int = 10000, min_stem_length: int = 1,
+                 known_words: Optional[Container[str]] = None):
+        # Ogni nodo è un dict carattere -> nodo; la chiave None contiene la sostituzione
+        self._root: Dict[Optional[str], object] = {}
+        self.min_stem_length = min_stem_length
+        # Parole note (il lessico): le radici che non sono parole note non sostituiscono una parola nota
+        self.known_words = known_words
+        self.rule_count = 0
+        for suffix, replacement in rules:
+            self.add_rule(suffix, replacement)
+
+        self._vocabulary: Dict[str, str] = {}
+        self._cached_stem = lru_cache(maxsize=cache_size)(self._stem_uncached)
+
+    @classmethod
+    def from_mapping(cls, rules: Mapping[str, str], **kwargs) -> "SuffixTrieStemmer":
+        """Costruisce lo stemmer da un dict suffisso -> sostituzione"""
+        return cls(rules.items(), **kwargs)
+
+    @classmethod
+    def from_lexicon_store(cls, store, **kwargs) -> "SuffixTrieStemmer":
+        """Costruisce lo stemmer dalle regole di data/italian_stemming_rules.txt compilate nell'archivio,
+        con le stringhe dell'archivio (mappato e condiviso tra i processi) come parole note"""
+        kwargs.setdefault("known_words", store)
+        return cls(store.stemming_rules(), **kwargs)
+
+    def add_rule(self, suffix: str, replacement: str) -> None:
+        """Inserisce una regola (a parità di suffisso vince l'ultima, come in un dict)"""
+        if not suffix:
+            raise ValueError("Il suffisso di una regola di stemming non può essere vuoto")
+        node = self._root
+        for char in reversed(suffix):
+            node = node.setdefault(char, {})
+        if None not in node:
+            self.rule_count += 1
+        node[None] = replacement
+
+    def _stem_uncached(self, word: str) -> str:
+        node = self._root
+        matches: List[Tuple[int, str]] = []
+        max_length = len(word) - self.min_stem_length
+
+        # Visita la parola dalla fine raccogliendo i nodi terminali (l'ultimo è il suffisso più lungo)
+        for length, char in enumerate(reversed(word), start=1):
+            if length > max_length:
+                break
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                matches.append((length, node[None]))
+
+        if not matches:
+            return word
+        candidates = [word[:len(word) - length] + replacement for length, replacement in reversed(matches)]
+        known_words = self.known_words
+        if known_words is None:
+            return candidates[0]
+
+        # Vince la regola più lunga che produce una parola nota; una parola nota senza
+        # singolare noto resta invariata (motore non diventa motora)
+        for candidate in candidates:
+            if candidate in known_words:
+                return candidate
+        return word if word in known_words else candidates[0]
+
+    def stem(self, word: str) -> str:
+        """Restituisce la radice della parola (vocabolario precalcolato, poi cache limitata)"""
+        stemmed = self._vocabulary.get(word)
+        if stemmed is None:
+            stemmed = self._cached_stem(word)
+        return stemmed
+
+    def stem_tokens(self, tokens: Iterable[str]) -> List[str]:
+        """Applica lo stemming a una sequenza di token, calcolando una volta sola i token ripetuti"""
+        stems: Dict[str, str] = {}
+        result = []
+        for token in tokens:
+            stemmed = stems.get(token)
+            if stemmed is None:
+                stemmed = stems[token] = self.stem(token)
+            result.append(stemmed)
+        return result
+
+    def preload_vocabulary(self, words: Iterable[str]) -> int:
+        """Precalcola le radici di un vocabolario noto (fuori dalla cache limitata)"""
+        words = [word for word in dict.fromkeys(words) if word not in self._vocabulary]
+        self._vocabulary.update(zip(words, map(self._stem_uncached, words)))
+        return len(self._vocabulary)
+
+    def cache_info(self):
+        """Statistiche della cache delle parole non presenti nel vocabolario"""
+        return self._cached_stem.cache_info()
+
+    def __len__(self) -> int:
+        return self.rule_count
@@ -0,0 +1,97 @@
+"""Vocabolario di token internati: ogni parola ha un ID intero stabile per tutta la vita del processo"""
+
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ID riservato ai token non registrati quando il vocabolario è pieno
+UNKNOWN_ID = 0
+# Codice di tipo degli array di ID (interi senza segno a 32 bit)
+ID_TYPECODE = "I"
+
+class TokenVocabulary:
+    """Mappa token <-> ID interi, condivisa tra thread e stadi della pipeline
+
+    Gli ID sono assegnati in ordine di prima apparizione e non cambiano mai; i lessici
+    registrati all'avvio hanno quindi ID bassi e sempre validi. Oltre `max_size` i token
+    nuovi del testo ricevono UNKNOWN_ID, per non far crescere la memoria con il testo degli
+    utenti; le parole dei lessici vengono registrate comunque. Con `lexicon_only` solo le
+    parole dei lessici (force=True) vengono registrate e ogni altro token è UNKNOWN_ID.
+    """
+
+    def __init__(self, max_size: int = 500000, lexicon_only: bool = False):
+        self.max_size = max_size
+        self.lexicon_only = lexicon_only
+        self._ids: Dict[str, int] = {"": UNKNOWN_ID}
+        self._tokens: List[str] = [""]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._ids
+
+    def get(self, token: str) -> Optional[int]:
+        """ID di un token già registrato, senza registrarlo"""
+        return self._ids.get(token)
+
+    def id_of(self, token: str, force: bool = False) -> int:
+        """ID del token, registrandolo se nuovo (con force anche a vocabolario pieno)"""
+        token_id = self._ids.get(token)
+        if token_id is not None:
+            return token_id
+        with self._lock:
+            token_id = self._ids.get(token)
+            if token_id is None:
+                if not force and (self.lexicon_only or len(self._tokens) >= self.max_size):
+                    return UNKNOWN_ID
+                token_id = self._ids[token] = len(self._tokens)
+                self._tokens.append(token)
+        return token_id
+
+    def token(self, token_id: int) -> str:
+        """Token corrispondente a un ID"""
+        return self._tokens[token_id]
+
+    def encode(self, tokens: Iterable[str]) -> array:
+        """Sequenza di token come array compatto di ID (np.frombuffer lo legge senza copie)"""
+        ids = self._ids
+        if self.lexicon_only:
+            # Il testo degli utenti non modifica il vocabolario condiviso
+            return array(ID_TYPECODE, [ids.get(token, UNKNOWN_ID) for token in tokens])
+        encoded = array(ID_TYPECODE)
+        for token in tokens:
+            token_id = ids.get(token)
+            encoded.append(token_id if token_id is not None else self.id_of(token))
+        return encoded
+
+    def encode_batch(self, documents: Iterable[Sequence[str]]) -> Tuple[array, array]:
+        """Più documenti in formato CSR: ID concatenati e offset di inizio (più quello finale)"""
+        ids = array(ID_TYPECODE)
+        offsets = array(ID_TYPECODE, [0])
+        for tokens in documents:
+            ids.extend(self.encode(tokens))
+            offsets.append(len(ids))
+        return ids, offsets
+
+    def decode(self, token_ids: Iterable[int]) -> List[str]:
+        """Token corrispondenti a una sequenza di ID"""
+        tokens = self._tokens
+        return [tokens[token_id] for token_id in token_ids]
+
+    def id_set(self, tokens: Iterable[str]) -> frozenset:
+        """Insieme degli ID di un lessico (i token vengono sempre registrati)"""
+        return frozenset(self.id_of(token, force=True) for token in tokens)
+
+_vocabulary: Optional[TokenVocabulary] = None
+_vocabulary_lock = threading.Lock()
+
+def get_token_vocabulary() -> TokenVocabulary:
+    """Vocabolario condiviso dal processo: contiene solo i lessici, caricati prima del fork"""
+    global _vocabulary
+    if _vocabulary is None:
+        with _vocabulary_lock:
+            if _vocabulary is None:
+                _vocabulary = TokenVocabulary(lexicon_only=True)
+    return _vocabulary
@@ -1,13 +1,18 @@
 import re
+import sys
 import json
-import hashlib
+import heapq
 import unicodedata
-from typing import Dict, List, Any, Optional, Tuple, Union
-from datetime import datetime, timedelta
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Any, Mapping, Optional, Tuple, Union, TYPE_CHECKING
 import logging
 from functools import wraps
 import time
 
+if TYPE_CHECKING:
+    from compact_taxonomy import CompactTaxonomy
+
 # Configurazione logging
 logging.basicConfig(
     level=logging.INFO,
@@ -150,11 +155,15 @@ class CategoryUtils:
         return [cat for cat in categories if cat]
     
     @staticmethod
-    def get_category_depth(category_tree: Dict, path: List[str]) -> int:
-        """Calcola la profondità di una categoria nell'albero"""
+    def get_category_depth(category_tree: Union[Dict, "CompactTaxonomy"], path: List[str]) -> int:
+        """Calcola la profondità di una categoria nell'albero (dict annidato o CompactTaxonomy)"""
         if not path:
             return 0
         
+        # Tassonomia compatta: un lookup per hash per ogni prefisso, senza visitare i dict
+        if not isinstance(category_tree, Mapping):
+            return category_tree.matched_depth(path)
+        
         current = category_tree
         depth = 0
         
@@ -168,17 +177,34 @@ class CategoryUtils:
         return depth
     
     @staticmethod
-    def find_similar_categories(target_category: str, category_tree: Dict, 
+    def find_similar_categories(target_category: str, category_tree: Union[Dict, "CompactTaxonomy"], 
                               threshold: float = 0.7) -> List[Tuple[List[str], float]]:
-        """Trova categorie simili nell'albero"""
+        """Trova categorie simili nell'albero (dict annidato o CompactTaxonomy)"""
         similar_categories = []
         
+        # Tassonomia compatta: similarità calcolata una volta per nome distinto
+        if not isinstance(category_tree, Mapping):
+            similarities = {}
+            for name_id, name in enumerate(category_tree.names()):
+                similarity = TextProcessor.similarity_score(target_category, name)
+                if similarity >= threshold:
+                    similarities[name_id] = similarity
+            for node in category_tree.nodes_named(similarities).tolist():
+                similar_categories.append((category_tree.path(node), similarities[int(category_tree.name_id[node])]))
+            similar_categories.sort(key=lambda x: x[1], reverse=True)
+            return similar_categories
+        
+        # I nomi ripetuti nell'albero vengono confrontati una sola volta
+        similarity_by_name: Dict[str, float] = {}
+        
         def traverse_tree(tree: Dict, path: List[str] = []):
             for category, subtree in tree.items():
                 current_path = path + [category]
                 
                 # Calcola similarità
-                similarity = TextProcessor.similarity_score(target_category, category)
+                similarity = similarity_by_name.get(category)
+                if similarity is None:
+                    similarity = similarity_by_name[category] = TextProcessor.similarity_score(target_category, category)
                 
                 if similarity >= threshold:
                     similar_categories.append((current_path, similarity))
@@ -251,8 +277,11 @@ class ValidationUtils:
         return len(errors) == 0, errors
     
     @staticmethod
-    def validate_category_tree(tree: Dict, max_depth: int = 4) -> Tuple[bool, List[str]]:
-        """Valida un albero di categorie"""
+    def validate_category_tree(tree: Union[Dict, "CompactTaxonomy"], max_depth: int = 4) -> Tuple[bool, List[str]]:
+        """Valida un albero di categorie (dict annidato o CompactTaxonomy)"""
+        if not isinstance(tree, Mapping):
+            return ValidationUtils._validate_taxonomy(tree, max_depth)
+        
         errors = []
         
         def validate_recursive(subtree: Dict, current_depth: int = 0, path: List[str] = []):
@@ -266,12 +295,8 @@ class ValidationUtils:
                     errors.append(f"Nome categoria non valido: {category}")
                     continue
                 
-                if len(category) < 3 or len(category) > 50:
-                    errors.append(f"Nome categoria deve essere tra 3 e 50 caratteri: {category}")
-                
-                # Valida caratteri
-                if not re.match(r'^[a-zA-Z0-9\s\-_àèéìíîòóùúÀÈÉÌÍÎÒÓÙÚ]+$', category):
-                    errors.append(f"Nome categoria contiene caratteri non validi: {category}")
+                # Lunghezza e caratteri consentiti
+                errors.extend(ValidationUtils._category_name_errors(category))
                 
                 # Continua validazione ricorsiva
                 if isinstance(subcategories, dict):
@@ -279,67 +304,188 @@ class ValidationUtils:
         
         validate_recursive(tree)
         return len(errors) == 0, errors
+    
+    @staticmethod
+    def _category_name_errors(category: str) -> List[str]:
+        """Errori di validazione del nome di una categoria"""
+        errors = []
+        if len(category) < 3 or len(category) > 50:
+            errors.append(f"Nome categoria deve essere tra 3 e 50 caratteri: {category}")
+        if not re.match(r'^[a-zA-Z0-9\s\-_àèéìíîòóùúÀÈÉÌÍÎÒÓÙÚ]+$', category):
+            errors.append(f"Nome categoria contiene caratteri non validi: {category}")
+        return errors
+    
+    @staticmethod
+    def _validate_taxonomy(taxonomy: "CompactTaxonomy", max_depth: int) -> Tuple[bool, List[str]]:
+        """Stessa validazione sulla tassonomia compatta: i nomi una volta sola, la profondità dall'array"""
+        errors = []
+        names = taxonomy.names()
+        name_errors: Dict[int, List[str]] = {}
+        name_ids = taxonomy.name_id.tolist()
+        depths = taxonomy.depth.tolist()
+        subtree_end = taxonomy.subtree_end.tolist()
+        
+        node = 0
+        while node < len(name_ids):
+            name_id = name_ids[node]
+            category = names[name_id]
+            if not category:
+                errors.append(f"Nome categoria non valido: {category}")
+                node = subtree_end[node]
+                continue
+            if name_id not in name_errors:
+                name_errors[name_id] = ValidationUtils._category_name_errors(category)
+            errors.extend(name_errors[name_id])
+            
+            # Come nel dict, i figli oltre la profondità massima producono un solo errore per nodo
+            if depths[node] + 1 > max_depth:
+                errors.append(f"Profondità massima superata nel path: {' > '.join(taxonomy.path(node))}")
+                node = subtree_end[node]
+                continue
+            node += 1
+        
+        return len(errors) == 0, errors
+
+# Valore assente, distinto da un risultato None memorizzato in cache
+_MISSING = object()
+
+def _default_sizeof(value: Any) -> int:
+    """Dimensione stimata di un valore in byte"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    return sys.getsizeof(value)
 
 class CacheUtils:
-    """Utilità per il caching"""
+    """Cache LRU thread-safe con scadenza TTL, get/set in O(1) ammortizzato"""
     
-    def __init__(self, max_size: int = 1000, ttl_seconds: int = 3600):
-        self.cache = {}
-        self.timestamps = {}
+    def __init__(self, max_size: int = 1000, ttl_seconds: int = 3600, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        # chiave -> (valore, scadenza, dimensione); l'ordine è quello di utilizzo (LRU in testa)
+        self.cache: OrderedDict = OrderedDict()
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or _default_sizeof
+        self.current_bytes = 0
+        # Heap delle scadenze (scadenza, chiave): le voci superate vengono scartate alla lettura
+        self._expiry_heap: List[Tuple[float, Any]] = []
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
     
-    def _generate_key(self, *args, **kwargs) -> str:
-        """Genera una chiave di cache"""
-        key_data = str(args) + str(sorted(kwargs.items()))
-        return hashlib.md5(key_data.encode()).hexdigest()
+    def _generate_key(self, *args, **kwargs) -> Any:
+        """Genera una chiave di cache (tupla hashable, senza serializzazione)"""
+        key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+        try:
+            hash(key)
+        except TypeError:
+            # Argomenti non hashable (liste, dizionari): si ripiega sulla rappresentazione testuale
+            return repr(key)
+        return key
     
-    def _is_expired(self, key: str) -> bool:
-        """Verifica se una chiave è scaduta"""
-        if key not in self.timestamps:
-            return True
-        
-        age = datetime.now() - self.timestamps[key]
-        return age.total_seconds() > self.ttl_seconds
+    def _remove(self, key: Any) -> None:
+        _, _, size = self.cache.pop(key)
+        self.current_bytes -= size
     
-    def _cleanup_expired(self):
-        """Rimuove le chiavi scadute"""
-        expired_keys = [key for key in self.cache.keys() if self._is_expired(key)]
-        for key in expired_keys:
-            del self.cache[key]
-            del self.timestamps[key]
+    def _expire(self, now: float) -> None:
+        """Rimuove le chiavi scadute in cima allo heap"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self.cache.get(key)
+            # La voce dello heap è valida solo se corrisponde alla scadenza attuale della chiave
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                self._stats['expirations'] += 1
+        
+        # Le voci superate (chiavi riscritte o rimosse) non devono far crescere lo heap senza limite
+        if len(heap) > 2 * len(self.cache) + 64:
+            self._expiry_heap = [(entry[1], key) for key, entry in self.cache.items() if entry[1] is not None]
+            heapq.heapify(self._expiry_heap)
     
-    def _enforce_size_limit(self):
-        """Applica il limite di dimensione della cache"""
-        if len(self.cache) <= self.max_size:
-            return
-        
-        # Rimuovi le chiavi più vecchie
-        sorted_keys = sorted(self.timestamps.items(), key=lambda x: x[1])
-        keys_to_remove = sorted_keys[:len(self.cache) - self.max_size]
-        
-        for key, _ in keys_to_remove:
-            del self.cache[key]
-            del self.timestamps[key]
+    def _enforce_size_limit(self) -> None:
+        """Rimuove le chiavi usate meno di recente oltre i limiti di numero e byte"""
+        while self.cache and (len(self.cache) > self.max_size or
+                              (self.max_bytes is not None and self.current_bytes > self.max_bytes)):
+            key = next(iter(self.cache))
+            self._remove(key)
+            self._stats['evictions'] += 1
     
-    def get(self, key: str) -> Optional[Any]:
+    def _lookup(self, key: Any) -> Any:
+        """Recupera un valore o _MISSING"""
+        with self._lock:
+            entry = self.cache.get(key, None)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return _MISSING
+            self.cache.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+    
+    def get(self, key: Any) -> Optional[Any]:
         """Recupera un valore dalla cache"""
-        if key in self.cache and not self._is_expired(key):
-            return self.cache[key]
-        return None
+        value = self._lookup(key)
+        return None if value is _MISSING else value
     
-    def set(self, key: str, value: Any):
-        """Imposta un valore nella cache"""
-        self._cleanup_expired()
-        self._enforce_size_limit()
-        
-        self.cache[key] = value
-        self.timestamps[key] = datetime.now()
+    def set(self, key: Any, value: Any, ttl: Optional[int] = None):
+        """Imposta un valore nella cache (ttl in secondi, default quello della cache)"""
+        ttl = self.ttl_seconds if ttl is None else ttl
+        size = self.sizeof(value)
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            
+            if key in self.cache:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Un valore più grande dell'intera cache non viene memorizzato
+                return
+            
+            expires_at = now + ttl if ttl else None
+            self.cache[key] = (value, expires_at, size)
+            self.current_bytes += size
+            if expires_at is not None:
+                heapq.heappush(self._expiry_heap, (expires_at, key))
+            self._enforce_size_limit()
+    
+    def delete(self, key: Any) -> bool:
+        """Rimuove una chiave; restituisce True se era presente"""
+        with self._lock:
+            if key not in self.cache:
+                return False
+            self._remove(key)
+            return True
     
     def clear(self):
         """Svuota la cache"""
-        self.cache.clear()
-        self.timestamps.clear()
+        with self._lock:
+            self.cache.clear()
+            self._expiry_heap.clear()
+            self.current_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Statistiche di utilizzo della cache"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'size': len(self.cache),
+                'bytes': self.current_bytes,
+                'max_size': self.max_size,
+                'max_bytes': self.max_bytes,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0
+            }
+    
+    def __len__(self) -> int:
+        return len(self.cache)
+    
+    def __contains__(self, key: Any) -> bool:
+        return self._lookup(key) is not _MISSING
     
     def cached(self, ttl: Optional[int] = None):
         """Decorator per il caching automatico"""
@@ -347,16 +493,16 @@ class CacheUtils:
             @wraps(func)
             def wrapper(*args, **kwargs):
                 # Genera chiave di cache
-                cache_key = self._generate_key(func.__name__, *args, **kwargs)
+                cache_key = self._generate_key(func.__qualname__, *args, **kwargs)
                 
-                # Controlla se il risultato è in cache
-                cached_result = self.get(cache_key)
-                if cached_result is not None:
+                # Controlla se il risultato è in cache (anche se None)
+                cached_result = self._lookup(cache_key)
+                if cached_result is not _MISSING:
                     return cached_result
                 
                 # Esegui la funzione e salva il risultato
                 result = func(*args, **kwargs)
-                self.set(cache_key, result)
+                self.set(cache_key, result, ttl)
                 
                 return result
             return wrapper
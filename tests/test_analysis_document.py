@@ -0,0 +1,36 @@
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from analysis_document import AnalysisDocument, as_document, fold_accents
+from nlp_analyzer import MultilingualNLPAnalyzer
+
+class TestAnalysisDocument(unittest.TestCase):
+    """Test per il documento di analisi condiviso"""
+
+    def test_forms(self):
+        """Test delle forme normalizzate del testo"""
+        document = AnalysisDocument.from_parts("Filtro Olio MANN-FILTER W 712/75", "Compatibile: Škoda Octavia 1.9 TDI, perché è l'originale", None)
+        self.assertEqual(document.normalized, "filtro olio mann filter w 712 75 compatibile skoda octavia 1 9 tdi perche e l originale")
+        self.assertEqual(document.italian, "filtro olio mann filter w compatibile skoda octavia tdi perche e l originale")
+        self.assertEqual(document.tokens[:4], ["filtro", "olio", "mann", "filter"])
+        self.assertEqual(fold_accents("stoßdämpfer øl"), "stossdampfer ol")
+
+    def test_forms_are_computed_once(self):
+        """Test: le forme sono calcolate alla prima richiesta e riusate"""
+        document = AnalysisDocument("Pastiglie Freno Anteriori")
+        self.assertIs(document.tokens, document.tokens)
+        self.assertIs(as_document(document), document)
+        self.assertEqual(as_document(None).normalized, "")
+
+    def test_folded_keywords_match(self):
+        """Test: le keyword accentate riconoscono il testo piegato"""
+        entities = MultilingualNLPAnalyzer().analyze_entities("Ölfilter für VW Golf 7 mit Dichtung")
+        self.assertIn("de", entities.languages_detected)
+        self.assertEqual(entities.product_categories, ["filtri"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flask import Flask, Response, request, jsonify, stream_with_context
+from asgi import ASGIApplication, WSGIMiddleware, content_length_error
+
+def make_wsgi_app(barrier=None):
+    """App Flask minima con le stesse forme di risposta delle API (JSON, streaming, corpo letto a righe)"""
+    app = Flask(__name__)
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        if barrier is not None:
+            barrier.wait(timeout=5)
+        return jsonify({'dati': request.get_json(), 'lingua': request.args.get('lingua'),
+                        'thread': threading.current_thread().name})
+
+    @app.route('/righe', methods=['POST'])
+    def righe():
+        lines = [line.decode('utf-8').strip() for line in request.stream]
+
+        def generate():
+            for line in lines:
+                yield json.dumps({'riga': line, 'path': request.path}) + "\n"
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    @app.route('/health', methods=['GET'])
+    def health():
+        return jsonify({'status': 'healthy', 'thread': threading.current_thread().name})
+
+    return app
+
+async def call(app, method, path, body_chunks=(), headers=(), query=b""):
+    """Esegue una richiesta ASGI e restituisce stato, header e blocchi del corpo"""
+    incoming = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(body_chunks) - 1}
+                for i, chunk in enumerate(body_chunks)] or [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0) if incoming else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'root_path': '',
+             'headers': [(name.encode(), value.encode()) for name, value in headers], 'http_version': '1.1',
+             'scheme': 'http', 'server': ('test', 80), 'client': ('127.0.0.1', 5000)}
+    await app(scope, receive, send)
+    start = sent[0]
+    chunks = [message['body'] for message in sent[1:] if message['body']]
+    return start['status'], {name.lower(): value for name, value in start['headers']}, chunks
+
+class TestContentLength(unittest.TestCase):
+    """Test della validazione di Content-Length prima dell'app"""
+
+    def test_content_length_error(self):
+        """Test: valori non numerici o negativi sono errori, l'header assente no"""
+        self.assertIsNone(content_length_error([]))
+        self.assertIsNone(content_length_error([(b'content-length', b'12')]))
+        self.assertIn('abc', content_length_error([(b'Content-Length', b'abc')]))
+        self.assertIsNotNone(content_length_error([(b'content-length', b'-1')]))
+
+@unittest.skipIf(WSGIMiddleware is None, "uvicorn non installato")
+class TestASGI(unittest.TestCase):
+    """Test per il servizio ASGI delle API"""
+
+    def test_same_json_contract(self):
+        """Test: JSON, query string e 404 come in WSGI"""
+        app = ASGIApplication(make_wsgi_app(), threads=2)
+        try:
+            body = json.dumps({'titolo': 'Pastiglie freno'}).encode()
+            status, headers, chunks = asyncio.run(call(
+                app, 'POST', '/echo', [body], [('content-type', 'application/json'), ('content-length', str(len(body)))],
+                b'lingua=it'
+            ))
+            payload = json.loads(b''.join(chunks))
+            self.assertEqual(status, 200)
+            self.assertEqual(payload['dati'], {'titolo': 'Pastiglie freno'})
+            self.assertEqual(payload['lingua'], 'it')
+
+            status, _, chunks = asyncio.run(call(app, 'GET', '/health'))
+            self.assertEqual(json.loads(b''.join(chunks))['status'], 'healthy')
+            self.assertEqual(asyncio.run(call(app, 'GET', '/inesistente'))[0], 404)
+        finally:
+            app.shutdown()
+
+    def test_streaming_request_and_response(self):
+        """Test: corpo in più blocchi e risposta NDJSON riga per riga"""
+        app = ASGIApplication(make_wsgi_app(), threads=2)
+        try:
+            status, headers, chunks = asyncio.run(call(app, 'POST', '/righe', [b'uno\ndu', b'e\n', b'tre\n']))
+            self.assertEqual(status, 200)
+            self.assertEqual(headers[b'content-type'], b'application/x-ndjson')
+            self.assertEqual([json.loads(line) for line in b''.join(chunks).splitlines()],
+                             [{'riga': riga, 'path': '/righe'} for riga in ('uno', 'due', 'tre')])
+        finally:
+            app.shutdown()
+
+    def test_concurrent_requests_share_the_pool(self):
+        """Test: le richieste concorrenti vengono servite in parallelo dal pool sullo stesso event loop"""
+        barrier = threading.Barrier(4)
+        app = ASGIApplication(make_wsgi_app(barrier), threads=4)
+        body = b'{"n": 1}'
+        headers = [('content-type', 'application/json'), ('content-length', str(len(body)))]
+
+        async def run_all():
+            return await asyncio.gather(*(call(app, 'POST', '/echo', [body], headers) for _ in range(4)))
+
+        try:
+            # Con un thread per volta la barriera non si sbloccherebbe
+            self.assertEqual([status for status, _, _ in asyncio.run(run_all())], [200] * 4)
+        finally:
+            app.shutdown()
+
+    def test_invalid_content_length(self):
+        """Test: un Content-Length non valido riceve 400 in JSON senza arrivare all'app"""
+        app = ASGIApplication(make_wsgi_app(), threads=1)
+        try:
+            status, headers, chunks = asyncio.run(call(app, 'POST', '/echo', [b'{}'], [('content-length', 'abc')]))
+            self.assertEqual(status, 400)
+            self.assertEqual(json.loads(b''.join(chunks))['status'], 'error')
+        finally:
+            app.shutdown()
+
+    def test_lifespan(self):
+        """Test: startup e shutdown del lifespan, con chiusura del pool"""
+        app = ASGIApplication(make_wsgi_app(), threads=1)
+        incoming = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+if __name__ == '__main__':
+    unittest.main()
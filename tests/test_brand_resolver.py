@@ -0,0 +1,37 @@
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from brand_resolver import BrandResolver, fold_tokens
+from nlp_analyzer import MultilingualNLPAnalyzer
+
+class TestBrandResolver(unittest.TestCase):
+    """Test per il riconoscimento dei brand a livello di token"""
+
+    def setUp(self):
+        self.analyzer = MultilingualNLPAnalyzer()
+
+    def test_word_boundaries(self):
+        """Test: gli alias brevi non vengono trovati dentro altre parole"""
+        brands = self.analyzer._extract_brands("tappetini in gomma per carrozzeria nikiana, ambientali")
+        self.assertEqual(brands, [])
+
+    def test_multi_token_aliases_and_accents(self):
+        """Test degli alias composti, dei trattini e degli accenti"""
+        text = self.analyzer._normalize_text("Dischi Brembo per Mercedes-Benz e Alfa Romeo Giulia, Škoda Octavia")
+        self.assertEqual(self.analyzer._extract_brands(text), ["Mercedes-Benz", "Alfa Romeo", "Skoda", "Brembo"])
+
+    def test_longest_alias_wins(self):
+        """Test: a parità di posizione vince l'alias più lungo"""
+        resolver = BrandResolver()
+        resolver.add_brand("Mann-Filter", ["mann filter"])
+        resolver.add_brand("Filter Co", ["filter"])
+
+        self.assertEqual(resolver.resolve_tokens(fold_tokens("MANN-FILTER w 712")), [("Mann-Filter", 0, 2)])
+        self.assertEqual(resolver.brand_for("Mann Filter"), "Mann-Filter")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import json
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'examples'))
+
+from product_categorizer import ProductCategorizer
+from batch_engine import BatchCategorizationEngine
+from bulk_stream import BulkCategorizationStream, BulkCheckpoint, iter_ndjson_lines
+from category_tree import insert_path
+from config import BatchConfig
+from sample_data import SAMPLE_PRODUCTS
+
+class TestBulkCategorizationStream(unittest.TestCase):
+    """Test per la categorizzazione in streaming NDJSON"""
+
+    def setUp(self):
+        lines = [
+            json.dumps({'id': i, 'titolo': p['title'], 'descrizione': p['description']})
+            for i, p in enumerate(SAMPLE_PRODUCTS * 2)
+        ]
+        lines.insert(1, 'non json')
+        lines.insert(3, '')
+        self.feed = ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def _run(self, feed: bytes, checkpoint: BulkCheckpoint = None, current_tree=None):
+        engine = BatchCategorizationEngine(ProductCategorizer(), BatchConfig(executor="serial"))
+        bulk_stream = BulkCategorizationStream(engine, chunk_size=3)
+        return list(bulk_stream.run(io.BytesIO(feed), checkpoint, current_tree))
+
+    def test_results_checkpoints_and_summary(self):
+        """Test dei record emessi"""
+        records = self._run(self.feed)
+        results = [r for r in records if r['type'] == 'result']
+        checkpoints = [r for r in records if r['type'] == 'checkpoint']
+
+        # Una riga vuota non produce risultati, una riga non valida produce un errore
+        self.assertEqual(len(results), len(SAMPLE_PRODUCTS) * 2 + 1)
+        self.assertEqual(results[1]['status'], 'error')
+        self.assertEqual([r['line'] for r in results], sorted(r['line'] for r in results))
+        self.assertTrue(all(r['processed'] % 3 == 0 for r in checkpoints[:-1]))
+
+        summary = records[-1]
+        self.assertEqual(summary['type'], 'summary')
+        self.assertEqual(summary['offset'], len(self.feed))
+        self.assertEqual(summary['failed'], 1)
+
+    def test_resume_from_checkpoint(self):
+        """Test della ripresa da un checkpoint intermedio"""
+        records = self._run(self.feed)
+        checkpoint = [r for r in records if r['type'] == 'checkpoint'][1]
+
+        # Come il file di checkpoint, la ripresa riparte dall'albero costruito fino al checkpoint
+        tree = {}
+        for r in records:
+            if r['type'] == 'result' and r['status'] == 'success' and r['line'] < checkpoint['line']:
+                tree = insert_path(tree, [r['categoria_principale']] + r['sottocategoria'].split(' > '))
+
+        resumed = self._run(
+            self.feed[checkpoint['offset']:],
+            BulkCheckpoint(line=checkpoint['line'], offset=checkpoint['offset']),
+            tree
+        )
+
+        expected = [r for r in records if r['type'] == 'result' and r['line'] >= checkpoint['line']]
+        self.assertEqual([r for r in resumed if r['type'] == 'result'], expected)
+        self.assertEqual(resumed[-1]['offset'], len(self.feed))
+
+    def test_oversized_line(self):
+        """Test delle righe troppo lunghe"""
+        feed = b'x' * 50 + b'\n{"titolo": "Filtro olio"}\n'
+        lines = list(iter_ndjson_lines(io.BytesIO(feed), max_line_bytes=32))
+
+        self.assertEqual(lines[0], (0, 51, None))
+        self.assertEqual(lines[1][2], b'{"titolo": "Filtro olio"}\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'examples'))
 from product_categorizer import ProductCategorizer, ProductAnalysis, CategoryResult
 from nlp_analyzer import MultilingualNLPAnalyzer
 from seo_optimizer import SEOOptimizer
-from utils import TextProcessor, CategoryUtils, ValidationUtils
+from utils import TextProcessor, CategoryUtils, ValidationUtils, CacheUtils
 from sample_data import SAMPLE_CATEGORY_TREE, SAMPLE_PRODUCTS, TEST_SCENARIOS
 
 class TestProductCategorizer(unittest.TestCase):
@@ -259,6 +259,44 @@ class TestUtils(unittest.TestCase):
         is_valid, errors = utils.validate_product_data(invalid_product)
         self.assertFalse(is_valid)
         self.assertGreater(len(errors), 0)
+    
+    def test_cache_utils(self):
+        """Test CacheUtils"""
+        cache = CacheUtils(max_size=2, ttl_seconds=60, max_bytes=10)
+        
+        # Test evizione LRU: la chiave letta di recente sopravvive
+        cache.set("a", "x")
+        cache.set("b", "y")
+        self.assertEqual(cache.get("a"), "x")
+        cache.set("c", "z")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "x")
+        
+        # Test limite in byte
+        cache.set("d", "1234567890")
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.stats()['bytes'], 10)
+        
+        # Test scadenza TTL
+        cache.set("e", "v", ttl=-1)
+        self.assertNotIn("e", cache)
+        self.assertGreater(cache.stats()['expirations'], 0)
+    
+    def test_cached_decorator(self):
+        """Test del decorator cached (anche con risultati None e argomenti non hashable)"""
+        cache = CacheUtils()
+        calls = []
+        
+        @cache.cached()
+        def lookup(value, options=None):
+            calls.append(value)
+            return None
+        
+        lookup("filtro", options=["olio"])
+        lookup("filtro", options=["olio"])
+        lookup("freno")
+        self.assertEqual(calls, ["filtro", "freno"])
+        self.assertEqual(cache.stats()['hits'], 1)
 
 class TestIntegration(unittest.TestCase):
     """Test di integrazione"""
@@ -309,6 +347,73 @@ class TestIntegration(unittest.TestCase):
             self.assertIsInstance(result, CategoryResult)
             self.assertIsNotNone(result.main_category)
 
+class TestBatchEngine(unittest.TestCase):
+    """Test del motore di categorizzazione batch"""
+    
+    def _serial_reference(self, products):
+        categorizer = ProductCategorizer()
+        tree = {}
+        results = []
+        for product in products:
+            result = categorizer.categorize_product(
+                title=product['title'],
+                description=product['description'],
+                current_tree=tree,
+                target_seo_keywords=['ricambi']
+            )
+            tree = result.nuovo_albero
+            results.append(result)
+        return results, categorizer.category_tree
+    
+    def test_parallel_matches_serial(self):
+        """Test dell'equivalenza tra elaborazione parallela e seriale"""
+        from batch_engine import BatchCategorizationEngine, BatchItem
+        from config import BatchConfig
+        
+        products = SAMPLE_PRODUCTS * 4
+        expected_results, expected_tree = self._serial_reference(products)
+        items = [BatchItem(index=i, title=p['title'], description=p['description']) for i, p in enumerate(products)]
+        
+        for executor in ("serial", "thread", "process"):
+            categorizer = ProductCategorizer()
+            engine = BatchCategorizationEngine(
+                categorizer,
+                BatchConfig(executor=executor, max_workers=2, chunk_size=3, min_parallel_items=2)
+            )
+            try:
+                outcomes = engine.categorize(items, {}, ['ricambi'])
+            finally:
+                engine.shutdown()
+            
+            self.assertEqual([outcome.index for outcome in outcomes], list(range(len(products))))
+            self.assertEqual([outcome.result for outcome in outcomes], expected_results, executor)
+            self.assertEqual(categorizer.category_tree, expected_tree, executor)
+    
+    def test_errors_do_not_update_tree(self):
+        """Test degli errori per singolo prodotto"""
+        from batch_engine import BatchCategorizationEngine, BatchItem
+        from config import BatchConfig
+        
+        categorizer = ProductCategorizer()
+        prepare = categorizer.prepare_categorization
+        
+        def failing_prepare(title, description, target_seo_keywords=None):
+            if title == "guasto":
+                raise ValueError("analisi fallita")
+            return prepare(title, description, target_seo_keywords)
+        
+        categorizer.prepare_categorization = failing_prepare
+        engine = BatchCategorizationEngine(categorizer, BatchConfig(executor="serial"))
+        outcomes = engine.categorize([
+            BatchItem(index=0, title="guasto", description="pastiglie freno"),
+            BatchItem(index=1, title="Filtro olio", description="filtro")
+        ], {})
+        
+        self.assertIsNone(outcomes[0].result)
+        self.assertEqual(outcomes[0].error, "analisi fallita")
+        expected = ProductCategorizer().categorize_product("Filtro olio", "filtro", {})
+        self.assertEqual(outcomes[1].result.nuovo_albero, expected.nuovo_albero)
+
 def run_tests():
     """Esegue tutti i test"""
     # Crea test suite
@@ -317,7 +422,8 @@ def run_tests():
         TestNLPAnalyzer,
         TestSEOOptimizer,
         TestUtils,
-        TestIntegration
+        TestIntegration,
+        TestBatchEngine
     ]
     
     suite = unittest.TestSuite()
@@ -0,0 +1,63 @@
+"""Test per lo scoring delle categorie a matrici sparse"""
+
+import sys
+import os
+import random
+import unittest
+
+# Aggiungi la directory principale al path per l'importazione dei moduli
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.category_index import CategoryKeywordIndex
+from src.category_matrix import CategoryScoringMatrix
+from src.italian_categorizer import ItalianProductCategorizer
+from src.validators import ProductInput
+
+CATEGORIES_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'italian_categories.json')
+
+class TestCategoryScoringMatrix(unittest.TestCase):
+    """Test case per la matrice termini x sottocategorie"""
+
+    def test_matches_inverted_index(self):
+        """Test: il prodotto matriciale dà gli stessi punteggi e lo stesso ordine dell'indice invertito"""
+        index = CategoryKeywordIndex.from_categories_file(CATEGORIES_FILE)
+        matrix = CategoryScoringMatrix(index)
+        terms = [term for term, _ in index.items()] + ["termine sconosciuto"]
+        random.seed(7)
+        batch = [
+            [(random.choice(terms), random.randint(1, 3)) for _ in range(random.randint(0, 6))]
+            for _ in range(300)
+        ]
+
+        for term_counts, scores in zip(batch, matrix.score_batch(batch)):
+            expected = index.score_terms(term_counts)
+            for limit in (None, 1, 3):
+                self.assertEqual(scores.ranked_categories(limit), expected.ranked_categories(limit))
+            for category_id, _ in expected.ranked_categories():
+                self.assertEqual(scores.subcategories_of(category_id), expected.subcategories_of(category_id))
+
+    def test_categorize_products_batch(self):
+        """Test: il batch restituisce gli stessi risultati della categorizzazione singola"""
+        categorizer = ItalianProductCategorizer()
+        categorizer.result_cache = None
+        products = [
+            ProductInput(title="Kit Frizione Completo per Fiat Punto", description="Con volano",
+                         brand="Valeo", language="it"),
+            ProductInput(title="Pastiglie freno anteriori Brembo", description="Dischi e pastiglie",
+                         brand="Brembo", language="it"),
+            ProductInput(title="Kit Frizione Completo per Fiat Punto", description="Con volano",
+                         brand="Valeo", language="it"),
+            ProductInput(title="Prodotto generico", description="Senza termini", brand="Nessuno",
+                         language="it"),
+        ]
+
+        batch = categorizer.categorize_products(products)
+        self.assertEqual([result.title for result in batch], [product.title for product in products])
+        for product, result in zip(products, batch):
+            single = categorizer.categorize_product(product)
+            self.assertEqual(result.categories, single.categories)
+            self.assertEqual(result.confidence, single.confidence)
+            self.assertEqual(result.keywords, single.keywords)
+
+if __name__ == '__main__':
+    unittest.main()
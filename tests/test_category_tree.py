@@ -0,0 +1,109 @@
+import copy
+import json
+import pickle
+import threading
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from category_tree import (TreePatchError, TreeVersionConflictError, VersionedCategoryTree, apply_patch,
+                           contains_path, diff_trees, freeze_tree, insert_path)
+from product_categorizer import ProductCategorizer
+
+class TestCategoryTree(unittest.TestCase):
+    """Test per l'albero delle categorie persistente e versionato"""
+
+    def test_insert_shares_untouched_subtrees(self):
+        """Test: l'inserimento copia solo il percorso e lascia intatta la snapshot di partenza"""
+        base = freeze_tree({"Ricambi Auto": {"Freni": {"Pastiglie": {}}, "Motore": {"Filtri": {}}}, "Moto": {}})
+        updated = insert_path(base, ["Ricambi Auto", "Freni", "Dischi"])
+
+        self.assertEqual(base, {"Ricambi Auto": {"Freni": {"Pastiglie": {}}, "Motore": {"Filtri": {}}}, "Moto": {}})
+        self.assertTrue(contains_path(updated, ["Ricambi Auto", "Freni", "Dischi"]))
+        self.assertIs(updated["Ricambi Auto"]["Motore"], base["Ricambi Auto"]["Motore"])
+        self.assertIs(updated["Moto"], base["Moto"])
+        self.assertIs(insert_path(updated, ["Ricambi Auto", "Freni"]), updated)
+
+        with self.assertRaises(TypeError):
+            updated["Nuova"] = {}
+        self.assertEqual(json.loads(json.dumps(updated)), updated)
+        self.assertEqual(pickle.loads(pickle.dumps(updated)), updated)
+        self.assertIs(copy.deepcopy(updated), updated)
+
+    def test_concurrent_updates_are_not_lost(self):
+        """Test: gli aggiornamenti concorrenti vengono tutti pubblicati, una versione ciascuno"""
+        store = VersionedCategoryTree()
+
+        def worker(thread_index):
+            for i in range(50):
+                store.update(lambda tree: insert_path(tree, ["Ricambi Auto", f"T{thread_index}", f"C{i}"]))
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(store.version, 200)
+        self.assertEqual(sum(len(children) for children in store.snapshot()["Ricambi Auto"].values()), 200)
+
+    def test_categorizer_overlays_and_new_categories(self):
+        """Test: l'albero della richiesta non viene modificato né pubblicato, is_new_category usa la snapshot precedente"""
+        categorizer = ProductCategorizer()
+        request_tree = {"Ricambi Auto": {"Filtri": {}}}
+
+        result = categorizer.categorize_product("Pastiglie freno Brembo", "Pastiglie freno anteriori", request_tree)
+        self.assertTrue(result.is_new_category)
+        self.assertEqual(request_tree, {"Ricambi Auto": {"Filtri": {}}})
+        self.assertEqual(categorizer.category_tree, {})
+
+        # Senza albero il percorso viene pubblicato nell'albero condiviso
+        first = categorizer.categorize_product("Filtro olio Mann", "Filtro olio motore")
+        second = categorizer.categorize_product("Filtro olio Mann", "Filtro olio motore")
+        self.assertTrue(first.is_new_category)
+        self.assertFalse(second.is_new_category)
+        self.assertEqual(categorizer.tree_store.version, 1)
+        self.assertIs(categorizer.category_tree, second.nuovo_albero)
+
+    def test_diff_and_patch(self):
+        """Test: le modifiche calcolate tra due versioni ricostruiscono l'albero e il patch è atomico"""
+        base = freeze_tree({"Ricambi Auto": {"Freni": {"Pastiglie": {}}, "Motore": {}}, "Moto/Scooter": {}})
+        patched = apply_patch(base, [
+            {"op": "add", "path": "/Ricambi Auto/Freni/Dischi"},
+            {"op": "move", "from": "/Ricambi Auto/Motore", "path": "/Ricambi Auto/Freni/Motore"},
+            {"op": "replace", "path": "/Moto~1Scooter", "value": {"Caschi": {}}},
+            {"op": "test", "path": "/Moto~1Scooter/Caschi", "value": {}},
+        ])
+        self.assertEqual(patched, {"Ricambi Auto": {"Freni": {"Pastiglie": {}, "Dischi": {}, "Motore": {}}},
+                                   "Moto/Scooter": {"Caschi": {}}})
+        self.assertEqual(apply_patch(base, diff_trees(base, patched)), patched)
+        self.assertEqual(diff_trees(patched, patched), [])
+
+        with self.assertRaises(TreePatchError):
+            apply_patch(base, [{"op": "add", "path": "/Nuova"}, {"op": "remove", "path": "/Inesistente"}])
+        self.assertNotIn("Nuova", base)
+
+        store = VersionedCategoryTree(base)
+        store.update(lambda tree: apply_patch(tree, [{"op": "add", "path": "/Nuova"}]), expected_version=0)
+        self.assertEqual(store.changes_since(0), [{"op": "add", "path": "/Nuova", "value": {}}])
+        with self.assertRaises(TreeVersionConflictError):
+            store.update(lambda tree: tree, expected_version=0)
+
+    def test_results_carry_tree_changes(self):
+        """Test: ogni risultato riporta solo i nodi aggiunti e la versione dell'albero condiviso"""
+        categorizer = ProductCategorizer()
+        first = categorizer.categorize_product("Filtro olio Mann", "Filtro olio motore")
+        second = categorizer.categorize_product("Filtro olio Mann", "Filtro olio motore")
+        overlay = categorizer.categorize_product("Filtro olio Mann", "Filtro olio motore", {"Moto": {}})
+
+        self.assertEqual(first.modifiche_albero, [{"op": "add", "path": "/Ricambi Auto", "value": first.nuovo_albero["Ricambi Auto"]}])
+        self.assertEqual((second.modifiche_albero, second.versione_albero), ([], 1))
+        self.assertEqual(apply_patch({"Moto": {}}, overlay.modifiche_albero), overlay.nuovo_albero)
+        self.assertIsNone(overlay.versione_albero)
+        self.assertEqual(categorizer.tree_store.changes_since(0), first.modifiche_albero)
+
+if __name__ == '__main__':
+    unittest.main()
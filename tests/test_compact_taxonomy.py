@@ -0,0 +1,83 @@
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'examples'))
+
+from compact_taxonomy import CompactTaxonomy, NO_NODE
+from category_tree import VersionedCategoryTree, insert_path
+from product_categorizer import ProductCategorizer
+from utils import CategoryUtils, ValidationUtils
+from sample_data import SAMPLE_CATEGORY_TREE
+
+class TestCompactTaxonomy(unittest.TestCase):
+    """Test per la tassonomia compatta ad array"""
+
+    def setUp(self):
+        self.taxonomy = CompactTaxonomy.from_dict(SAMPLE_CATEGORY_TREE)
+
+    def _paths(self, tree, prefix=()):
+        for name, subtree in tree.items():
+            yield list(prefix) + [name]
+            if isinstance(subtree, dict):
+                yield from self._paths(subtree, tuple(prefix) + (name,))
+
+    def test_round_trip_and_lookup(self):
+        """Test: conversione da e verso dict, ricerca dei percorsi, figli e antenati"""
+        taxonomy = self.taxonomy
+        self.assertEqual(taxonomy.to_dict(), SAMPLE_CATEGORY_TREE)
+        self.assertEqual(CompactTaxonomy.from_dict({}).to_dict(), {})
+
+        for node, path in enumerate(self._paths(SAMPLE_CATEGORY_TREE)):
+            self.assertEqual(taxonomy.find(path), node)
+            self.assertEqual(taxonomy.path(node), path)
+            self.assertEqual(taxonomy.depth[node], len(path) - 1)
+        self.assertEqual(taxonomy.find(["Ricambi Auto", "Inesistente"]), NO_NODE)
+        self.assertNotIn(["Inesistente"], taxonomy)
+
+        freni = taxonomy.find(["Ricambi Auto", "Freni"])
+        pastiglie = taxonomy.find(["Ricambi Auto", "Freni", "Pastiglie Freno", "Pastiglie Anteriori"])
+        motore = taxonomy.find(["Ricambi Auto", "Motore"])
+        self.assertTrue(taxonomy.is_ancestor(freni, pastiglie))
+        self.assertFalse(taxonomy.is_ancestor(motore, pastiglie))
+        self.assertEqual([taxonomy.name(child) for child in taxonomy.children(freni)],
+                         list(SAMPLE_CATEGORY_TREE["Ricambi Auto"]["Freni"]))
+        self.assertEqual(len(taxonomy.subtree(freni)), len(list(self._paths(SAMPLE_CATEGORY_TREE["Ricambi Auto"]["Freni"]))) + 1)
+
+    def test_utils_accept_taxonomy(self):
+        """Test: profondità, categorie simili e validazione danno gli stessi risultati del dict"""
+        tree = insert_path(SAMPLE_CATEGORY_TREE, ["Ricambi Auto", "Freni", "Pastiglie Freno", "Pastiglie Anteriori", "Kit!"])
+        taxonomy = CompactTaxonomy.from_dict(tree)
+
+        for path in (["Ricambi Auto", "Freni", "Dischi Freno"], ["Ricambi Auto", "Nessuna", "Freni"], []):
+            self.assertEqual(CategoryUtils.get_category_depth(taxonomy, path), CategoryUtils.get_category_depth(tree, path))
+        self.assertEqual(CategoryUtils.find_similar_categories("Filtro Olio", taxonomy, 0.3),
+                         CategoryUtils.find_similar_categories("Filtro Olio", tree, 0.3))
+        for max_depth in (2, 4):
+            self.assertEqual(ValidationUtils.validate_category_tree(taxonomy, max_depth),
+                             ValidationUtils.validate_category_tree(tree, max_depth))
+
+    def test_versioned_tree_taxonomy(self):
+        """Test: la tassonomia dell'albero condiviso viene ricostruita solo quando cambia la versione"""
+        store = VersionedCategoryTree(SAMPLE_CATEGORY_TREE)
+        taxonomy = store.taxonomy()
+        self.assertIs(store.taxonomy(), taxonomy)
+        store.update(lambda tree: insert_path(tree, ["Moto", "Caschi"]))
+        self.assertIn(["Moto", "Caschi"], store.taxonomy())
+
+    def test_categorizer_keeps_taxonomy_for_existing_paths(self):
+        """Test: un percorso già presente non pubblica versioni, quindi la tassonomia non viene ricostruita"""
+        categorizer = ProductCategorizer()
+        first = categorizer.categorize_product("Filtro olio Mann", "Filtro olio motore")
+        taxonomy = categorizer.tree_store.taxonomy()
+        second = categorizer.categorize_product("Filtro olio Mann", "Filtro olio motore")
+
+        self.assertTrue(first.is_new_category)
+        self.assertFalse(second.is_new_category)
+        self.assertEqual((second.versione_albero, second.modifiche_albero), (1, []))
+        self.assertIs(categorizer.tree_store.taxonomy(), taxonomy)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from extraction_engine import ExtractionEngine, expand_pattern
+from product_categorizer import ProductCategorizer
+
+class TestExtractionEngine(unittest.TestCase):
+    """Test per il motore di estrazione a passata singola"""
+
+    def test_expand_pattern(self):
+        """Test dell'espansione dei pattern a linguaggio finito"""
+        self.assertEqual(expand_pattern(r'dischi? freno'), (['dischi freno', 'disch freno'], False))
+        self.assertEqual(sorted(expand_pattern(r'pastigli[ae]')[0]), ['pastiglia', 'pastiglie'])
+        self.assertEqual(expand_pattern(r'\b(BMW|Alfa Romeo)\b'), (['BMW', 'Alfa Romeo'], True))
+        with self.assertRaises(ValueError):
+            expand_pattern(r'\d+\.\d+')
+
+    def test_overlapping_and_bounded_matches(self):
+        """Test delle occorrenze sovrapposte e dei confini di parola"""
+        engine = ExtractionEngine()
+        engine.add_literal("seo", "motor", "motor", 0)
+        engine.add_literal("seo", "motore", "motore", 1)
+        engine.add_literal("seo", "freno", "freno", 2)
+        engine.add_literal("type", "pad freno", "Pastiglie", 0)
+        engine.add_literal("seo", "toreador", "toreador", 3)
+        engine.add_literal("brand", "seat", "seat", 0, word_bounded=True)
+        engine.build()
+
+        scan = engine.scan("motoreador pad freno seats seat 320 2015")
+        self.assertEqual(scan.values("seo"), ["motor", "motore", "freno", "toreador"])
+        self.assertEqual(scan.first_by_priority("type"), "Pastiglie")
+        self.assertEqual([hit[0] for hit in scan.hits["brand"]], [27])
+        self.assertEqual(scan.numbers, ["320", "2015"])
+
+    def test_analysis_fields(self):
+        """Test dei campi dell'analisi prodotto ricavati dalla scansione"""
+        analysis = ProductCategorizer().analyze_product(
+            "Filtro olio Bosch per Alfa Romeo 147",
+            "Ricambio compatibile con modelli dal 2004, codice 1600"
+        )
+        self.assertEqual(analysis.product_type, "Filtri")
+        self.assertEqual(analysis.brand, "alfa romeo")
+        self.assertEqual(analysis.model, "147")
+        self.assertEqual(analysis.main_function, "Filtrazione")
+        self.assertEqual(analysis.compatibility, ["Anno 2004"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import gzip
+import json
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from category_tree import freeze_tree, subtree_at, truncate_tree
+from http_cache import RepresentationCache, choose_encoding, conditional_response, etag_matches
+
+class TestHttpCache(unittest.TestCase):
+    """Test per le risposte condizionali e pre-compresse degli endpoint delle categorie"""
+
+    def setUp(self):
+        self.cache = RepresentationCache(lambda payload: json.dumps(payload).encode("utf-8"), min_compress_size=0)
+        self.tree = freeze_tree({"Ricambi Auto": {"Freni": {"Pastiglie": {}}, "Motore": {}}, "Moto": {}})
+
+    def test_body_is_built_once_per_version(self):
+        """Test: i polling sulla stessa versione riusano il corpo, una nuova versione lo ricostruisce"""
+        first = self.cache.get(1, None, lambda: {"categories": self.tree})
+        again = self.cache.get(1, None, lambda: self.fail("corpo ricostruito senza cambio di versione"))
+        self.assertIs(again, first)
+        self.assertEqual(json.loads(gzip.decompress(first.bodies["gzip"])), {"categories": self.tree})
+
+        changed = self.cache.get(2, None, lambda: {"categories": {}})
+        self.assertNotEqual(changed.etag, first.etag)
+        self.assertEqual(self.cache.builds, 2)
+
+    def test_conditional_response(self):
+        """Test: 304 senza corpo per If-None-Match (anche debole o di un'altra codifica), gzip se accettato"""
+        entry = self.cache.get(1, None, lambda: {"categories": self.tree})
+
+        status, headers, body = conditional_response(entry, None, "gzip;q=0.8, identity")
+        headers = dict(headers)
+        self.assertEqual((status, headers["Content-Encoding"]), (200, "gzip"))
+        self.assertEqual(gzip.decompress(body), entry.bodies["identity"])
+
+        for if_none_match in (headers["ETag"], entry.etag, f'"altro", W/{entry.etag}', "*"):
+            status, _, body = conditional_response(entry, if_none_match, "gzip")
+            self.assertEqual((status, body), (304, b""))
+        self.assertFalse(etag_matches('"altro"', entry.etag))
+        self.assertEqual(choose_encoding("gzip;q=0, br", entry.bodies), "identity")
+
+    def test_subtree_query(self):
+        """Test: root seleziona un sottoalbero e depth limita i livelli senza copiare l'albero intero"""
+        self.assertEqual(truncate_tree(subtree_at(self.tree, ["Ricambi Auto"]), 1), {"Freni": {}, "Motore": {}})
+        self.assertIs(truncate_tree(self.tree, None), self.tree)
+        self.assertEqual(truncate_tree(self.tree, 0), {})
+        self.assertIsNone(subtree_at(self.tree, ["Ricambi Auto", "Fari"]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -189,5 +189,144 @@ class TestItalianSupport(unittest.TestCase):
         self.assertTrue(len(keywords) > 0)
         self.assertTrue(any("frizione" in keyword for keyword in keywords))
 
+    def test_seo_keywords_priority_and_limit(self):
+        """Test delle parole chiave SEO ordinate per priorità, senza segnaposto e troncate a limit"""
+        from src.italian_support import generate_italian_seo_keywords
+
+        terms = ["spingidisco", "kit frizione", "kit frizione", "disco frizione"]
+        keywords = generate_italian_seo_keywords("Auto", "Trasmissione", terms)
+
+        # Nessun duplicato e nessun segnaposto non risolto
+        self.assertEqual(len(keywords), len(set(keywords)))
+        self.assertFalse(any("{" in keyword for keyword in keywords))
+
+        # I primi k risultati sono un prefisso della lista completa
+        self.assertEqual(generate_italian_seo_keywords("Auto", "Trasmissione", terms, limit=7), keywords[:7])
+
+        # Il termine con volume noto precede quello sconosciuto
+        self.assertLess(keywords.index("kit frizione auto online"), keywords.index("spingidisco auto online"))
+
+        # Con brand e anno i relativi template vengono risolti
+        with_brand = generate_italian_seo_keywords("Auto", "Trasmissione", terms, brand="Valeo", year=2020)
+        self.assertIn("kit frizione per valeo", with_brand)
+        self.assertIn("kit frizione auto 2020", with_brand)
+
+    def test_shared_nlp_pipeline(self):
+        """Test della pipeline NLP condivisa e immutabile"""
+        from src.italian_support import get_italian_nlp_pipeline, analyze_italian_product_title
+        
+        pipeline = get_italian_nlp_pipeline()
+        
+        # La pipeline viene costruita una sola volta e riusata dal categorizzatore
+        self.assertIs(pipeline, get_italian_nlp_pipeline())
+        self.assertIs(ItalianProductCategorizer().pipeline, pipeline)
+        self.assertGreaterEqual(pipeline.load_time, 0.0)
+        
+        # La pipeline non può essere modificata
+        with self.assertRaises(AttributeError):
+            pipeline.nlp_support = None
+        
+        title = "Kit Cinghia Distribuzione con Pompa Acqua per Fiat Punto"
+        self.assertEqual(pipeline.analyze_title(title), analyze_italian_product_title(title))
+    
+    def test_precompiled_lexicon_lookups(self):
+        """Test delle strutture precompilate di ItalianNLPSupport"""
+        from src.italian_support import get_italian_nlp_pipeline
+        
+        nlp_support = get_italian_nlp_pipeline().nlp_support
+        
+        self.assertEqual(nlp_support.identify_compound_words("kit frizione e filtro olio"), ["kit frizione", "filtro olio"])
+        self.assertEqual(nlp_support.normalize_regional_variants("macchina sportello"), "automobile sportello")
+        self.assertEqual(nlp_support.stem_word("dischi"), "disco")
+    
+    def test_aho_corasick_automaton(self):
+        """Test dell'automa multi-pattern"""
+        from src.aho_corasick import AhoCorasickAutomaton
+        
+        automaton = AhoCorasickAutomaton()
+        for pattern in ["he", "she", "his", "hers"]:
+            automaton.add_pattern(pattern, pattern.upper())
+        automaton.build()
+        
+        matches = [(m.pattern, m.payload, m.start, m.end) for m in automaton.iter_matches("ushers")]
+        self.assertEqual(matches, [("she", "SHE", 1, 4), ("he", "HE", 2, 4), ("hers", "HERS", 2, 6)])
+    
+    def test_automotive_terms_with_offsets(self):
+        """Test dell'estrazione dei termini automotive con offset"""
+        from src.italian_support import get_italian_nlp_pipeline
+        
+        nlp_support = get_italian_nlp_pipeline().nlp_support
+        hits = nlp_support.find_automotive_terms("Freno a mano e pompa acqua")
+        found = {(hit.term, hit.category, hit.start, hit.end) for hit in hits}
+        
+        self.assertIn(("freno a mano", "freni", 0, 12), found)
+        self.assertIn(("pompa acqua", "motore", 15, 26), found)
+        
+        # I termini composti non vengono riconosciuti a cavallo di parole
+        terms = nlp_support.extract_automotive_terms("superpompa acquario")
+        self.assertNotIn("pompa acqua", terms["motore"])
+
+    def test_category_keyword_index(self):
+        """Test dell'indice invertito delle parole chiave di categoria"""
+        from src.category_index import CategoryKeywordIndex
+        
+        index = CategoryKeywordIndex.from_category_config({
+            "auto": {
+                "main_category": "Auto",
+                "subcategories": {
+                    "freni": {"name": "Freni", "keywords": ["pastiglie", "disco", "disco"]},
+                    "motore": {"name": "Motore", "keywords": ["filtro", "disco"]}
+                }
+            }
+        })
+        
+        scores = index.score_terms([("disco", 2), ("pastiglie", 1), ("sconosciuto", 3)])
+        self.assertEqual(scores.ranked_categories(), [("auto", 5)])
+        self.assertEqual(scores.subcategories_of("auto"), [("freni", 3), ("motore", 2)])
+        self.assertEqual(index.subcategory_name("auto", "freni"), "Freni")
+    
+    def test_category_index_from_categories_file(self):
+        """Test della costruzione dell'indice da data/italian_categories.json"""
+        from src.category_index import CategoryKeywordIndex
+        
+        path = os.path.join(os.path.dirname(__file__), '..', 'data', 'italian_categories.json')
+        index = CategoryKeywordIndex.from_categories_file(path)
+        
+        postings = {(posting.category_id, posting.subcategory_id) for posting in index.postings("monoblocco")}
+        self.assertEqual(postings, {("motore", "blocco_motore")})
+        self.assertIn(("ricambi_auto", "motore"), {(p.category_id, p.subcategory_id) for p in index.postings("propulsore")})
+
+    def test_suffix_trie_stemmer(self):
+        """Test dello stemmer a trie di suffissi"""
+        from src.suffix_stemmer import SuffixTrieStemmer
+        
+        stemmer = SuffixTrieStemmer([("i", "o"), ("oni", "one"), ("zione", "to")], cache_size=2)
+        
+        # Vince la regola con il suffisso più lungo, indipendentemente dall'ordine
+        self.assertEqual(stemmer.stem("pistoni"), "pistone")
+        self.assertEqual(stemmer.stem("ricambi"), "ricambo")
+        self.assertEqual(stemmer.stem("regolazione"), "regolato")
+        self.assertEqual(stemmer.stem("filtro"), "filtro")
+        # La radice non può restare vuota
+        self.assertEqual(stemmer.stem("i"), "i")
+        
+        self.assertEqual(stemmer.stem_tokens(["ricambi", "pistoni", "ricambi"]), ["ricambo", "pistone", "ricambo"])
+        self.assertLessEqual(stemmer.cache_info().currsize, 2)
+        
+        stemmer.preload_vocabulary(["dischi"])
+        misses = stemmer.cache_info().misses
+        self.assertEqual(stemmer.stem("dischi"), "discho")
+        self.assertEqual(stemmer.cache_info().misses, misses)
+    
+    def test_stemmer_from_lexicon_store(self):
+        """Test dello stemmer costruito dalle regole di data/"""
+        from src.suffix_stemmer import SuffixTrieStemmer
+        from src.lexicon_store import get_lexicon_store
+        from src.italian_support import ItalianNLPSupport
+        
+        stemmer = SuffixTrieStemmer.from_lexicon_store(get_lexicon_store())
+        nlp_support = ItalianNLPSupport(stemmer=stemmer)
+        self.assertEqual(nlp_support.stem_text("ruote freni"), "ruota freno")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""Test per l'archivio binario dei lessici italiani"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Aggiungi la directory principale al path per importare i moduli
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.lexicon_store import (
+    DEFAULT_DATA_DIR, LEXICON_SOURCES, LexiconStore, compile_lexicon_store, open_lexicon_store
+)
+from src.exceptions import ModelLoadError
+from src.italian_support import ItalianNLPSupport
+
+class TestLexiconStore(unittest.TestCase):
+    """Test per la compilazione e la lettura dell'archivio dei lessici"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.temp_dir, "data")
+        os.makedirs(self.data_dir)
+        for filename in LEXICON_SOURCES.values():
+            shutil.copy(os.path.join(DEFAULT_DATA_DIR, filename), self.data_dir)
+        self.store_path = os.path.join(self.temp_dir, "italian_lexicons.lex")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_lookups(self):
+        """Test delle ricerche sulle tabelle compilate"""
+        compile_lexicon_store(self.data_dir, self.store_path)
+
+        with LexiconStore(self.store_path) as store:
+            self.assertTrue(store.is_stopword("il"))
+            self.assertFalse(store.is_stopword("frizione"))
+            self.assertEqual(store.compound_parts("blocco motore"), ("blocco", "motore"))
+            self.assertEqual(store.automotive_category("motore"), "motore")
+            self.assertIsNone(store.automotive_category("inesistente"))
+
+            # Le regole duplicate nel file compaiono una sola volta, nell'ordine originale
+            rules = store.stemming_rules()
+            self.assertEqual(rules[0], ("i", "o"))
+            self.assertEqual(len(rules), len(dict(rules)))
+
+            category = store.category("motore")
+            self.assertEqual(category["name"], "Motore")
+            self.assertIn("blocco_motore", category["subcategories"])
+            self.assertIn("high_volume", store.seo_keywords("ricambi_auto"))
+
+    def test_only_italian_rules_and_variants(self):
+        """Test: nell'archivio entrano solo regole plurale -> singolare e varianti verso termini italiani"""
+        compile_lexicon_store(self.data_dir, self.store_path)
+
+        with LexiconStore(self.store_path) as store:
+            for suffix, replacement in store.stemming_rules():
+                self.assertTrue(replacement)
+                self.assertIn(suffix[-1], "ie")
+            self.assertEqual(store.regional_variant("macchina")[0], "automobile")
+            for term in ("auto", "frizione", "motore", "freni"):
+                self.assertIsNone(store.regional_variant(term))
+            standards = {standard for _, standard, _ in store.rows("regional_variants")}
+            self.assertNotIn("clutch", standards)
+
+            nlp_support = ItalianNLPSupport(store=store)
+            stems = {word: nlp_support.stem_word(word) for word in ("auto", "frizione", "batteria", "motore", "litri")}
+            self.assertEqual(stems, {"auto": "auto", "frizione": "frizione", "batteria": "batteria",
+                                     "motore": "motore", "litri": "litro"})
+            self.assertEqual(nlp_support.normalize_regional_variants("kit frizione completo valeo"),
+                             "kit frizione completo valeo")
+
+    def test_string_pool_is_interned_and_sorted(self):
+        """Test del pool di stringhe e della tabella hash"""
+        compile_lexicon_store(self.data_dir, self.store_path)
+
+        with LexiconStore(self.store_path) as store:
+            strings = [store.string(index) for index in range(len(store))]
+            self.assertEqual(strings, sorted(set(strings), key=lambda value: value.encode('utf-8')))
+            for index in (0, len(store) // 2, len(store) - 1):
+                self.assertEqual(store.string_id(strings[index]), index)
+            self.assertNotIn("parola che non esiste", store)
+
+    def test_recompiles_stale_store(self):
+        """Test della ricompilazione quando i sorgenti cambiano"""
+        open_lexicon_store(self.store_path, self.data_dir).close()
+
+        with open(os.path.join(self.data_dir, LEXICON_SOURCES["stopwords"]), 'a', encoding='utf-8') as f:
+            f.write("\nnuovastopword\n")
+
+        with open_lexicon_store(self.store_path, self.data_dir) as store:
+            self.assertTrue(store.is_stopword("nuovastopword"))
+
+    def test_invalid_store(self):
+        """Test del rifiuto di un archivio non valido"""
+        with open(self.store_path, 'wb') as f:
+            f.write(b"non un archivio di lessici" * 4)
+
+        with self.assertRaises(ModelLoadError):
+            LexiconStore(self.store_path)
+
+        # Con la compilazione automatica l'archivio viene rigenerato
+        with open_lexicon_store(self.store_path, self.data_dir) as store:
+            self.assertTrue(store.is_stopword("il"))
+
+if __name__ == '__main__':
+    unittest.main()
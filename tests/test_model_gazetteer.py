@@ -0,0 +1,38 @@
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model_gazetteer import ModelGazetteer, get_model_gazetteer
+from nlp_analyzer import MultilingualNLPAnalyzer
+from product_categorizer import ProductCategorizer
+
+class TestModelGazetteer(unittest.TestCase):
+    """Test per il gazetteer dei modelli di veicolo"""
+
+    def test_known_models(self):
+        """Test dei modelli composti e del modello più lungo"""
+        gazetteer = get_model_gazetteer()
+        self.assertEqual(gazetteer.resolve("Paraurti Fiat Punto Evo 2010", ["Fiat"]), ["Punto Evo"])
+        self.assertEqual(gazetteer.resolve("Kit frizione VW Golf 7 1.6 TDI", ["vw"]), ["Golf 7"])
+        self.assertEqual(gazetteer.resolve("Pastiglie BMW Serie 3 e X5", ["BMW"]), ["Serie 3", "X5"])
+
+    def test_models_only_after_brand_hit(self):
+        """Test: senza brand non vengono cercati modelli"""
+        gazetteer = ModelGazetteer.from_mapping({"Fiat": {"aliases": ["fiat"], "models": {"Panda": ["panda"]}}})
+        self.assertEqual(gazetteer.resolve("peluche panda", []), [])
+        self.assertEqual(gazetteer.resolve("peluche panda", ["Ford"]), [])
+        self.assertEqual(gazetteer.canonical_brand("FIAT"), "Fiat")
+
+    def test_analyzers_use_gazetteer(self):
+        """Test dell'integrazione negli analizzatori"""
+        entities = MultilingualNLPAnalyzer().analyze_entities("Pastiglie freno Brembo per BMW Serie 3 E90 2008")
+        self.assertEqual(entities.models, ["Serie 3"])
+
+        analysis = ProductCategorizer().analyze_product("Filtro aria Fiat Punto Evo", "Ricambio per motore 1.4")
+        self.assertEqual(analysis.model, "Punto Evo")
+
+if __name__ == '__main__':
+    unittest.main()
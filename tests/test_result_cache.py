@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from product_categorizer import ProductCategorizer
+from result_cache import ResultCache, compute_version
+from monitoring import MetricsCollector
+from utils import CacheUtils
+
+class FakeRedis:
+    """Client Redis minimale in memoria"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+class TestResultCache(unittest.TestCase):
+    """Test per la cache dei risultati di categorizzazione"""
+
+    def setUp(self):
+        self.metrics = MetricsCollector()
+        self.redis = FakeRedis()
+        self.cache = ResultCache("test", redis_client=self.redis, metrics=self.metrics)
+
+    def test_hits_misses_and_redis_tier(self):
+        """Test dei contatori e della promozione da Redis"""
+        key = self.cache.key_for("v1", "filtro olio")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.set(key, {"categoria": "Filtri"})
+        self.assertEqual(self.cache.get(key), {"categoria": "Filtri"})
+
+        # Un secondo processo con la sola cache Redis condivisa
+        other = ResultCache("test", memory=CacheUtils(), redis_client=self.redis, metrics=self.metrics)
+        self.assertEqual(other.get(key), {"categoria": "Filtri"})
+
+        summary = self.metrics.get_summary()
+        self.assertEqual(summary['cache_stats']['hits'], 2)
+        self.assertEqual(summary['cache_stats']['misses'], 1)
+
+    def test_version_changes_key(self):
+        """Test dell'invalidazione al cambio di versione"""
+        self.assertNotEqual(compute_version({"a": [1]}), compute_version({"a": [2]}))
+        self.assertEqual(compute_version({"b": 1, "a": 2}), compute_version({"a": 2, "b": 1}))
+        self.assertNotEqual(self.cache.key_for("v1", "x"), self.cache.key_for("v2", "x"))
+
+    def test_cached_preparation_matches_uncached(self):
+        """Test dell'equivalenza dei risultati con e senza cache"""
+        cached = ProductCategorizer(result_cache=self.cache)
+        uncached = ProductCategorizer()
+
+        for title in ("Filtro Olio Bosch", "filtro   olio BOSCH", "Pastiglie freno Brembo"):
+            expected = uncached.prepare_categorization(title, "per auto", ["Ricambi"])
+            self.assertEqual(cached.prepare_categorization(title, "per auto", ["ricambi"]), expected)
+
+        # Le due varianti del filtro condividono la stessa chiave normalizzata
+        self.assertEqual(self.metrics.get_summary()['cache_stats']['hits'], 1)
+
+    def test_untrusted_redis_value_is_a_miss(self):
+        """Test dei valori non JSON o di tipi non registrati letti da Redis"""
+        import pickle
+        key = self.cache.key_for("v1", "payload")
+        self.redis.data[key] = pickle.dumps({"categoria": "Filtri"})
+        self.assertIsNone(self.cache.get(key))
+
+        self.redis.data[key] = b'{"__cache_type__": "os.system", "command": "true"}'
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(self.metrics.get_summary()['cache_stats']['misses'], 2)
+
+    def test_dataclass_round_trip(self):
+        """Test della serializzazione JSON dei dataclass registrati"""
+        categorizer = ProductCategorizer()
+        prepared = categorizer.prepare_categorization("Filtro Olio Bosch", "per auto", ["Ricambi"])
+        key = self.cache.key_for("v1", "filtro")
+        self.cache.set(key, prepared)
+
+        other = ResultCache("test", memory=CacheUtils(), redis_client=self.redis, metrics=self.metrics)
+        self.assertEqual(other.get(key), prepared)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import io
+import csv
+import tempfile
+import json
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from seo_export import SEOTreeExporter, category_slug
+from seo_optimizer import SEOOptimizer
+
+TREE = {
+    "Ricambi Auto": {
+        "Freni": {"Pastiglie": {}, "Dischi": {}},
+        "Motore": {"Olio": {}, "Filtri & Cinghie": {}}
+    },
+    "Accessori": {}
+}
+
+class TestSEOTreeExporter(unittest.TestCase):
+    """Test per l'esportazione in streaming di meta tag e sitemap"""
+
+    def setUp(self):
+        self.optimizer = SEOOptimizer()
+        self.exporter = SEOTreeExporter(self.optimizer, ["freni"], base_url="https://www.esempio.it/")
+
+    def test_nodes_match_generate_meta_tags(self):
+        """Test: ogni nodo ha gli stessi meta tag di generate_meta_tags sul suo path"""
+        nodes = list(self.exporter.iter_nodes(TREE))
+        self.assertEqual(len(nodes), 8)
+        self.assertEqual(nodes[2].path, ["Ricambi Auto", "Freni", "Pastiglie"])
+        self.assertEqual(nodes[6].url, "https://www.esempio.it/ricambi-auto/motore/filtri-cinghie")
+        for node in nodes:
+            expected = self.optimizer.generate_meta_tags(node.path, ["freni"])
+            self.assertEqual({"title": node.title, "description": node.description, "keywords": node.keywords}, expected)
+
+    def test_export_formats(self):
+        """Test dei formati sitemap XML, CSV e NDJSON"""
+        output = io.StringIO()
+        stats = self.exporter.export(TREE, output, "sitemap-xml")
+        self.assertEqual(stats.nodes, 8)
+        self.assertEqual(stats.bytes_written, len(output.getvalue().encode("utf-8")))
+        self.assertEqual(output.getvalue().count("<url>"), 8)
+        self.assertTrue(output.getvalue().rstrip().endswith("</urlset>"))
+
+        output = io.StringIO()
+        self.exporter.export(TREE, output, "sitemap-csv")
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(rows[0], ["path", "url", "title", "description", "keywords"])
+        self.assertEqual(len(rows), 9)
+
+        output = io.StringIO()
+        self.exporter.export(TREE, output, "meta-ndjson")
+        first = json.loads(output.getvalue().splitlines()[0])
+        self.assertEqual(first["path"], ["Ricambi Auto"])
+        with self.assertRaises(ValueError):
+            self.exporter.export(TREE, io.StringIO(), "html")
+
+    def test_sitemap_requires_absolute_base_url(self):
+        """Test: senza URL di base assoluto le sitemap non vengono scritte, i meta tag sì"""
+        exporter = SEOTreeExporter(self.optimizer, base_url="")
+        for export_format in ("sitemap-xml", "sitemap-csv"):
+            with self.assertRaises(ValueError):
+                exporter.export(TREE, io.StringIO(), export_format)
+        self.assertEqual(exporter.export(TREE, io.StringIO(), "meta-ndjson").nodes, 8)
+
+    def test_sitemap_files_split_with_index(self):
+        """Test: oltre il limite di URL per file la sitemap viene divisa in parti con un indice"""
+        exporter = SEOTreeExporter(self.optimizer, base_url="https://www.esempio.it", max_sitemap_urls=3)
+        with self.assertRaises(ValueError):
+            exporter.export(TREE, io.StringIO(), "sitemap-xml")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sitemap.xml")
+            stats, files = exporter.write_sitemap_files(TREE, path)
+            self.assertEqual(stats.nodes, 8)
+            self.assertEqual([os.path.basename(name) for name in files],
+                             ["sitemap.xml", "sitemap-1.xml", "sitemap-2.xml", "sitemap-3.xml"])
+            with open(path, encoding="utf-8") as f:
+                index = f.read()
+            self.assertIn("<sitemapindex", index)
+            self.assertIn("<loc>https://www.esempio.it/sitemap-3.xml</loc>", index)
+            counts = []
+            for name in files[1:]:
+                with open(name, encoding="utf-8") as f:
+                    counts.append(f.read().count("<url>"))
+            self.assertEqual(counts, [3, 3, 2])
+
+            # Sotto il limite resta un solo file, senza indice
+            stats, files = self.exporter.write_sitemap_files(TREE, path)
+            self.assertEqual(files, [path])
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read().count("<url><loc>https://www.esempio.it/"), 8)
+
+    def test_category_slug(self):
+        """Test degli slug delle categorie"""
+        self.assertEqual(category_slug("Ammortizzatori & Molle Più Rigide"), "ammortizzatori-molle-piu-rigide")
+
+if __name__ == '__main__':
+    unittest.main()
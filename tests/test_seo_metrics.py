@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from seo_metrics import KeywordMetricsStore
+from seo_optimizer import SEOOptimizer
+
+class TestKeywordMetricsStore(unittest.TestCase):
+    """Test per l'archivio colonnare delle metriche SEO"""
+
+    def setUp(self):
+        self.optimizer = SEOOptimizer()
+
+    def test_batch_matches_single_estimates(self):
+        """Test: le stime vettoriali coincidono con le stime per singola keyword"""
+        keywords = ["freni", "filtro olio motore", "olio sintetico ibrido", "pastiglie", "", "auto ricambi premium economico"]
+        for metrics in self.optimizer.metrics_for(keywords):
+            keyword = metrics.keyword
+            self.assertEqual(metrics.search_volume, self.optimizer._estimate_search_volume(keyword))
+            self.assertEqual(metrics.competition, self.optimizer._estimate_competition(keyword))
+            self.assertEqual(metrics.difficulty, self.optimizer._estimate_difficulty(keyword))
+            self.assertEqual(metrics.relevance_score, self.optimizer._calculate_relevance_score(keyword))
+            self.assertEqual(metrics.trend, self.optimizer._estimate_trend(keyword))
+
+    def test_known_keywords_and_memoization(self):
+        """Test: le keyword del database hanno metriche esatte e le stime vengono calcolate una volta"""
+        keyword, data = next(iter(self.optimizer.keyword_database.items()))
+        metrics = self.optimizer.metrics_for([keyword])[0]
+        self.assertEqual((metrics.search_volume, metrics.relevance_score, metrics.trend), (data["volume"], 1.0, data["trend"]))
+
+        store = self.optimizer.metrics_store
+        size = len(store)
+        self.optimizer.analyze_category_seo(["Ricambi Auto", "Freni", "Pastiglie"])
+        grown = len(store)
+        self.assertGreater(grown, size)
+        self.optimizer.analyze_category_seo(["Ricambi Auto", "Freni", "Pastiglie"])
+        self.assertEqual(len(store), grown)
+
+    def test_bulk_ranking_matches_single_analysis(self):
+        """Test: la classifica in blocco ha gli stessi punteggi di analyze_category_seo"""
+        categories = [
+            ["Ricambi Auto", "Freni", "Pastiglie"],
+            ["Ricambi Auto", "Motore", "Olio"],
+            ["Ricambi Auto", "Freni", "Dischi"],
+            ["Accessori"],
+            ["Ricambi Auto", "Elettrico", "Batteria"],
+        ]
+        product_keywords = ["freni", "olio", "the"]
+        expected = [(path, self.optimizer.analyze_category_seo(path, product_keywords).seo_score) for path in categories]
+        expected.sort(key=lambda item: item[1], reverse=True)
+
+        self.assertEqual(self.optimizer.rank_categories_by_seo(categories, product_keywords), expected)
+        self.assertEqual(self.optimizer.rank_categories_by_seo(categories, product_keywords, top_n=2), expected[:2])
+
+    def test_reset_keeps_seeded_keywords(self):
+        """Test: oltre la dimensione massima le stime vengono dimenticate, il database resta"""
+        store = KeywordMetricsStore({"olio": 100}, {}, {}, [], max_size=3)
+        store.seed({"olio motore": {"volume": 5000, "competition": 0.5, "difficulty": 0.4, "trend": "rising"}})
+        store.lookup(["a", "b"])
+        _, (volume, _, _, _, trend) = store.lookup(["c", "olio motore"])
+        self.assertEqual(volume.tolist(), [100, 5000])
+        self.assertEqual(trend.tolist(), [0, 1])
+        self.assertNotIn("a", store)
+        self.assertEqual(len(store), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import gc
+import unittest
+import sys
+import os
+
+# Aggiungi il path src per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from product_categorizer import ProductCategorizer
+from config import config
+from server import ASGI_WORKER_CLASS, build_server_options, warm_up
+
+class TestServer(unittest.TestCase):
+    """Test per il server di produzione"""
+
+    def test_server_options_from_performance_settings(self):
+        """Test della traduzione delle impostazioni in opzioni gunicorn"""
+        performance = config.get_performance_settings()
+        performance.update(server_workers=3, server_threads=4, server_backlog=64)
+        options = build_server_options(performance, "0.0.0.0:8000")
+
+        self.assertEqual(options["bind"], "0.0.0.0:8000")
+        self.assertEqual(options["workers"], 3)
+        self.assertEqual(options["worker_class"], "gthread")
+        self.assertEqual(options["backlog"], 64)
+        self.assertTrue(options["preload_app"])
+
+    def test_asgi_server_options(self):
+        """Test della modalità ASGI: worker uvicorn pre-fork, un thread per worker (il pool è nell'adattatore)"""
+        performance = config.get_performance_settings()
+        performance.update(server_mode="asgi", server_threads=8)
+        options = build_server_options(performance, "0.0.0.0:8000")
+
+        self.assertEqual(options["worker_class"], ASGI_WORKER_CLASS)
+        self.assertEqual(options["threads"], 1)
+        self.assertGreaterEqual(performance["async_threads"], 1)
+
+    def test_warm_up_leaves_tree_untouched(self):
+        """Test del riscaldamento: nessuna categoria viene creata"""
+        categorizer = ProductCategorizer()
+        try:
+            report = warm_up(categorizer)
+        finally:
+            gc.unfreeze()
+
+        self.assertEqual(categorizer.category_tree, {})
+        self.assertTrue(report["product_type"])
+
+    def test_warm_up_preloads_italian_pipeline(self):
+        """Test del precaricamento dell'API italiana e dell'archivio lessici prima del freeze"""
+        categorizer = ProductCategorizer()
+        try:
+            report = warm_up(categorizer)
+        finally:
+            gc.unfreeze()
+
+        import src.italian_support
+        import src.lexicon_store
+        self.assertTrue(report["italian_loaded"])
+        self.assertGreater(report["stopwords"], 0)
+        self.assertIsNotNone(src.italian_support._shared_pipeline)
+        self.assertIn("src.italian_api", sys.modules)
+        self.assertNotIn("lexicon_store", sys.modules)
+
+if __name__ == '__main__':
+    unittest.main()
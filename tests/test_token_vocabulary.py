@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+
+# Aggiungi il path del progetto per importare i moduli
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.token_vocabulary import UNKNOWN_ID, TokenVocabulary
+from src.italian_support import ItalianNLPSupport
+
+class TestTokenVocabulary(unittest.TestCase):
+    """Test per il vocabolario di token internati"""
+
+    def test_encode_decode(self):
+        """Test: gli ID sono stabili e la decodifica restituisce i token"""
+        vocabulary = TokenVocabulary()
+        ids = vocabulary.encode(["filtro", "olio", "filtro"])
+        self.assertEqual(ids.typecode, "I")
+        self.assertEqual(list(ids), [1, 2, 1])
+        self.assertEqual(vocabulary.decode(ids), ["filtro", "olio", "filtro"])
+        self.assertIsNone(vocabulary.get("freno"))
+
+        batch, offsets = vocabulary.encode_batch([["olio"], [], ["freno", "filtro"]])
+        self.assertEqual(list(batch), [2, 3, 1])
+        self.assertEqual(list(offsets), [0, 1, 1, 3])
+
+    def test_max_size(self):
+        """Test: oltre la dimensione massima i token nuovi diventano UNKNOWN_ID"""
+        vocabulary = TokenVocabulary(max_size=3)
+        self.assertEqual(list(vocabulary.encode(["a", "b", "c", "a"])), [1, 2, UNKNOWN_ID, 1])
+        self.assertEqual(len(vocabulary), 3)
+        self.assertEqual(vocabulary.id_of("d", force=True), 3)
+
+    def test_lexicon_only(self):
+        """Test: con lexicon_only vengono registrate solo le parole dei lessici"""
+        vocabulary = TokenVocabulary(lexicon_only=True)
+        self.assertEqual(vocabulary.id_set(["filtro"]), frozenset([1]))
+        self.assertEqual(list(vocabulary.encode(["filtro", "zxq"])), [1, UNKNOWN_ID])
+        self.assertEqual(vocabulary.id_of("zxq"), UNKNOWN_ID)
+        self.assertEqual(len(vocabulary), 2)
+
+    def test_user_text_does_not_grow_shared_state(self):
+        """Test: i token fuori vocabolario non modificano vocabolario e radici condivisi"""
+        nlp_support = ItalianNLPSupport()
+        vocabulary_size = len(nlp_support.vocabulary)
+        stem_count = len(nlp_support._stem_by_id)
+
+        processed = nlp_support.process_tokens("pastiglie xq123 brembissime filtro olio".split())
+        self.assertEqual(processed["stemmed"][1], nlp_support.stem_word("xq123"))
+        self.assertEqual(len(nlp_support.vocabulary), vocabulary_size)
+        self.assertEqual(len(nlp_support._stem_by_id), stem_count)
+
+    def test_pipeline_on_ids(self):
+        """Test: composti, varianti, stopwords e stemming lavorano sugli ID, anche a vocabolario pieno"""
+        nlp_support = ItalianNLPSupport()
+        processed = nlp_support.process_tokens("kit distribuzione e filtro olio per macchina perche ricambi".split())
+        self.assertEqual(processed["compound_words"], ["kit distribuzione", "filtro olio"])
+        self.assertEqual(processed["filtered"], ["kit", "distribuzione", "filtro", "olio", "automobile", "ricambi"])
+        self.assertEqual(processed["stemmed"][-1], "ricambi")
+
+        full = TokenVocabulary(max_size=1)
+        self.assertEqual(ItalianNLPSupport(vocabulary=full).process_tokens(["freni", "di"])["stemmed"], ["freno"])
+
+if __name__ == '__main__':
+    unittest.main()